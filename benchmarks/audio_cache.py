@@ -0,0 +1,243 @@
+"""
+Scaling benchmark for AudioCache.
+
+Fills a temporary cache with synthetic entries and small dummy files, then
+measures the one-time import of a legacy metadata.json, startup load time,
+hit/miss lookup latency, ingest throughput, library search latency,
+eviction cost, clear_all cost and peak RSS. Every size runs in its own
+subprocess so peak RSS is not polluted by the previous size.
+
+Run from the repository root:
+
+    python -m benchmarks.audio_cache
+    python -m benchmarks.audio_cache --sizes 1000 10000 100000 --save-baseline
+    python -m benchmarks.audio_cache --compare
+
+--compare checks against benchmarks/baselines/audio_cache.json. The
+committed file was measured on the machine it names; on other hardware,
+store a local reference first with --save-baseline. The cache timings are
+disk bound and vary between runs, raise --tolerance on busy machines.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from boxy_py.audio_cache import AudioCache
+from boxy_py.library import PlaylistLibrary
+from benchmarks.common import (
+    Stopwatch, summarize, peak_rss_mb, load_baseline, save_baseline, compare_to_baseline, print_table
+)
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DUMMY_FILE_SIZE = 1024
+SEARCH_QUERIES = ("ambience mix", "synthetic tr", "part 42", "channel 7", "ambiance mx", "sy")
+
+
+def synthetic_url(index):
+    return f"https://www.youtube.com/watch?v=bench{index:07d}"
+
+
+def synthetic_info(index):
+    return {
+        "title": f"Synthetic track {index} - ambience mix part {index % 97}",
+        "duration": 60 + index % 3600,
+        "thumbnail": f"https://i.ytimg.com/vi/bench{index:07d}/hqdefault.jpg",
+        "channel": f"Channel {index % 500}",
+    }
+
+
+def populate(cache_dir, size):
+    """Write size dummy files and a matching legacy metadata.json directly to disk"""
+    payload = b"\0" * DUMMY_FILE_SIZE
+    now = time.time()
+    metadata = {}
+    for i in range(size):
+        url = synthetic_url(i)
+        file_id = hashlib.md5(url.encode("utf-8")).hexdigest()
+        with open(os.path.join(cache_dir, f"{file_id}.webm"), "wb") as f:
+            f.write(payload)
+        info = synthetic_info(i)
+        metadata[file_id] = {
+            "url": url,
+            "title": info["title"],
+            "duration": info["duration"],
+            "thumbnail": info["thumbnail"],
+            "channel": info["channel"],
+            "file_size": DUMMY_FILE_SIZE,
+            "date_added": now - size + i,
+            "last_accessed": now - size + i,
+        }
+
+    with open(os.path.join(cache_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+
+def timed_calls(func, arguments, time_budget):
+    """Call func for each argument until the list or the time budget runs out"""
+    durations = []
+    deadline = time.perf_counter() + time_budget
+    for argument in arguments:
+        start = time.perf_counter()
+        func(argument)
+        durations.append(time.perf_counter() - start)
+        if time.perf_counter() > deadline:
+            break
+    return durations
+
+
+def run_size(size, lookups, ingests, time_budget):
+    """Run every measurement against a cache holding size entries"""
+    root = tempfile.mkdtemp(prefix="boxy_cache_bench_")
+    cache_dir = os.path.join(root, "audio_files")
+    os.makedirs(cache_dir)
+    rng = random.Random(size)
+    results = {"size": size}
+
+    try:
+        with Stopwatch() as populate_time:
+            populate(cache_dir, size)
+        results["populate_seconds"] = populate_time.elapsed
+
+        with Stopwatch() as import_time:
+            AudioCache(cache_dir=cache_dir).load()
+        results["import_ms"] = import_time.elapsed * 1000
+
+        load_times = []
+        for _ in range(3):
+            with Stopwatch() as load_time:
+                cache = AudioCache(cache_dir=cache_dir)
+                cache.load()
+            load_times.append(load_time.elapsed)
+        results["startup_load_ms"] = min(load_times) * 1000
+
+        hit_urls = [synthetic_url(rng.randrange(size)) for _ in range(lookups)]
+        hit_durations = timed_calls(cache.get_cached_file, hit_urls, time_budget)
+        results["hit_lookup"] = summarize(hit_durations)
+
+        miss_urls = [synthetic_url(size + i) for i in range(lookups)]
+        miss_durations = timed_calls(cache.get_cached_file, miss_urls, time_budget)
+        results["miss_lookup"] = summarize(miss_durations)
+
+        source_file = os.path.join(root, "download.webm")
+        with open(source_file, "wb") as f:
+            f.write(b"\0" * DUMMY_FILE_SIZE)
+
+        ingest_indices = list(range(size, size + ingests))
+        ingest_durations = timed_calls(
+            lambda i: cache.add_file(synthetic_url(i), source_file, synthetic_info(i)),
+            ingest_indices,
+            time_budget
+        )
+        results["ingest"] = summarize(ingest_durations)
+        total_ingest = sum(ingest_durations)
+        results["ingest_items_per_s"] = len(ingest_durations) / total_ingest if total_ingest else 0.0
+
+        playlists_dir = os.path.join(root, "playlists")
+        os.makedirs(playlists_dir)
+        library = PlaylistLibrary(cache, path=os.path.join(root, "library.db"), import_directory=playlists_dir)
+        library.search("warm up")
+        search_queries = [SEARCH_QUERIES[i % len(SEARCH_QUERIES)] for i in range(lookups)]
+        results["search"] = summarize(timed_calls(library.search, search_queries, time_budget))
+        library.close()
+
+        # Evict roughly the oldest tenth of the cache
+        entries_before, total_bytes = cache.stats()
+        evict_target_mb = total_bytes * 0.9 / (1024 * 1024)
+        with Stopwatch() as evict_time:
+            cache.cleanup(max_size_mb=evict_target_mb)
+        results["evict_ms"] = evict_time.elapsed * 1000
+        results["evicted_entries"] = entries_before - cache.stats()[0]
+
+        with Stopwatch() as clear_time:
+            cache.clear_all()
+        results["clear_all_ms"] = clear_time.elapsed * 1000
+
+        results["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return results
+
+
+def run_size_in_subprocess(size, args):
+    command = [
+        sys.executable, "-m", "benchmarks.audio_cache",
+        "--child", str(size),
+        "--lookups", str(args.lookups),
+        "--ingests", str(args.ingests),
+        "--time-budget", str(args.time_budget),
+    ]
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AudioCache with synthetic entries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Cache sizes to test")
+    parser.add_argument("--lookups", type=int, default=200, help="Hit and miss lookups per size")
+    parser.add_argument("--ingests", type=int, default=100, help="Files ingested per size")
+    parser.add_argument("--time-budget", type=float, default=10.0,
+                        help="Seconds after which a single measurement stops early")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Fail on regressions against the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression for --compare")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args.lookups, args.ingests, args.time_budget)))
+        return 0
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_size_in_subprocess(size, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        rows = []
+        for size, result in results.items():
+            rows.append({
+                "entries": size,
+                "import ms": f"{result['import_ms']:.1f}",
+                "load ms": f"{result['startup_load_ms']:.1f}",
+                "hit p50 ms": f"{result['hit_lookup']['p50_ms']:.3f}",
+                "hit p99 ms": f"{result['hit_lookup']['p99_ms']:.3f}",
+                "miss p50 ms": f"{result['miss_lookup']['p50_ms']:.4f}",
+                "ingest/s": f"{result['ingest_items_per_s']:.1f}",
+                "search p50 ms": f"{result['search']['p50_ms']:.2f}",
+                "search p99 ms": f"{result['search']['p99_ms']:.2f}",
+                "evict ms": f"{result['evict_ms']:.1f}",
+                "clear ms": f"{result['clear_all_ms']:.1f}",
+                "peak RSS MB": f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] else "n/a",
+            })
+        print_table(rows, list(rows[0]))
+
+    failed = False
+    if args.compare:
+        baseline = load_baseline("audio_cache")
+        if baseline is None:
+            print("No stored baseline, skipping comparison")
+        else:
+            regressions = compare_to_baseline(results, baseline["results"], args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION: {regression}")
+            failed = bool(regressions)
+
+    if args.save_baseline:
+        save_baseline("audio_cache", results)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
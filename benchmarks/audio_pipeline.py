@@ -0,0 +1,231 @@
+"""
+Frame throughput benchmark for the playback source chain.
+
+Feeds synthetic 48 kHz stereo PCM through the same AudioSource wrappers used
+for playback and reports how long each 20 ms frame takes to produce.
+
+Run from the repository root:
+
+    python -m benchmarks.audio_pipeline
+    python -m benchmarks.audio_pipeline --frames 15000 --max-p99-ms 2
+
+--compare checks against benchmarks/baselines/audio_pipeline.json. The
+committed file was measured on the machine it names; on other hardware,
+store a local reference first with --save-baseline.
+"""
+import argparse
+import array
+import json
+import math
+import sys
+import time
+
+import discord
+
+from boxy_py.audio_level_source import AudioLevelSource
+from boxy_py.mixer import Layer, Layers, MixerSource
+from benchmarks.common import summarize, load_baseline, save_baseline, compare_to_baseline, print_table
+
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+FRAME_MS = 20
+FRAME_SIZE = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH * FRAME_MS // 1000  # 3840 bytes
+
+PIPELINES = {}
+
+
+def register_pipeline(name):
+    """
+    Register a source chain builder under a name.
+
+    The decorated function receives a fresh synthetic source and returns the
+    AudioSource to read frames from, so new mixers or meters can be
+    benchmarked by adding one builder.
+    """
+    def decorator(builder):
+        PIPELINES[name] = builder
+        return builder
+    return decorator
+
+
+class SyntheticPCMSource(discord.AudioSource):
+    """Endless 48 kHz stereo 16-bit sine wave split into 20 ms frames"""
+    def __init__(self, frequency=440.0, amplitude=0.5, frames=None):
+        samples_per_frame = FRAME_SIZE // (CHANNELS * SAMPLE_WIDTH)
+        # One second of audio so the wave loops seamlessly for whole-Hz frequencies
+        total_samples = SAMPLE_RATE
+        pcm = array.array("h")
+        for i in range(total_samples):
+            value = int(32767 * amplitude * math.sin(2 * math.pi * frequency * i / SAMPLE_RATE))
+            pcm.extend((value, value))
+        self._buffer = pcm.tobytes()
+        self._frames_per_loop = total_samples // samples_per_frame
+        self._index = 0
+        self._remaining = frames
+
+    def read(self):
+        if self._remaining is not None:
+            if self._remaining <= 0:
+                return b""
+            self._remaining -= 1
+
+        offset = (self._index % self._frames_per_loop) * FRAME_SIZE
+        self._index += 1
+        return self._buffer[offset:offset + FRAME_SIZE]
+
+    def is_opus(self):
+        return False
+
+
+class LevelSink:
+    """Stand-in for the object AudioLevelSource reports levels to"""
+    def __init__(self):
+        self.audio_level = 0.0
+
+
+@register_pipeline("raw")
+def build_raw(source):
+    return source
+
+
+@register_pipeline("volume")
+def build_volume(source):
+    return discord.PCMVolumeTransformer(source, volume=0.8)
+
+
+@register_pipeline("level")
+def build_level(source):
+    return AudioLevelSource(source, LevelSink())
+
+
+@register_pipeline("volume+level")
+def build_playback_chain(source):
+    volume_transformer = discord.PCMVolumeTransformer(source, volume=0.8)
+    return AudioLevelSource(volume_transformer, LevelSink())
+
+
+def build_mixer(source, layer_count, fade=0.0):
+    """Song under layer_count looping sine layers, fading in over fade seconds"""
+    layers = Layers(volume=0.8)
+    for i in range(layer_count):
+        layers.add(f"layer{i}", Layer(lambda i=i: SyntheticPCMSource(frequency=110.0 * (i + 2), amplitude=0.2),
+                                      volume=0.5, fade=fade))
+    return MixerSource(discord.PCMVolumeTransformer(source, volume=0.8), layers)
+
+
+@register_pipeline("mixer x4")
+def build_mixer_4(source):
+    return build_mixer(source, 4)
+
+
+@register_pipeline("mixer x8")
+def build_mixer_8(source):
+    return build_mixer(source, 8)
+
+
+@register_pipeline("mixer x8 fading")
+def build_mixer_8_fading(source):
+    # A fade longer than the run keeps every frame on the per-sample ramp path
+    return build_mixer(source, 8, fade=3600.0)
+
+
+@register_pipeline("mixer x8+level")
+def build_mixer_playback_chain(source):
+    return AudioLevelSource(build_mixer(source, 8), LevelSink())
+
+
+def run_pipeline(name, frames, warmup):
+    """
+    Read frames through one pipeline and time every read.
+
+    Returns:
+        Dictionary with throughput, latency percentiles and deadline margin
+    """
+    source = PIPELINES[name](SyntheticPCMSource())
+    for _ in range(warmup):
+        source.read()
+
+    durations = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(frames):
+        frame_start = clock()
+        data = source.read()
+        durations.append(clock() - frame_start)
+        if len(data) != FRAME_SIZE:
+            raise RuntimeError(f"{name} returned a {len(data)} byte frame")
+    total = clock() - start
+
+    if hasattr(source, "cleanup"):
+        source.cleanup()
+
+    stats = summarize(durations)
+    return {
+        "frames_per_s": frames / total if total else 0.0,
+        "realtime_factor": (frames * FRAME_MS / 1000) / total if total else 0.0,
+        "latency": stats,
+        "deadline_margin_ms": FRAME_MS - stats["p99_ms"],
+        "budget_used_pct": stats["p99_ms"] / FRAME_MS * 100,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the playback AudioSource chain with synthetic PCM")
+    parser.add_argument("--frames", type=int, default=3000, help="Frames to read per pipeline (3000 = 60 s of audio)")
+    parser.add_argument("--warmup", type=int, default=100, help="Frames read before measuring")
+    parser.add_argument("--pipeline", action="append", choices=sorted(PIPELINES), help="Pipeline to run, may be repeated")
+    parser.add_argument("--max-p99-ms", type=float, default=FRAME_MS / 4,
+                        help="Fail when a pipeline's p99 frame latency exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Fail on regressions against the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression for --compare")
+    args = parser.parse_args(argv)
+
+    names = args.pipeline or list(PIPELINES)
+    results = {name: run_pipeline(name, args.frames, args.warmup) for name in names}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        rows = []
+        for name, result in results.items():
+            latency = result["latency"]
+            rows.append({
+                "pipeline": name,
+                "frames/s": f"{result['frames_per_s']:.0f}",
+                "x realtime": f"{result['realtime_factor']:.0f}",
+                "p50 ms": f"{latency['p50_ms']:.4f}",
+                "p95 ms": f"{latency['p95_ms']:.4f}",
+                "p99 ms": f"{latency['p99_ms']:.4f}",
+                "max ms": f"{latency['max_ms']:.4f}",
+                "margin ms": f"{result['deadline_margin_ms']:.3f}",
+            })
+        print_table(rows, list(rows[0]))
+
+    failed = False
+    for name, result in results.items():
+        if result["latency"]["p99_ms"] > args.max_p99_ms:
+            print(f"FAIL: {name} p99 {result['latency']['p99_ms']:.3f} ms exceeds {args.max_p99_ms:.3f} ms")
+            failed = True
+
+    if args.compare:
+        baseline = load_baseline("audio_pipeline")
+        if baseline is None:
+            print("No stored baseline, skipping comparison")
+        else:
+            regressions = compare_to_baseline(results, baseline["results"], args.tolerance)
+            for regression in regressions:
+                print(f"REGRESSION: {regression}")
+            failed = failed or bool(regressions)
+
+    if args.save_baseline:
+        save_baseline("audio_pipeline", results)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import json
+import os
+import platform
+import time
+
+from boxy_py.loop_monitor import percentile
+
+
+# Reference results committed with the benchmarks, measured on the machine
+# named in each file; rerun with --save-baseline to compare on another one
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Metrics that improve as they grow although their suffix reads as a cost
+HIGHER_IS_BETTER = {"deadline_margin_ms", "realtime_factor"}
+# Single worst samples, too noisy between runs to compare with a baseline
+NOT_COMPARED = {"max_ms"}
+
+
+def summarize(durations):
+    """
+    Summarize a list of durations given in seconds.
+
+    Returns:
+        Dictionary with count, mean and percentiles in milliseconds
+    """
+    values = sorted(durations)
+    count = len(values)
+    return {
+        "count": count,
+        "mean_ms": (sum(values) / count * 1000) if count else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] * 1000) if count else 0.0,
+    }
+
+
+def peak_rss_mb():
+    """Get the peak resident set size of this process in MB, or None if unknown"""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    if platform.system() == "Darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class Stopwatch:
+    """Context manager measuring wall time with perf_counter"""
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def load_baseline(name):
+    """Load a stored baseline, or None if there is none"""
+    path = baseline_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(name, results):
+    """Store results as the new baseline for a benchmark"""
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "results": results,
+    }
+    with open(baseline_path(name), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Compare numeric results against a baseline.
+
+    Every key ending in "_per_s" or listed in HIGHER_IS_BETTER is treated
+    as higher-is-better, and every other key ending in "_ms", "_s", "_mb"
+    or "_pct" as lower-is-better. Keys in NOT_COMPARED are skipped.
+
+    Args:
+        results: Nested dictionary of current results
+        baseline: Nested dictionary of baseline results
+        tolerance: Allowed relative regression, e.g. 0.25 for 25%
+
+    Returns:
+        List of human readable regression descriptions
+    """
+    regressions = []
+
+    def walk(current, previous, path):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            old = previous[key]
+            label = f"{path}.{key}" if path else key
+            if isinstance(value, dict) and isinstance(old, dict):
+                walk(value, old, label)
+                continue
+            if key in NOT_COMPARED:
+                continue
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+
+            if key in HIGHER_IS_BETTER or key.endswith("_per_s"):
+                change = (old - value) / old
+            elif key.endswith(("_ms", "_s", "_mb", "_pct")):
+                change = (value - old) / old
+            else:
+                continue
+
+            if change > tolerance:
+                regressions.append(f"{label}: {old:.3f} -> {value:.3f} ({change * 100:+.0f}%)")
+
+    walk(results, baseline, "")
+    return regressions
+
+
+def print_table(rows, columns):
+    """Print a list of dictionaries as an aligned text table"""
+    widths = [max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(width) for column, width in zip(columns, widths)))
@@ -4,15 +4,142 @@ import hashlib
 import platform
 import time
 import shutil
+import threading
 from typing import Dict, Optional, Tuple
 
+from boxy_py import database, loudness, segments, waveform
+from boxy_py.maintenance import MaintenanceJob, MaintenanceRunner
+
+# Columns of the files table, in the order the metadata dictionaries use them
+FIELDS = ("url", "title", "duration", "thumbnail", "channel", "file_size", "date_added", "last_accessed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    duration REAL NOT NULL DEFAULT 0,
+    thumbnail TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL DEFAULT '',
+    file_size INTEGER NOT NULL DEFAULT 0,
+    date_added REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    loudness REAL,
+    peak REAL,
+    trim_start REAL,
+    trim_end REAL,
+    chapters TEXT,
+    path TEXT,
+    source_mtime REAL
+);
+CREATE INDEX IF NOT EXISTS files_url ON files(url);
+CREATE INDEX IF NOT EXISTS files_last_accessed ON files(last_accessed);
+CREATE TABLE IF NOT EXISTS maintenance (
+    file_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (file_id, job)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS files_maintenance_delete AFTER DELETE ON files BEGIN
+    DELETE FROM maintenance WHERE file_id = old.file_id;
+END;
+"""
+
+# Columns added after the first database version, with their types
+ADDED_COLUMNS = (("loudness", "REAL"), ("peak", "REAL"), ("trim_start", "REAL"), ("trim_end", "REAL"), ("chapters", "TEXT"),
+                 ("path", "TEXT"), ("source_mtime", "REAL"))
+
+# Full-text indexes over titles and channels, kept in sync with the files
+# table by triggers: files_fts answers word prefix queries, files_trigram
+# substring and typo-tolerant ones, and files_trigram_vocab tells how many
+# files contain each trigram.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    title, channel, content='files', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS files_trigram USING fts5(
+    title, channel, content='files', content_rowid='rowid', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS files_trigram_vocab USING fts5vocab(files_trigram, 'row');
+CREATE TRIGGER IF NOT EXISTS files_search_insert AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts (rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+    INSERT INTO files_trigram (rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+END;
+CREATE TRIGGER IF NOT EXISTS files_search_delete AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts (files_fts, rowid, title, channel) VALUES ('delete', old.rowid, old.title, old.channel);
+    INSERT INTO files_trigram (files_trigram, rowid, title, channel) VALUES ('delete', old.rowid, old.title, old.channel);
+END;
+CREATE TRIGGER IF NOT EXISTS files_search_update AFTER UPDATE OF title, channel ON files BEGIN
+    INSERT INTO files_fts (files_fts, rowid, title, channel) VALUES ('delete', old.rowid, old.title, old.channel);
+    INSERT INTO files_trigram (files_trigram, rowid, title, channel) VALUES ('delete', old.rowid, old.title, old.channel);
+    INSERT INTO files_fts (rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+    INSERT INTO files_trigram (rowid, title, channel) VALUES (new.rowid, new.title, new.channel);
+END;
+"""
+
+
+class AnalysisJob(MaintenanceJob):
+    """
+    Measures the loudness, finds the trim points and summarizes the
+    waveform of a file in a single decode. Summaries are written to the
+    cache directory, local files included.
+    """
+    name = "analysis"
+    version = 1
+
+    def __init__(self, directory, silence_threshold=waveform.SILENCE_THRESHOLD):
+        self.directory = directory
+        self.silence_threshold = silence_threshold
+
+    def run(self, file_id, path):
+        reduction = waveform.Reduction(waveform.SAMPLE_RATE)
+        measured = loudness.analyze(path, waveform.SAMPLE_RATE, reduction.feed)
+        if measured is None:
+            return None
+        trim_start, trim_end = reduction.trim_points(self.silence_threshold)
+        waveform.save(os.path.join(self.directory, file_id + waveform.EXTENSION), reduction.peaks())
+        return (*measured, trim_start, trim_end)
+
+    def apply(self, connection, file_id, result):
+        connection.execute(
+            "UPDATE files SET loudness = ?, peak = ?, trim_start = ?, trim_end = ? WHERE file_id = ?",
+            (*result, file_id)
+        )
+
+
 class AudioCache:
     """
     Manages caching of downloaded audio files to avoid redundant downloads.
+
+    File metadata is kept in an indexed SQLite database (cache.db) next to
+    the files, so lookups, ingests and evictions touch single rows instead
+    of rewriting the whole index. Titles and channels are full-text
+    indexed in the same database (see PlaylistLibrary.search). A
+    metadata.json left by older versions is imported once and removed.
+
+    Work over the cached files runs as maintenance jobs (see
+    MaintenanceRunner), checkpointed per file in the maintenance table.
+    The analysis job stores the EBU R128 integrated loudness and true
+    peak of every file and the points where its sound starts and ends
+    (trim_start, and trim_end when it ends in silence), NULL until it ran,
+    and writes a min/max waveform summary next to it as <file_id>.peaks.
+    Silence is anything below silence_threshold dBFS at analysis time.
+
+    Files of the local library (see LocalLibrary) are rows too, with the
+    path of the file they index. They are searched, analyzed and played
+    like downloads but never evicted or deleted, and do not count towards
+    the cache size.
+
+    on_analyzed, if set, is called with the URL of a file from a worker
+    thread when a job finished on it.
     """
+    DATABASE_FILES = ("cache.db", "cache.db-wal", "cache.db-shm")
+
     def __init__(self, cache_dir=None):
         """
-        Initialize the audio cache system.
+        Initialize the audio cache system. The metadata database is opened
+        on first use, or ahead of time by calling load().
         
         Args:
             cache_dir: Optional custom cache directory path
@@ -26,41 +153,103 @@ class AudioCache:
                 cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "Boxy", "audio_files")
         
         self.cache_dir = cache_dir
+        self.database_path = os.path.join(self.cache_dir, "cache.db")
         self.metadata_file = os.path.join(self.cache_dir, "metadata.json")
-        self.metadata = {}
+        self._connection = None
+        self._lock = threading.RLock()
+        self.on_analyzed = None
+        self._analysis = AnalysisJob(self.cache_dir)
+        self.maintenance = MaintenanceRunner(self, [self._analysis])
         self._ensure_cache_dir()
-        self._load_metadata()
+
+    def load(self):
+        """Open the metadata database if it was not opened yet. Safe to call from any thread."""
+        with self._lock:
+            if self._connection is None:
+                self._open_database()
+
+    def _db(self):
+        if self._connection is None:
+            self.load()
+        return self._connection
         
     def _ensure_cache_dir(self):
         """Create cache directory if it doesn't exist"""
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir, exist_ok=True)
     
-    def _load_metadata(self):
-        """Load metadata from the JSON file"""
+    def _open_database(self):
+        """Open the database, create the schema and import a legacy metadata.json"""
+        self._connection = database.connect(self.database_path)
+        with self._connection:
+            indexed = self._connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'files_fts'"
+            ).fetchone() is not None
+            self._connection.executescript(SCHEMA)
+            columns = {row["name"] for row in self._connection.execute("PRAGMA table_info(files)")}
+            for column, column_type in ADDED_COLUMNS:
+                if column not in columns:
+                    self._connection.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+            self._connection.executescript(SEARCH_SCHEMA)
+            if not indexed:
+                # Index the rows of a database created before search existed
+                self._connection.execute("INSERT INTO files_fts (files_fts) VALUES ('rebuild')")
+                self._connection.execute("INSERT INTO files_trigram (files_trigram) VALUES ('rebuild')")
+
         if os.path.exists(self.metadata_file):
-            try:
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    self.metadata = json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error loading metadata: {e}")
-                self.metadata = {}
-                self._save_metadata()
-        else:
-            self.metadata = {}
-            self._save_metadata()
-    
-    def _save_metadata(self):
-        """Save metadata to the JSON file"""
+            self._import_metadata_file()
+
+    def _import_metadata_file(self):
+        """Move the entries of a metadata.json written by older versions into the database"""
+        try:
+            with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Error loading metadata: {e}")
+            metadata = {}
+
+        now = time.time()
+        rows = []
+        for file_id, info in metadata.items():
+            if not isinstance(info, dict) or not info.get('url'):
+                continue
+            rows.append((
+                file_id,
+                info['url'],
+                info.get('title') or '',
+                info.get('duration') or 0,
+                info.get('thumbnail') or '',
+                info.get('channel') or '',
+                info.get('file_size') or 0,
+                info.get('date_added') or now,
+                info.get('last_accessed') or now,
+            ))
+
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO files (file_id, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
         try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
-        except IOError as e:
-            print(f"Error saving metadata: {e}")
+            os.remove(self.metadata_file)
+        except OSError as e:
+            print(f"Error removing imported metadata file: {e}")
+
+    def _row_to_info(self, row) -> Dict:
+        info = {field: row[field] for field in FIELDS}
+        info['loudness'] = row['loudness']
+        info['peak'] = row['peak']
+        info['trim_start'] = row['trim_start']
+        info['trim_end'] = row['trim_end']
+        info['chapters'] = json.loads(row['chapters']) if row['chapters'] else []
+        info['local'] = row['path'] is not None
+        return info
     
     def _generate_file_id(self, url: str) -> str:
         """
-        Generate a unique ID for a URL.
+        Generate a unique ID for a URL. Segment URLs get the ID of their
+        whole video, so all segments of a video share one cached file.
         
         Args:
             url: The video URL
@@ -68,8 +257,31 @@ class AudioCache:
         Returns:
             A unique ID string based on the URL
         """
-        return hashlib.md5(url.encode('utf-8')).hexdigest()
+        return hashlib.md5(segments.media_url(url).encode('utf-8')).hexdigest()
     
+    def file_path(self, file_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}.webm")
+
+    def _waveform_path(self, file_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}{waveform.EXTENSION}")
+
+    def _audio_path(self, row) -> str:
+        return row["path"] or self.file_path(row["file_id"])
+
+    def audio_path(self, file_id: str) -> str:
+        """Path of the audio of a file ID: its cached download, or the local file it indexes"""
+        with self._lock:
+            row = self._db().execute("SELECT file_id, path FROM files WHERE file_id = ?", (file_id,)).fetchone()
+        return self._audio_path(row) if row is not None else self.file_path(file_id)
+
+    def _remove_waveform(self, file_id: str):
+        try:
+            os.remove(self._waveform_path(file_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting waveform of {file_id}: {e}")
+
     def get_cached_file(self, url: str) -> Optional[Tuple[str, Dict]]:
         """
         Check if a URL is already cached.
@@ -81,20 +293,45 @@ class AudioCache:
             Tuple of (file_path, metadata) if cached, None otherwise
         """
         file_id = self._generate_file_id(url)
-        
-        if file_id in self.metadata:
-            info = self.metadata[file_id]
-            file_path = os.path.join(self.cache_dir, f"{file_id}.webm")
-            
-            if os.path.exists(file_path):
+
+        with self._lock:
+            connection = self._db()
+            row = connection.execute("SELECT * FROM files WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return None
+
+            file_path = self._audio_path(row)
+            with connection:
+                if not os.path.exists(file_path):
+                    # A local file may only be out of reach, the next scan
+                    # of the library decides whether it is gone
+                    if row["path"] is None:
+                        connection.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+                        self._remove_waveform(file_id)
+                    return None
+
+                info = self._row_to_info(row)
                 info['last_accessed'] = time.time()
-                self._save_metadata()
-                return file_path, info
-            
-            del self.metadata[file_id]
-            self._save_metadata()
+                connection.execute(
+                    "UPDATE files SET last_accessed = ? WHERE file_id = ?", (info['last_accessed'], file_id)
+                )
+            return file_path, info
+    
+    def peek(self, url: str) -> Optional[Dict]:
+        """
+        Get the metadata of a cached URL without marking it as accessed.
+        
+        Args:
+            url: The video URL
             
-        return None
+        Returns:
+            The metadata dictionary, or None if the URL is not cached
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT * FROM files WHERE file_id = ?", (self._generate_file_id(url),)
+            ).fetchone()
+        return self._row_to_info(row) if row is not None else None
     
     def add_file(self, url: str, temp_file_path: str, info: Dict) -> str:
         """
@@ -103,30 +340,226 @@ class AudioCache:
         Args:
             url: The video URL
             temp_file_path: Path to the temporary downloaded file
-            info: Dictionary containing video metadata (title, duration, etc.)
+            info: Dictionary containing video metadata (title, duration, chapters, etc.)
             
         Returns:
             Path to the cached file
         """
+        url = segments.media_url(url)
         file_id = self._generate_file_id(url)
-        cached_file_path = os.path.join(self.cache_dir, f"{file_id}.webm")
+        cached_file_path = self.file_path(file_id)
         
         shutil.copy2(temp_file_path, cached_file_path)
         
         file_size = os.path.getsize(cached_file_path)
-        self.metadata[file_id] = {
-            'url': url,
-            'title': info.get('title', 'Unknown'),
-            'duration': info.get('duration', 0),
-            'thumbnail': info.get('thumbnail', ''),
-            'channel': info.get('channel', '') or info.get('uploader', ''),
-            'file_size': file_size,
-            'date_added': time.time(),
-            'last_accessed': time.time()
-        }
-        self._save_metadata()
-        
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            with connection:
+                # An upsert rather than INSERT OR REPLACE, whose implicit
+                # delete would not fire the search index triggers
+                connection.execute(
+                    f"INSERT INTO files (file_id, {', '.join(FIELDS)}, chapters) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    f"ON CONFLICT (file_id) DO UPDATE SET {', '.join(f'{field} = excluded.{field}' for field in FIELDS)}, "
+                    f"chapters = excluded.chapters, loudness = NULL, peak = NULL, trim_start = NULL, trim_end = NULL",
+                    (
+                        file_id,
+                        url,
+                        info.get('title', 'Unknown'),
+                        info.get('duration') or 0,
+                        info.get('thumbnail') or '',
+                        info.get('channel', '') or info.get('uploader', '') or '',
+                        file_size,
+                        now,
+                        now,
+                        json.dumps(segments.chapters_from_info(info)),
+                    )
+                )
+                connection.execute("DELETE FROM maintenance WHERE file_id = ?", (file_id,))
+
+        self.maintenance.schedule(file_id)
         return cached_file_path
+
+    def local_files(self) -> Dict[str, Tuple[str, int, float]]:
+        """
+        Get the files of the local library.
+
+        Returns:
+            Dictionary mapping each path to (file_id, file_size, source_mtime)
+        """
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT path, file_id, file_size, source_mtime FROM files WHERE path IS NOT NULL"
+            ).fetchall()
+        return {row["path"]: (row["file_id"], row["file_size"], row["source_mtime"]) for row in rows}
+
+    def add_local_file(self, url: str, path: str, info: Dict, file_size: int, mtime: float):
+        """
+        Index a local file where it is, or update it after it changed.
+
+        Args:
+            url: The file:// URL of the file
+            path: Path to the file
+            info: Dictionary containing title, duration and channel
+            file_size: Size of the file in bytes
+            mtime: Modification time of the file, compared on the next scan
+        """
+        file_id = self._generate_file_id(url)
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.execute(
+                    f"INSERT INTO files (file_id, {', '.join(FIELDS)}, path, source_mtime) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    f"ON CONFLICT (file_id) DO UPDATE SET title = excluded.title, duration = excluded.duration, "
+                    f"channel = excluded.channel, file_size = excluded.file_size, path = excluded.path, "
+                    f"source_mtime = excluded.source_mtime, loudness = NULL, peak = NULL, trim_start = NULL, trim_end = NULL",
+                    (
+                        file_id,
+                        url,
+                        info.get('title', 'Unknown'),
+                        info.get('duration') or 0,
+                        '',
+                        info.get('channel', '') or '',
+                        file_size,
+                        now,
+                        now,
+                        path,
+                        mtime,
+                    )
+                )
+                connection.execute("DELETE FROM maintenance WHERE file_id = ?", (file_id,))
+            self._remove_waveform(file_id)
+
+        self.maintenance.schedule(file_id)
+
+    def remove_local_files(self, file_ids):
+        """Drop files from the local library index, leaving the files themselves alone"""
+        if not file_ids:
+            return
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.executemany(
+                    "DELETE FROM files WHERE file_id = ? AND path IS NOT NULL", [(file_id,) for file_id in file_ids]
+                )
+            for file_id in file_ids:
+                self._remove_waveform(file_id)
+
+    @property
+    def silence_threshold(self):
+        return self._analysis.silence_threshold
+
+    @silence_threshold.setter
+    def silence_threshold(self, value):
+        self._analysis.silence_threshold = value
+
+    def start_maintenance(self):
+        """Queue the maintenance jobs of every file that did not get them yet"""
+        self.maintenance.start()
+
+    def waveform(self, url: str):
+        """
+        Get the waveform summary of a cached URL. Files whose summary is
+        missing get analyzed ahead of the maintenance backlog.
+
+        Args:
+            url: The video URL
+
+        Returns:
+            numpy int8 array of (min, max) pairs, or None if not available yet
+        """
+        file_id = self._generate_file_id(url)
+        peaks = waveform.load(self._waveform_path(file_id))
+        if peaks is None and os.path.exists(self.audio_path(file_id)):
+            self.maintenance.schedule(file_id, urgent=True)
+        return peaks
+
+    def pending_files(self, job):
+        """IDs of the files a maintenance job did not run on at its current version, oldest first"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT files.file_id FROM files LEFT JOIN maintenance "
+                "ON maintenance.file_id = files.file_id AND maintenance.job = ? "
+                "WHERE maintenance.version IS NULL OR maintenance.version < ? ORDER BY files.date_added",
+                (job.name, job.version)
+            ).fetchall()
+        return [row["file_id"] for row in rows]
+
+    def complete_job(self, job, file_id, result):
+        """
+        Store the result of a maintenance job and checkpoint the file as
+        done, in one transaction. A None result leaves the file pending.
+        """
+        if result is None:
+            return
+        with self._lock:
+            connection = self._db()
+            row = connection.execute("SELECT url FROM files WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return
+            with connection:
+                job.apply(connection, file_id, result)
+                connection.execute(
+                    "INSERT OR REPLACE INTO maintenance (file_id, job, version) VALUES (?, ?, ?)",
+                    (file_id, job.name, job.version)
+                )
+        if self.on_analyzed:
+            self.on_analyzed(row["url"])
+
+    def close(self):
+        """Stop the maintenance workers; files not done yet are picked up on the next launch or request"""
+        self.maintenance.close()
+
+    def readiness(self, urls) -> Dict:
+        """
+        Check in one query which of a list of URLs can play without network.
+
+        A URL is cached when the index has it and its file has the recorded
+        size, stale when the index has it but the file is gone or has
+        another size, and missing otherwise. Empty entries, such as search
+        terms that were never resolved, count as missing. Segment URLs are
+        as ready as their whole video.
+
+        Args:
+            urls: URLs to check, duplicates counted once per occurrence
+
+        Returns:
+            Dictionary with entries, cached, stale and missing counts
+        """
+        urls = [segments.media_url(url) for url in urls]
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT url, file_id, file_size, path FROM files WHERE url IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted({url for url in urls if url})),)
+            ).fetchall()
+
+        states = {}
+        for row in rows:
+            try:
+                size = os.path.getsize(self._audio_path(row))
+            except OSError:
+                size = -1
+            states[row["url"]] = "cached" if size == row["file_size"] else "stale"
+
+        counts = {"entries": len(urls), "cached": 0, "stale": 0, "missing": 0}
+        for url in urls:
+            counts[states.get(url, "missing")] += 1
+        return counts
+
+    def stats(self) -> Tuple[int, int]:
+        """
+        Get the size of the cache, without the local library.
+
+        Returns:
+            Tuple of (file_count, total_size_in_bytes)
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(file_size), 0) FROM files WHERE path IS NULL"
+            ).fetchone()
+        return row[0], row[1]
     
     def cleanup(self, max_size_mb=1024):
         """
@@ -137,47 +570,53 @@ class AudioCache:
         Args:
             max_size_mb: Maximum total cache size in MB
         """
-        if not self.metadata:
-            return
-
-        total_size = sum(info.get('file_size', 0) for info in self.metadata.values())
         max_size_bytes = max_size_mb * 1024 * 1024
 
-        if total_size <= max_size_bytes:
-            return
+        with self._lock:
+            _, total_size = self.stats()
+            if total_size <= max_size_bytes:
+                return
 
-        items = sorted(self.metadata.items(), key=lambda x: x[1].get('last_accessed', 0))
+            connection = self._db()
+            rows = connection.execute(
+                "SELECT file_id, file_size FROM files WHERE path IS NULL ORDER BY last_accessed"
+            ).fetchall()
+            removed = []
 
-        for file_id, info in items:
-            file_path = os.path.join(self.cache_dir, f"{file_id}.webm")
+            for file_id, file_size in rows:
+                file_path = self.file_path(file_id)
 
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    total_size -= info.get('file_size', 0)
-                    del self.metadata[file_id]
+                if os.path.exists(file_path):
+                    try:
+                        os.remove(file_path)
+                        self._remove_waveform(file_id)
+                        total_size -= file_size
+                        removed.append((file_id,))
 
-                    if total_size <= max_size_bytes:
-                        break
+                        if total_size <= max_size_bytes:
+                            break
 
-                except PermissionError:
-                    continue
-                except OSError as e:
-                    print(f"Error deleting cache file {file_path}: {e}")
-            else:
-                del self.metadata[file_id]
+                    except PermissionError:
+                        continue
+                    except OSError as e:
+                        print(f"Error deleting cache file {file_path}: {e}")
+                else:
+                    self._remove_waveform(file_id)
+                    removed.append((file_id,))
 
-        self._save_metadata()
+            with connection:
+                connection.executemany("DELETE FROM files WHERE file_id = ?", removed)
 
     def clear_all(self):
         """
         Clear ALL cache files. Used when closing the application.
+        Local library files stay indexed, their analysis runs again.
         """
         try:
             for filename in os.listdir(self.cache_dir):
                 file_path = os.path.join(self.cache_dir, filename)
                 
-                if filename == "metadata.json":
+                if filename in self.DATABASE_FILES:
                     continue
                     
                 try:
@@ -188,8 +627,11 @@ class AudioCache:
                 except OSError as e:
                     print(f"Error deleting cache file {file_path}: {e}")
             
-            self.metadata = {}
-            self._save_metadata()
+            with self._lock:
+                connection = self._db()
+                with connection:
+                    connection.execute("DELETE FROM files WHERE path IS NULL")
+                    connection.execute("DELETE FROM maintenance")
             
         except Exception as e:
-            print(f"Error clearing cache: {e}")
\ No newline at end of file
+            print(f"Error clearing cache: {e}")
@@ -1,9 +1,10 @@
 import discord
 
 class AudioLevelSource(discord.AudioSource):
-    def __init__(self, original_source, bridge):
+    def __init__(self, original_source, target, on_start=None):
         self.original = original_source
-        self.bridge = bridge
+        self.target = target
+        self.on_start = on_start
         self.last_update_time = 0
         self.update_interval = 0.032
         
@@ -11,6 +12,10 @@ class AudioLevelSource(discord.AudioSource):
         data = self.original.read()
         
         if data:
+            if self.on_start is not None:
+                on_start, self.on_start = self.on_start, None
+                on_start()
+
             import time
             current_time = time.time()
             if current_time - self.last_update_time >= self.update_interval:
@@ -20,7 +25,7 @@ class AudioLevelSource(discord.AudioSource):
                     max_rms = 32768 
                     level = min(1.0, rms / (max_rms * 0.5)) 
                     
-                    self.bridge.audio_level = level
+                    self.target.audio_level = level
                     self.last_update_time = current_time
         
         return data
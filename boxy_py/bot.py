@@ -1,55 +1,190 @@
 import asyncio
+import hashlib
+import json
+import discord
 from discord.ext import commands
 
+from boxy_py.loop_monitor import LoopLagMonitor
+from boxy_py.player_session import PlayerSession
+from boxy_py.voice_presence import VoicePresence
+
 
 class BoxyBot(commands.Bot):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.voice_client = None
-        self.bridge = None
+        self.sessions = {}
+        self.core = None
         self._reconnect_task = None
+        self._gateway_ready = asyncio.Event()
         self._is_manually_disconnected = False
+        self.loop_monitor = LoopLagMonitor()
+        self.voice_presence = VoicePresence()
+        self._voice_channels = {}  # channel_id -> guild_id of the channels the bot is in
+        self._leave_tasks = {}
+        self.force_command_sync = False
+
+    async def setup_hook(self):
+        self.loop_monitor.start()
+        await self._sync_commands()
+
+    def command_digest(self):
+        """Hash of the slash command definitions, as they would be sent to Discord, and their application"""
+        payload = {
+            "application": self.application_id,
+            "commands": [command.to_dict(self.tree) for command in self.tree.get_commands()],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def _sync_commands(self):
+        """
+        Sync the slash commands when they changed since the last sync, or
+        when force_command_sync is set. Global syncs are rate limited and
+        slow, so unchanged commands are not sent again on every start.
+        """
+        if not self.tree.get_commands():
+            return
+
+        digest = self.command_digest()
+        settings = self.core.settings if self.core else None
+        if not self.force_command_sync and settings is not None and settings.value("syncedCommands", "") == digest:
+            return
+
+        await self.tree.sync()
+        if settings is not None:
+            settings.setValue("syncedCommands", digest)
 
     async def on_ready(self):
         self._is_manually_disconnected = False
-        await self.bridge.update_rich_presence()
-        if self.bridge:
-            self.bridge.status = "Connected"
-            self.bridge._voice_connected = False
-            self.bridge.voiceConnectedChanged.emit(False)
-            self.bridge.update_servers()
+        self._gateway_ready.set()
+        self.voice_presence.seed(self.guilds)
+        self._voice_channels = {vc.channel.id: vc.guild.id for vc in self.voice_clients}
+        if self.core:
+            await self.core.on_ready()
+
+    def _notify(self, event, *args):
+        if self.core:
+            self.core.notify(event, *args)
+
+    async def on_guild_join(self, guild):
+        self.voice_presence.add_guild(guild)
+        self._notify("guild_added", guild)
+
+    async def on_guild_remove(self, guild):
+        self.voice_presence.remove_guild(guild)
+        self._notify("guild_removed", guild)
+
+    async def on_guild_update(self, before, after):
+        if before.name != after.name:
+            self._notify("guild_renamed", after)
+
+    async def on_guild_channel_create(self, channel):
+        if isinstance(channel, discord.VoiceChannel):
+            self._notify("voice_channel_added", channel)
+
+    async def on_guild_channel_update(self, before, after):
+        if isinstance(after, discord.VoiceChannel) and (before.name != after.name or before.position != after.position):
+            self._notify("voice_channel_changed", after)
+
+    async def on_guild_channel_delete(self, channel):
+        self.voice_presence.remove_channel(channel)
+        if isinstance(channel, discord.VoiceChannel):
+            self._notify("voice_channel_removed", channel)
 
     async def on_voice_state_update(self, member, before, after):
-        voice_state = member.guild.voice_client
-        if voice_state is None:
+        if not self.voice_presence.update(member, before, after):
             return
 
-        if len(voice_state.channel.members) == 1 and voice_state.channel.members[0].id == self.user.id:
-            if self.bridge:
-                self.bridge._disconnecting = True
-                self.bridge.media_session_active = False
-                self.bridge.is_playing = False
-                self.bridge.stopTimerSignal.emit()
-                self.bridge.position = 0
-                self.bridge.song_title = ""
-                self.bridge.song_loaded = False
-                self.bridge.current_audio_file = None
-                self.bridge.current_url = None
-                self.bridge.placeholder_status = ""
-                self.bridge.thumbnail_url = ""
-                self.bridge.channel_name = ""
-                self.bridge.voice_connected = False
-                self.bridge._disconnecting = False
-
-            await voice_state.disconnect()
-            self.voice_client = None
+        for channel in (before.channel, after.channel):
+            if channel is not None:
+                self._notify("occupancy_changed", channel, self.voice_presence.occupancy(channel.id))
+
+        if member.id == self.user.id:
+            if before.channel is not None:
+                self._voice_channels.pop(before.channel.id, None)
+                self._cancel_auto_leave(member.guild.id)
+            if after.channel is not None:
+                self._voice_channels[after.channel.id] = member.guild.id
+                self._check_alone(after.channel.id)
+            return
+
+        for channel in (before.channel, after.channel):
+            if channel is not None and channel.id in self._voice_channels:
+                self._check_alone(channel.id)
+
+    def _check_alone(self, channel_id):
+        """Schedule leaving a channel the bot is in once no human is left in it"""
+        guild_id = self._voice_channels[channel_id]
+        if self.voice_presence.humans(channel_id) > 0:
+            self._cancel_auto_leave(guild_id)
+        elif guild_id not in self._leave_tasks:
+            delay = self.core.settings.value("autoLeaveDelay", 0, type=int) if self.core else 0
+            self._leave_tasks[guild_id] = asyncio.create_task(self._auto_leave(guild_id, channel_id, delay))
+
+    def _cancel_auto_leave(self, guild_id):
+        task = self._leave_tasks.pop(guild_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _auto_leave(self, guild_id, channel_id, delay):
+        """Leave a guild's voice channel after the grace period if it is still empty"""
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.voice_presence.humans(channel_id) > 0:
+                return
+
+            session = self.sessions.get(guild_id)
+            if self.core and session is not None:
+                await self.core.close_session(session)
+            else:
+                guild = self.get_guild(guild_id)
+                if guild and guild.voice_client:
+                    await guild.voice_client.disconnect()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self._leave_tasks.get(guild_id) is asyncio.current_task():
+                del self._leave_tasks[guild_id]
+
+    def get_session(self, guild_id, create=True):
+        """
+        Get the player session of a guild.
+
+        Args:
+            guild_id: ID of the guild
+            create: Create the session if the guild has none yet
+
+        Returns:
+            The PlayerSession, or None if it does not exist and create is False
+        """
+        session = self.sessions.get(guild_id)
+        if session is None and create:
+            guild = self.get_guild(guild_id)
+            session = PlayerSession(guild_id, guild.name if guild else "")
+            self.sessions[guild_id] = session
+            if self.core:
+                self.core.attach_session(session)
+        return session
+
+    def remove_session(self, guild_id):
+        """Drop a guild's session from the registry"""
+        session = self.sessions.pop(guild_id, None)
+        if session is not None and self.core:
+            self.core.detach_session(session)
+        return session
+
+    async def on_resumed(self):
+        self._gateway_ready.set()
+        if self.core:
+            self.core.set_status("Connected")
 
     async def on_disconnect(self):
+        self._gateway_ready.clear()
         if self._is_manually_disconnected:
             return
             
-        if self.bridge:
-            self.bridge.status = "Disconnected"
+        if self.core:
+            self.core.set_status("Disconnected")
         
         # Cancel any existing reconnect task
         if self._reconnect_task and not self._reconnect_task.done():
@@ -61,35 +196,34 @@ class BoxyBot(commands.Bot):
     async def _monitor_reconnection(self):
         """Monitor for reconnection and update status accordingly"""
         try:
-            # Wait a bit to see if we reconnect automatically
-            await asyncio.sleep(2)
-            
-            # If we're still disconnected after a short wait, show connecting status
-            if not self.is_ready() and self.bridge and not self._is_manually_disconnected:
-                self.bridge.status = "Connecting..."
-                
-            # Wait for reconnection or timeout
-            reconnect_timeout = 30  # 30 seconds timeout
-            start_time = asyncio.get_event_loop().time()
-            
-            while not self.is_ready() and not self._is_manually_disconnected:
-                current_time = asyncio.get_event_loop().time()
-                if current_time - start_time > reconnect_timeout:
-                    if self.bridge:
-                        self.bridge.status = "Connection failed"
-                    break
-                    
-                await asyncio.sleep(1)
-                
+            # Give the automatic reconnect a moment before showing it
+            if await self._wait_gateway_ready(2):
+                return
+
+            if self.core and not self._is_manually_disconnected:
+                self.core.set_status("Connecting...")
+
+            if not await self._wait_gateway_ready(28) and self.core and not self._is_manually_disconnected:
+                self.core.set_status("Connection failed")
+
         except asyncio.CancelledError:
             # Task was cancelled, which is fine
             pass
         except Exception as e:
             print(f"Error in reconnection monitor: {e}")
 
+    async def _wait_gateway_ready(self, timeout):
+        """Wait for on_ready or on_resumed, returns False on timeout"""
+        try:
+            await asyncio.wait_for(self._gateway_ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
     async def close(self):
         """Override close to mark as manually disconnected"""
         self._is_manually_disconnected = True
         if self._reconnect_task and not self._reconnect_task.done():
             self._reconnect_task.cancel()
+        self.loop_monitor.stop()
         await super().close()
\ No newline at end of file
@@ -1,16 +1,14 @@
-import asyncio
 import os
-import concurrent.futures
-import json
-import discord
-from PySide6.QtCore import QObject, Signal, Slot, Property, QTimer, QBuffer, QIODevice, QSettings
-import yt_dlp
-from youtube_search import YoutubeSearch
-
-from boxy_py.utils import get_first_video_url, create_rounded_thumbnail
+from PySide6.QtCore import QObject, Signal, Slot, Property, QTimer, QUrl
+
 import boxy_py.config as config
-from boxy_py.audio_cache import AudioCache
-from boxy_py.audio_level_source import AudioLevelSource
+import boxy_py.waveform as waveform_summary
+from boxy_py import segments
+from boxy_py.player_session import PlayerSession
+from boxy_py.utils import is_url
+from boxy_py.server_model import ServerModel, guild_snapshot, channel_snapshot
+from boxy_py.queue_model import QueueModel
+from boxy_py.thumbnails import ThumbnailStore, ThumbnailPrefetcher, thumbnail_key, PROVIDER_ID, ROW_SIZE, DEFAULT_SIZE
 
 class BotBridge(QObject):
     statusChanged = Signal(str)
@@ -18,32 +16,36 @@ class BotBridge(QObject):
     songChanged = Signal(str)
     placeholderStatusChanged = Signal(str)
     issue = Signal(str)
-    repeatModeChanged = Signal(bool)
+    repeatModeChanged = Signal(str)
+    shuffleChanged = Signal(bool)
     songLoadedChanged = Signal(bool)
     voiceConnectedChanged = Signal(bool)
-    channelsChanged = Signal(list)
     currentChannelChanged = Signal(str)
-    serversChanged = Signal(list)
     currentServerChanged = Signal(str)
     durationChanged = Signal(float)
     positionChanged = Signal(float)
     startTimerSignal = Signal()
     stopTimerSignal = Signal()
     thumbnailChanged = Signal(str)
+    waveformChanged = Signal(list)
     channelNameChanged = Signal(str)
-    titleResolved = Signal(int, str, str, str)
-    playlistLoaded = Signal(list, str)
+    playlistLoaded = Signal(str)
     playlistSaved = Signal(str)
     cacheInfoUpdated = Signal(int, int, str)
     batchDownloadProgressChanged = Signal(int, int, str)
     validTokenFormatChanged = Signal(bool)
+    loginFailed = Signal()
     urlsExtractedSignal = Signal(list)
-    itemDownloadStarted = Signal(str, int)
-    itemDownloadCompleted = Signal(str, int)
     volumeChanged = Signal(float)
     mediaSessionActiveChanged = Signal(bool)
     bulkCurrentChanged = Signal(int)
     bulkTotalChanged = Signal(int)
+    maintenanceDoneChanged = Signal(int)
+    maintenanceTotalChanged = Signal(int)
+    maintenancePausedChanged = Signal(bool)
+    localFoldersChanged = Signal(list)
+    localScanningChanged = Signal(bool)
+    localFileCountChanged = Signal(int)
     audioLevelChanged = Signal(float)
     startAudioLevelTimer = Signal()
     stopAudioLevelTimer = Signal()
@@ -53,31 +55,42 @@ class BotBridge(QObject):
     downloadProgressChanged = Signal(float)
     downloadProgressTotalChanged = Signal(float)
     bulkDownloadingChanged = Signal(bool)
+    queueIndexChanged = Signal(int)
+    nextUpIndexChanged = Signal(int)
+    previousIndexChanged = Signal(int)
+    sessionsChanged = Signal(list)
 
-    def __init__(self, bot):
+    def __init__(self, core):
         super().__init__()
-        self._settings = QSettings("Odizinne", "Boxy")
         self._media_session_active = False
-        self._status = "Connecting..."
+        self._status = core.status
         self._is_playing = False
         self._song_title = ""
         self._placeholder_status = ""
-        self._repeat_mode = False
+        self._repeat_mode = core.repeat_mode
+        self._shuffle = core.shuffle
         self._song_loaded = False
         self._voice_connected = False
-        self._channels = []
         self._current_channel = None
-        self._servers = []
+        self._server_model = ServerModel(self)
+        self.thumbnails = ThumbnailStore(os.path.join(os.path.dirname(core.audio_cache.cache_dir), "thumbnails"))
+        self.prefetcher = ThumbnailPrefetcher(self.thumbnails)
+        self._queue_model = QueueModel(self.artwork_source, self)
         self._current_server = None
         self._duration = 0
         self._position = 0
         self._current_thumbnail_url = ""
+        self._waveform = []
         self._current_channel_name = ""
         self._valid_token_format = True
         self._disconnecting = False
-        self._volume = self._settings.value("volume", 0.8, type=float)
+        self._volume = core.volume
         self._bulk_current = 0
         self._bulk_total = 0
+        self._maintenance_done, self._maintenance_total, self._maintenance_paused = core.audio_cache.maintenance.progress()
+        self._local_folders = core.local_folders()
+        self._local_scanning = False
+        self._local_file_count = 0
         self._audio_level = 0.0
         self._seeking_enabled = True
         self._resolving = False
@@ -85,14 +98,17 @@ class BotBridge(QObject):
         self._download_progress = 0.0
         self._download_progress_total = 1.0
         self._bulk_downloading = False
-
-        self.bot = bot
-        self.current_audio_file = None
-        self.current_url = None
-        self._changing_song = False
-
-        self.audio_cache = AudioCache()
-        self.max_cache_size_mb = self._settings.value("maxCacheSize", 1024, type=int)
+        self._queue_index = -1
+        self._next_up_index = -1
+        self._previous_index = -1
+        self._sessions = []
+        self._session = None
+
+        self.core = core
+        self.bot = core.bot
+        core.add_frontend(self)
+        self.loginFailed.connect(self._open_setup)
+        self.urlsExtractedSignal.connect(self._append_extracted)
 
         self._position_timer = QTimer(self)
         self._position_timer.setInterval(1000)
@@ -101,12 +117,14 @@ class BotBridge(QObject):
         self.startTimerSignal.connect(self._position_timer.start)
         self.stopTimerSignal.connect(self._position_timer.stop)
 
-        self._yt_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="yt_worker")
-
-    def __del__(self):
-        """Clean up resources when object is destroyed"""
-        if hasattr(self, "_yt_pool"):
-            self._yt_pool.shutdown(wait=False)
+        # Edits of the queue reach the sessions playing it once per event loop pass
+        self._queue_sync_timer = QTimer(self)
+        self._queue_sync_timer.setSingleShot(True)
+        self._queue_sync_timer.setInterval(0)
+        self._queue_sync_timer.timeout.connect(self._sync_queue)
+        for signal in (self._queue_model.rowsInserted, self._queue_model.rowsRemoved, self._queue_model.rowsMoved,
+                       self._queue_model.modelReset, self._queue_model.dataChanged):
+            signal.connect(self._queue_sync_timer.start)
 
     def _update_audio_level(self):
         """This is now just a fallback in case the audio source isn't providing levels"""
@@ -163,6 +181,66 @@ class BotBridge(QObject):
             self._bulk_total = value
             self.bulkTotalChanged.emit(value)
 
+    @Property(int, notify=maintenanceDoneChanged)
+    def maintenance_done(self):
+        return self._maintenance_done
+
+    @maintenance_done.setter
+    def maintenance_done(self, value):
+        if self._maintenance_done != value:
+            self._maintenance_done = value
+            self.maintenanceDoneChanged.emit(value)
+
+    @Property(int, notify=maintenanceTotalChanged)
+    def maintenance_total(self):
+        return self._maintenance_total
+
+    @maintenance_total.setter
+    def maintenance_total(self, value):
+        if self._maintenance_total != value:
+            self._maintenance_total = value
+            self.maintenanceTotalChanged.emit(value)
+
+    @Property(bool, notify=maintenancePausedChanged)
+    def maintenance_paused(self):
+        return self._maintenance_paused
+
+    @maintenance_paused.setter
+    def maintenance_paused(self, value):
+        if self._maintenance_paused != value:
+            self._maintenance_paused = value
+            self.maintenancePausedChanged.emit(value)
+
+    @Property(list, notify=localFoldersChanged)
+    def local_folders(self):
+        return self._local_folders
+
+    @local_folders.setter
+    def local_folders(self, value):
+        if self._local_folders != value:
+            self._local_folders = value
+            self.localFoldersChanged.emit(value)
+
+    @Property(bool, notify=localScanningChanged)
+    def local_scanning(self):
+        return self._local_scanning
+
+    @local_scanning.setter
+    def local_scanning(self, value):
+        if self._local_scanning != value:
+            self._local_scanning = value
+            self.localScanningChanged.emit(value)
+
+    @Property(int, notify=localFileCountChanged)
+    def local_file_count(self):
+        return self._local_file_count
+
+    @local_file_count.setter
+    def local_file_count(self, value):
+        if self._local_file_count != value:
+            self._local_file_count = value
+            self.localFileCountChanged.emit(value)
+
     @Property(bool, notify=seekingEnabledChanged)
     def seeking_enabled(self):
         return self._seeking_enabled
@@ -253,7 +331,7 @@ class BotBridge(QObject):
             self._placeholder_status = value
             self.placeholderStatusChanged.emit(value)
     
-    @Property(bool, notify=repeatModeChanged)
+    @Property(str, notify=repeatModeChanged)
     def repeat_mode(self):
         return self._repeat_mode
         
@@ -262,6 +340,16 @@ class BotBridge(QObject):
         if self._repeat_mode != value:
             self._repeat_mode = value
             self.repeatModeChanged.emit(value)
+
+    @Property(bool, notify=shuffleChanged)
+    def shuffle(self):
+        return self._shuffle
+
+    @shuffle.setter
+    def shuffle(self, value):
+        if self._shuffle != value:
+            self._shuffle = value
+            self.shuffleChanged.emit(value)
     
     @Property(bool, notify=songLoadedChanged)
     def song_loaded(self):
@@ -283,16 +371,6 @@ class BotBridge(QObject):
             self._voice_connected = value
             self.voiceConnectedChanged.emit(value)
     
-    @Property(list, notify=channelsChanged)
-    def channels(self):
-        return self._channels
-        
-    @channels.setter
-    def channels(self, value):
-        if self._channels != value:
-            self._channels = value
-            self.channelsChanged.emit(value)
-    
     @Property(str, notify=currentChannelChanged)
     def current_channel(self):
         return self._current_channel
@@ -303,15 +381,9 @@ class BotBridge(QObject):
             self._current_channel = value
             self.currentChannelChanged.emit(value)
     
-    @Property(list, notify=serversChanged)
-    def servers(self):
-        return self._servers
-        
-    @servers.setter
-    def servers(self, value):
-        if self._servers != value:
-            self._servers = value
-            self.serversChanged.emit(value)
+    @Property(QObject, constant=True)
+    def server_model(self):
+        return self._server_model
     
     @Property(str, notify=currentServerChanged)
     def current_server(self):
@@ -353,6 +425,17 @@ class BotBridge(QObject):
             self._current_thumbnail_url = value
             self.thumbnailChanged.emit(value)
     
+    @Property(list, notify=waveformChanged)
+    def waveform(self):
+        """Min/max pairs of the loaded song, scaled to -1..1, empty when not available"""
+        return self._waveform
+
+    @waveform.setter
+    def waveform(self, value):
+        if self._waveform != value:
+            self._waveform = value
+            self.waveformChanged.emit(value)
+
     @Property(str, notify=channelNameChanged)
     def channel_name(self):
         return self._current_channel_name
@@ -385,187 +468,387 @@ class BotBridge(QObject):
     def volume(self, value):
         if 0.0 <= value <= 1.0 and self._volume != value:
             self._volume = value
-            if self.bot.voice_client and self.bot.voice_client.source:
-                if hasattr(self.bot.voice_client.source, 'original') and hasattr(self.bot.voice_client.source.original, 'volume'):
-                    self.bot.voice_client.source.original.volume = value
-                elif hasattr(self.bot.voice_client.source, 'volume'):
-                    self.bot.voice_client.source.volume = value
+            self.core.set_volume(value)
             self.volumeChanged.emit(value)
 
+    @Property(int, notify=queueIndexChanged)
+    def queue_index(self):
+        return self._queue_index
+
+    @queue_index.setter
+    def queue_index(self, value):
+        if self._queue_index != value:
+            self._queue_index = value
+            self.queueIndexChanged.emit(value)
+
+    @Property(int, notify=nextUpIndexChanged)
+    def next_up_index(self):
+        return self._next_up_index
+
+    @next_up_index.setter
+    def next_up_index(self, value):
+        if self._next_up_index != value:
+            self._next_up_index = value
+            self.nextUpIndexChanged.emit(value)
+
+    @Property(int, notify=previousIndexChanged)
+    def previous_index(self):
+        return self._previous_index
+
+    @previous_index.setter
+    def previous_index(self, value):
+        if self._previous_index != value:
+            self._previous_index = value
+            self.previousIndexChanged.emit(value)
+
+    @Property(list, notify=sessionsChanged)
+    def sessions(self):
+        return self._sessions
+
+    # Core events
+
+    def on_status_changed(self, status):
+        self.status = status
+
+    def on_issue(self, message):
+        self.issue.emit(message)
+
+    def on_placeholder(self, text):
+        self.placeholder_status = text
+
+    def on_ready(self):
+        self.refresh_servers()
+
+    def on_guild_added(self, guild):
+        self._server_model.add_guild(guild_snapshot(guild, self.bot.voice_presence))
+
+    def on_guild_removed(self, guild):
+        self._server_model.remove_guild(guild.id)
+
+    def on_guild_renamed(self, guild):
+        self._server_model.rename_guild(guild.id, guild.name)
+
+    def on_voice_channel_added(self, channel):
+        self._server_model.add_channel(channel.guild.id, channel_snapshot(channel, self.bot.voice_presence))
+
+    def on_voice_channel_changed(self, channel):
+        self._server_model.change_channel(channel.guild.id, channel_snapshot(channel, self.bot.voice_presence))
+
+    def on_voice_channel_removed(self, channel):
+        self._server_model.remove_channel(channel.guild.id, channel.id)
+
+    def on_occupancy_changed(self, channel, count):
+        self._server_model.set_members(channel.guild.id, channel.id, count)
+
+    def on_sessions_changed(self):
+        self._sessions = [session.summary() for session in self.bot.sessions.values()]
+        self.sessionsChanged.emit(self._sessions)
+
+    def on_session_removed(self, session):
+        if session is self._session:
+            self._session = None
+            self.current_channel = ""
+
+    def on_session_connected(self, session):
+        if self._session is None or not self._session.is_connected():
+            self.view_session(str(session.guild_id))
+        if session is self._session:
+            self.current_channel = session.channel_id
+
+    def on_session_closing(self, session):
+        if session is self._session:
+            self._disconnecting = True
+
+    def on_session_closed(self, session):
+        if session is self._session:
+            self._disconnecting = False
+
+    def on_session_changed(self, session, changed):
+        """Mirror state changes of the viewed session into the Qt properties"""
+        if session is self._session:
+            for field, value in changed.items():
+                setattr(self, field, value)
+
+            if "is_playing" in changed:
+                if changed["is_playing"]:
+                    self.startTimerSignal.emit()
+                    self.startAudioLevelTimer.emit()
+                else:
+                    self.stopTimerSignal.emit()
+                    self.stopAudioLevelTimer.emit()
+
+            if "song_loaded" in changed:
+                self._load_waveform(session)
+
+        if "song_title" in changed or "is_playing" in changed or "voice_connected" in changed:
+            self.on_sessions_changed()
+
+    def on_download_progress(self, session, progress):
+        if session is self._session:
+            self.download_progress = progress
+            self.download_progress_total = 1.0
+
+    def on_downloading_changed(self, downloading):
+        self.downloading = downloading
+
+    def on_bulk_downloading_changed(self, downloading):
+        self.bulk_downloading = downloading
+
+    def on_bulk_progress(self, current, total):
+        self.bulk_total = total
+        self.bulk_current = current
+
+    def on_item_download_started(self, url, index):
+        self._queue_model.set_downloading(url, True)
+
+    def on_item_download_completed(self, url, index):
+        self._queue_model.set_downloading(url, False)
+
+    def on_maintenance_progress(self, done, total, paused):
+        self.maintenance_total = total
+        self.maintenance_done = done
+        self.maintenance_paused = paused
+
+    def on_local_library_changed(self, scanning, file_count):
+        self.local_file_count = file_count
+        self.local_scanning = scanning
+
+    def on_cache_changed(self, cache_info):
+        self.cacheInfoUpdated.emit(
+            cache_info['total_size'],
+            cache_info['file_count'],
+            cache_info['cache_location']
+        )
+
+    # Sessions
+
+    def _sync_from_session(self, session):
+        """Load every displayed field from the session now being viewed"""
+        self._disconnecting = True
+        try:
+            for field, default in PlayerSession.STATE_DEFAULTS.items():
+                setattr(self, field, getattr(session, field) if session else default)
+            self.audio_level = session.audio_level if session else 0.0
+            self._load_waveform(session)
+
+            if session and session.is_playing:
+                self.position = session.elapsed()
+                self.startTimerSignal.emit()
+                self.startAudioLevelTimer.emit()
+            else:
+                self.stopTimerSignal.emit()
+                self.stopAudioLevelTimer.emit()
+        finally:
+            self._disconnecting = False
+
+    @Slot(str)
+    def view_session(self, server_id):
+        """
+        Switch the session shown in the GUI to another guild. Guilds without
+        a session show none; sessions are only created on the bot loop, by
+        connecting (see on_session_connected).
+        """
+        session = self.bot.get_session(int(server_id), create=False) if server_id else None
+        self._session = session
+        self.current_server = server_id
+        self.current_channel = session.channel_id if session else ""
+        self._sync_from_session(session)
+        self.on_sessions_changed()
+
+    # Cache
+
     @Slot(result=dict)
     def get_cache_info(self):
         """Get information about the cache"""
-        total_size = 0
-        file_count = 0
-
-        for file_id, info in self.audio_cache.metadata.items():
-            total_size += info.get('file_size', 0)
-            file_count += 1
+        return self.core.get_cache_info()
 
-        return {
-            'total_size': total_size,
-            'file_count': file_count,
-            'cache_location': self.audio_cache.cache_dir
-        }
+    @Slot(result="QVariantMap")
+    def get_loop_lag_stats(self):
+        """Get event loop lag percentiles in milliseconds"""
+        return self.bot.loop_monitor.stats()
 
     @Slot()
     def clear_cache(self):
         """Clear all cache files"""
         try:
-            self.audio_cache.clear_all()
-
-            cache_info = self.get_cache_info()
-            self.cacheInfoUpdated.emit(
-                cache_info['total_size'],
-                cache_info['file_count'],
-                cache_info['cache_location']
-            )
-
+            self.core.clear_cache()
+            self.thumbnails.clear()
             return True
         except Exception as e:
             print(f"Error clearing cache: {e}")
             return False
 
+    @Slot(result=str)
+    def get_cache_directory(self):
+        """Get the audio cache directory path"""
+        return self.core.audio_cache.cache_dir
+
+    # Local library
+
+    @Slot(str)
+    def add_local_folder(self, folder):
+        """Index a folder, given as a path or as the file URL a folder dialog returns"""
+        path = QUrl(folder).toLocalFile() if folder.startswith("file:") else folder
+        if path:
+            self.core.set_local_folders(self.core.local_folders() + [path])
+            self.local_folders = self.core.local_folders()
+
     @Slot(str)
-    def delete_playlist(self, filepath):
-        """Delete a playlist file"""
+    def remove_local_folder(self, folder):
+        """Stop indexing a folder; its files leave the library, not the disk"""
+        self.core.set_local_folders([path for path in self.core.local_folders() if path != folder])
+        self.local_folders = self.core.local_folders()
+
+    @Slot()
+    def rescan_local_library(self):
+        """Look for added, changed and removed files in the local folders"""
+        self.core.rescan_local_library()
+
+    # Playlists
+
+    @Slot(int)
+    def delete_playlist(self, playlist_id):
+        """Delete a playlist from the library"""
         try:
-            os.remove(filepath)
+            self.core.delete_playlist(playlist_id)
             self.playlistSaved.emit("Playlist deleted successfully")
         except Exception as e:
             self.playlistSaved.emit(f"Error deleting playlist: {str(e)}")
 
     @Slot(result=list)
     def get_playlist_files(self):
-        """Get list of playlist files in the playlists directory"""
-        playlists_dir = self.get_playlists_directory()
-        files = []
+        """Get the playlists of the library with their size and cache state"""
+        return self.core.list_playlists()
+
+    @Slot(int, result="QVariantMap")
+    def get_playlist_readiness(self, playlist_id):
+        """Count the entries of a playlist that play without network"""
+        try:
+            return self.core.playlist_readiness(playlist_id)
+        except Exception as e:
+            print(f"Error checking playlist readiness: {e}")
+            return {}
+
+    @Slot(result="QVariantMap")
+    def get_queue_readiness(self):
+        """Count the entries of the queue that play without network"""
         try:
-            for file in os.listdir(playlists_dir):
-                if file.endswith(".json"):
-                    files.append({
-                        "name": os.path.splitext(file)[0],
-                        "filePath": os.path.join(playlists_dir, file)
-                    })
+            return self.core.readiness(self._queue_model.urls())
         except Exception as e:
-            print(f"Error reading playlist directory: {e}")
-        return files
+            print(f"Error checking queue readiness: {e}")
+            return {}
+
+    @Slot(str, result=int)
+    def chapter_count(self, url):
+        """Number of chapters of a cached video, 0 for segments and videos without chapters"""
+        if not url or segments.is_segment(url):
+            return 0
+        info = self.core.audio_cache.peek(url)
+        return len(info["chapters"]) if info else 0
+
+    @Slot(int)
+    def split_chapters(self, position):
+        """Replace a queue entry with one entry per chapter of its video"""
+        item = self._queue_model.get(position)
+        chapters = self.core.chapters(item.get("url", "")) if item else []
+        if not chapters:
+            return
+        self._queue_model.insert(position + 1, [
+            {
+                "userTyped": chapter["url"],
+                "url": chapter["url"],
+                "resolvedTitle": chapter["full_title"],
+                "channelName": item["channelName"],
+            }
+            for chapter in chapters
+        ])
+        self._queue_model.remove(position)
 
     @Slot(result=str)
     def get_playlists_directory(self):
-        """Get platform-specific directory for storing playlists"""
+        """Get the directory JSON playlists are imported from"""
         return config.get_playlists_directory()
 
-    @Slot(str, list)
-    def save_playlist(self, name, items):
-        """Save a playlist to file"""
+    @Slot(str)
+    def save_playlist(self, name):
+        """Save the queue as a playlist in the library"""
         try:
-            playlists_dir = self.get_playlists_directory()
-            playlist_file = os.path.join(playlists_dir, f"{name}.json")
-
-            with open(playlist_file, "w", encoding="utf-8") as f:
-                json.dump(items, f, ensure_ascii=False, indent=2)
-
+            self.core.save_playlist(name, self._queue_model.items())
             self.playlistSaved.emit(f"Playlist '{name}' saved successfully")
         except Exception as e:
             self.playlistSaved.emit(f"Error saving playlist: {str(e)}")
 
-    @Slot(str)
-    def load_playlist(self, filename):
-        """Load a playlist from file"""
+    @Slot(int)
+    def load_playlist(self, playlist_id):
+        """Load a playlist from the library"""
         try:
-            if filename:
-                with open(filename, "r", encoding="utf-8") as f:
-                    playlist_data = json.load(f)
-                    for item in playlist_data:
-                        if "channelName" not in item:
-                            item["channelName"] = ""
-                    playlist_name = os.path.splitext(os.path.basename(filename))[0]
-                    self.playlistLoaded.emit(playlist_data, playlist_name)
+            if playlist_id >= 0:
+                playlist_data, playlist_name = self.core.load_playlist(playlist_id)
+                self._resolve_rows(self._queue_model.reset(playlist_data))
+                self.playlistLoaded.emit(playlist_name)
+                self.prefetch_artwork([item.get("url") or "" for item in playlist_data])
         except Exception as e:
             self.playlistSaved.emit(f"Error loading playlist: {str(e)}")
 
-    async def _stop_playing_async(self):
-        """Async version of stop_playing that can be awaited"""
-        self.stopAudioLevelTimer.emit()
-        
-        if self.bot.voice_client and (self.bot.voice_client.is_playing() or self.bot.voice_client.is_paused()):
-            self.bot.voice_client.stop()
-            self.media_session_active = False
-            self.is_playing = False
-            self.stopTimerSignal.emit()
-            self.position = 0
-            self.song_title = ""
-            self.song_loaded = False
-            self.current_audio_file = None
-            self.current_url = None
-            self.placeholder_status = ""
-            self.thumbnail_url = ""
-            self.channel_name = ""
-            self.audio_level = 0
-
-            if self.bot:
-                await self.bot.change_presence(activity=None)
+    # Playback
 
     @Slot()
     def stop_playing(self):
         """Stop playback and clean up resources"""
-        asyncio.run_coroutine_threadsafe(self._stop_playing_async(), self.bot.loop)
+        self.core.submit(self.core.stop(self._session))
 
     @Slot()
     def toggle_playback(self):
         """Toggle play/pause state"""
-        asyncio.run_coroutine_threadsafe(self._toggle_playback_async(), self.bot.loop)
+        self.core.submit(self.core.toggle_playback(self._session))
 
-    async def _toggle_playback_async(self):
-        """Async version of toggle_playback that can be awaited"""
-        if not self.bot.voice_client:
-            return
+    @Slot(str)
+    def set_repeat_mode(self, mode):
+        """Set the repeat mode to off, all or one"""
+        self.core.set_repeat_mode(self._session, mode)
+        if self._session is None:
+            self.repeat_mode = self.core.repeat_mode
 
-        should_be_playing = not (self.bot.voice_client.is_playing())
-
-        if should_be_playing and self.bot.voice_client.is_paused():
-            self.bot.voice_client.resume()
-            self.is_playing = True
-            self.startAudioLevelTimer.emit()
-            self.startTimerSignal.emit()
-        elif not should_be_playing and self.bot.voice_client.is_playing():
-            self.bot.voice_client.pause()
-            self.is_playing = False
-            self.stopAudioLevelTimer.emit() 
-            self.stopTimerSignal.emit()
-            self.audio_level = 0
+    @Slot(bool)
+    def set_shuffle(self, enabled):
+        """Switch shuffling on or off"""
+        self.core.set_shuffle(self._session, enabled)
+        if self._session is None:
+            self.shuffle = enabled
+
+    @Slot()
+    def play_next(self):
+        """Skip to the next entry of the queue"""
+        self.core.submit(self.core.skip(self._session))
+
+    @Slot()
+    def play_previous(self):
+        """Go back to the entry played before the current one"""
+        self.core.submit(self.core.previous(self._session))
 
     @Slot(bool)
-    def set_repeat_mode(self, enabled):
-        """Set repeat mode on/off"""
-        self.repeat_mode = enabled
+    def set_offline_mode(self, enabled):
+        """Play from the cache only, without network"""
+        self.core.set_offline_mode(enabled)
+
+    @Slot(float)
+    def set_silence_threshold(self, threshold):
+        """Change the level below which the start and end of songs cached from now on are trimmed"""
+        self.core.set_silence_threshold(threshold)
 
     @Slot(float)
     def seek(self, position):
-        if self.bot.voice_client and (self.bot.voice_client.is_playing() or self.bot.voice_client.is_paused()):
+        session = self._session
+        if session and session.is_active():
             self.seeking_enabled = False
-            was_playing = self.bot.voice_client.is_playing()
-            position_ms = int(position * 1000)
 
             if self._position_timer.isActive():
                 self.stopTimerSignal.emit()
 
-            source = discord.FFmpegPCMAudio(
-                self.current_audio_file,
-                before_options=f"-ss {position_ms}ms"
-            )
-            volume_transformer = discord.PCMVolumeTransformer(source, volume=self._volume)
-            level_analyzer = AudioLevelSource(volume_transformer, self)
-            self.bot.voice_client.source = level_analyzer
-
-            self.position = position
+            session.seek(position)
 
-            if was_playing:
-                self.bot.voice_client.resume()
+            if session.is_playing:
                 self.startTimerSignal.emit()
-            else:
-                self.bot.voice_client.pause()
 
             self.seeking_enabled = True
 
@@ -575,496 +858,72 @@ class BotBridge(QObject):
         if not user_id or not user_id.isdigit():
             return False
 
-        user_id = int(user_id)
-
-        for guild in self.bot.guilds:
-            for voice_channel in guild.voice_channels:
-                for member in voice_channel.members:
-                    if member.id == user_id:
-                        server_id = str(guild.id)
-                        channel_id = str(voice_channel.id)
-                        self.connect_to_channel(server_id, channel_id)
-                        return True
+        channel = self.core.find_user_channel(int(user_id))
+        if channel is None:
+            return False
 
-        return False
+        self.connect_to_channel(str(channel.guild.id), str(channel.id))
+        return True
 
     @Slot(str)
     def play_url(self, url):
         """Play audio from URL or search term"""
-        async def play_wrapper():
-            self.stopTimerSignal.emit()
-            self.position = 0
-            self.duration = 0
-            if not self._current_channel or not self._current_server:
-                default_user_id = self._settings.value("autoJoinUserId", "", type=str)
-                if default_user_id and self.find_and_join_user(default_user_id):
-                    for _ in range(50): 
-                        if self.voice_connected and self.bot.voice_client and self.bot.voice_client.is_connected():
-                            break
-                        await asyncio.sleep(0.1)
-                    if not self.voice_connected:
-                        self.issue.emit("Failed to connect to voice channel")
-                        return
-                else:
-                    self.issue.emit("Please connect to a channel first")
-                    return
-            
-            selected_server = discord.utils.get(self.bot.guilds, id=int(self._current_server))
-            if not selected_server:
-                self.issue.emit("Selected server not found")
-                return
-
-            selected_channel = discord.utils.get(selected_server.voice_channels, id=int(self._current_channel))
-            if not selected_channel:
-                self.issue.emit("Selected channel not found")
-                return
-
-            if self.bot.voice_client and (self.bot.voice_client.is_playing() or self.bot.voice_client.is_paused()):
-                self._changing_song = True
-                self.bot.voice_client.stop()
-                for _ in range(30):  
-                    if not self.bot.voice_client.is_playing() and not self.bot.voice_client.is_paused():
-                        break
-                    await asyncio.sleep(0.1)
-            else:
-                self._changing_song = False
-
-            was_repeat = self.repeat_mode
-            self.repeat_mode = False
-
-            await self.play_from_gui(url)
-
-            self.repeat_mode = was_repeat
-
-            self._changing_song = False
-
-        asyncio.run_coroutine_threadsafe(play_wrapper(), self.bot.loop)
-    
-    async def play_from_gui(self, search):
-        """Download and play audio from URL or search term"""
-        if not self.bot.voice_client or not self.bot.voice_client.is_connected():
-            self.issue.emit("Not connected to voice channel")
-            return
-    
-        if self.bot.voice_client and (self.bot.voice_client.is_playing() or self.bot.voice_client.is_paused()):
-            self.bot.voice_client.stop()
-    
-        self.placeholder_status = "Preparing..."
-        self.stopTimerSignal.emit()
-        self._position = 0
-        self._song_loaded = False
-    
-        url = search if search.startswith("http") else get_first_video_url(search)
-        if url is None:
-            self.placeholder_status = "No video found"
-            return
-        
-        self.media_session_active = True
-    
-        cached = self.audio_cache.get_cached_file(url)
-        if cached:
-            audio_file, info = cached
-            await self._play_cached_file(audio_file, info, url)
-        else:
-            await self._download_and_play_file(url)
-
-    async def _play_cached_file(self, audio_file, info, url):
-        """Play a file that's already in the cache"""
-        song_name = info['title']
-        channel_name = info['channel']
-        self.duration = info['duration']
-        self.channel_name = channel_name
-        self.thumbnail_url = info['thumbnail']
-
-        self.song_title = song_name
-        self.placeholder_status = "Using cached file..."
-
-        self.current_audio_file = audio_file
-        self.current_url = url
-
-        await self._start_playback(audio_file)
-
-    async def _download_and_play_file(self, url):
-        """Download a file and add it to cache before playing"""
-        self.downloading = True
-        try:
-            import tempfile
-            temp_dir = tempfile.mkdtemp()
-            temp_file = os.path.join(temp_dir, "audio.webm")
-
-            ydl_opts = {
-                "format": "bestaudio/best",
-                "outtmpl": temp_file,
-                "noplaylist": True,
-                "progress_hooks": [self.download_hook],
-                "quiet": True,
-                "no_warnings": True
-            }
-
-            self.placeholder_status = "Extracting video info..."
-
-            loop = asyncio.get_event_loop()
-            info = await loop.run_in_executor(
-                self._yt_pool,
-                lambda: self._extract_video_info(url, ydl_opts)
-            )
-
-            song_name = info["title"]
-            channel_name = info.get("channel", "") or info.get("uploader", "")
-            self.duration = info.get("duration", 0)
-            self.channel_name = channel_name
-            self.thumbnail_url = info.get("thumbnail") or info.get("thumbnails", [{}])[0].get("url", "")
-            self.song_title = song_name
-            audio_file = self.audio_cache.add_file(url, temp_file, info)
-
-            max_cache_size_mb = self._settings.value("maxCacheSize", 1024, type=int)
-            self.audio_cache.cleanup(max_size_mb=max_cache_size_mb)
-
-            cache_info = self.get_cache_info()
-            self.cacheInfoUpdated.emit(
-                cache_info['total_size'],
-                cache_info['file_count'],
-                cache_info['cache_location']
-            )
-
-            self.current_audio_file = audio_file
-            self.current_url = url
-            self.downloading = False
-
-            await self._start_playback(audio_file)
-
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-
-        except Exception as e:
-            self.placeholder_status = f"Error: {str(e)}"
-
-    async def _start_playback(self, audio_file):
-        """Start playing an audio file"""
-        try:
-            if os.path.exists(audio_file):
-                self.placeholder_status = "Starting playback..."
-                if self.bot.voice_client:
-                    self.position = 0
-                    source = discord.FFmpegPCMAudio(audio_file)
-                    volume_transformer = discord.PCMVolumeTransformer(source, volume=self._volume)
-                    level_analyzer = AudioLevelSource(volume_transformer, self)
-
-                    self.bot.voice_client.play(
-                        level_analyzer,
-                        after=lambda e: self.on_playback_finished(e, audio_file)
-                    )
-                    self.is_playing = True
-                    self.startAudioLevelTimer.emit()  
-                    self.placeholder_status = ""
-
-                    await asyncio.sleep(0.2)
-
-                    self.song_loaded = True
-                    self.startTimerSignal.emit()
-
-                    await self.update_rich_presence()
-            else:
-                self.placeholder_status = "Error: Audio file not found"
-        except Exception as e:
-            self.placeholder_status = f"Playback error: {str(e)}"
-
-    async def update_rich_presence(self):
-        if not self.bot or not self.song_title:
-            return
-
-        if self.is_playing and self.song_title:
-            activity = discord.Activity(
-                type=discord.ActivityType.listening,
-                name=self.song_title,
-                details=f"by {self.channel_name}" if self.channel_name else None,
-                state="via Boxy Music Bot"
-            )
-
-            await self.bot.change_presence(activity=activity)
-        else:
-            await self.bot.change_presence(activity=None)
-
-    def download_hook(self, d):
-        """Progress hook for youtube-dl"""
-        if d["status"] == "downloading":
-            try:
-                downloaded = d.get("downloaded_bytes", 0)
-                total = d.get("total_bytes", 0) or d.get("total_bytes_estimate", 0)
-                if total:
-                    progress = (downloaded / total)
-                    self.download_progress = progress
-                    self.download_progress_total = 1.0
-                    self.placeholder_status = f"Downloading: {progress * 100:.1f}%"
-                else:
-                    self.placeholder_status = "Downloading..."
-            except:
-                self.placeholder_status = "Downloading..."
-                self.download_progress = 0.0
-                self.download_progress_total = 1.0
-        elif d["status"] == "finished":
-            self.placeholder_status = "Download complete, processing..."
-
-    def on_playback_finished(self, error, audio_file):
-        """Called when playback finishes"""
-        self.stopAudioLevelTimer.emit() 
+        self._play([url], 0)
 
-        if hasattr(self, '_changing_song') and self._changing_song:
-            return
+    @Slot(int)
+    def play_queue_item(self, index):
+        """Play one row of the queue in the viewed session, which then follows edits of the queue"""
+        self._play(self._queue_model.entries(), index, owner=self)
 
+    def _play(self, entries, index, owner=None):
         self.stopTimerSignal.emit()
         self.position = 0
+        self.duration = 0
+        self.core.submit(self.core.play_queue_item(self._session, entries, index, owner))
+
+    def _sync_queue(self):
+        """Pass the edited queue on to the sessions playing it"""
+        entries = None
+        for session in list(self.bot.sessions.values()):
+            if session.queue.owner is self:
+                if entries is None:
+                    entries = self._queue_model.entries()
+                session.queue.sync(entries)
 
-        if not (self.repeat_mode and audio_file == self.current_audio_file):
-            self.song_loaded = False
-            self.song_title = ""
-            self.thumbnail_url = ""
-            self.channel_name = ""
-
-        if error:
-            return
-
-        if self.repeat_mode and audio_file == self.current_audio_file:
-            asyncio.run_coroutine_threadsafe(self.replay_audio(audio_file), self.bot.loop)
-
-        if not (self.repeat_mode and audio_file == self.current_audio_file):
-            asyncio.run_coroutine_threadsafe(self.update_rich_presence(), self.bot.loop)
-
-    async def replay_audio(self, audio_file):
-        if os.path.exists(audio_file) and audio_file == self.current_audio_file:
-            self.position = 0
-            source = discord.FFmpegPCMAudio(audio_file)
-            volume_transformer = discord.PCMVolumeTransformer(source, volume=self._volume)
-            level_analyzer = AudioLevelSource(volume_transformer, self)
-
-            self.bot.voice_client.play(
-                level_analyzer,
-                after=lambda e: self.on_playback_finished(e, audio_file)
-            )
-            self.is_playing = True
-            self.startAudioLevelTimer.emit() 
-            self.startTimerSignal.emit()
-            self.song_loaded = True
-
-    async def cleanup(self):
-        """Clean up resources when application exits"""
-        self.stopAudioLevelTimer.emit() 
-        if self.bot.voice_client:
-            await self.bot.voice_client.disconnect()
-            self.bot.voice_client = None
-    
     def _update_position(self):
         """Update the position timer"""
-        if self.bot.voice_client and (self.bot.voice_client.is_playing() or self.bot.voice_client.is_paused()):
-            self.position = self._position + 1
+        session = self._session
+        if session and session.is_active():
+            self.position = session.elapsed()
         else:
             self.stopTimerSignal.emit()
             self.position = 0
-    
-    @Slot(result="QVariantMap")
-    def get_servers_with_channels(self):
-        """Get complete hierarchical structure of servers and their channels"""
-        result = {
-            "servers": [],
-            "channels": {}
-        }
-        if self.bot:
-            for guild in self.bot.guilds:
-                server_id = str(guild.id)
-                result["servers"].append({
-                    "name": guild.name,
-                    "id": server_id
-                })
-    
-                channels = []
-                for channel in guild.voice_channels:
-                    channels.append({
-                        "name": channel.name,
-                        "id": str(channel.id)
-                    })
-    
-                result["channels"][server_id] = channels
-    
-        return result
-    
-    @Slot(str)
-    def extract_urls_from_playlist(self, playlist_url):
-        """Extract video URLs from a YouTube playlist (non-blocking)"""
-        def extractor():
-            try:
-                self.placeholder_status = "Extracting playlist info..."
-    
-                urls = []
-                ydl_opts = {
-                    "quiet": True,
-                    "no_warnings": True,
-                    "extract_flat": "in_playlist",
-                    "skip_download": True,
-                    "format": None,
-                    "playlist_items": "1-100",
-                }
-    
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(playlist_url, download=False)
-    
-                    if info and "entries" in info:
-                        urls.extend([
-                            f"https://www.youtube.com/watch?v={entry['id']}"
-                            for entry in info["entries"]
-                            if entry and "id" in entry
-                        ])
-    
-                self.urlsExtractedSignal.emit(urls)
-    
-            except Exception as e:
-                self.placeholder_status = f"Error extracting playlist: {str(e)}"
-                self.urlsExtractedSignal.emit([])
-            finally:
-                self.placeholder_status = ""
-    
-        self._yt_pool.submit(extractor)
-    
-    @Slot(int, str)
-    def resolve_title(self, index, user_input):
-        """Resolve the title and channel for a YouTube URL or search term"""
-        async def resolver():
-            self.resolving = True
-            try:
-                self.placeholder_status = f"Resolving title for item {index}..."
-    
-                title_ydl_opts = {
-                    "quiet": True,
-                    "no_warnings": True,
-                    "extract_flat": True,
-                    "skip_download": True,
-                    "format": None,
-                }
-    
-                if user_input.startswith("http"):
-                    async def extract_url_info():
-                        with yt_dlp.YoutubeDL(title_ydl_opts) as ydl:
-                            return await asyncio.get_event_loop().run_in_executor(
-                                self._yt_pool, lambda: ydl.extract_info(user_input, download=False, process=False)
-                            )
-    
-                    info = await extract_url_info()
-                    if info:
-                        title = info.get("title", "Unknown Title")
-                        channel_name = info.get("channel", "") or info.get("uploader", "")
-                        self.titleResolved.emit(index, title, user_input, channel_name)
-                    else:
-                        self.titleResolved.emit(index, "Error fetching title", "", "")
-                else:
-                    async def perform_search():
-                        return await asyncio.get_event_loop().run_in_executor(
-                            self._yt_pool, lambda: YoutubeSearch(user_input, max_results=1).to_dict()
-                        )
-    
-                    results = await perform_search()
-                    if results:
-                        first_result = results[0]
-                        url = f"https://www.youtube.com{first_result['url_suffix']}"
-    
-                        async def extract_search_info():
-                            with yt_dlp.YoutubeDL(title_ydl_opts) as ydl:
-                                return await asyncio.get_event_loop().run_in_executor(
-                                    self._yt_pool, lambda: ydl.extract_info(url, download=False, process=False)
-                                )
-    
-                        info = await extract_search_info()
-                        if info:
-                            title = info.get("title", "Unknown Title")
-                            channel_name = info.get("channel", "") or info.get("uploader", "")
-                            self.titleResolved.emit(index, title, url, channel_name)
-                        else:
-                            self.titleResolved.emit(index, "Error fetching title", "", "")
-                    else:
-                        self.titleResolved.emit(index, "No video found", "", "")
-    
-                self.placeholder_status = ""
-    
-            except Exception as e:
-                self.titleResolved.emit(index, f"Error: {str(e)}", "", "")
-                self.placeholder_status = ""
 
-            self.resolving = False
-    
-        asyncio.run_coroutine_threadsafe(resolver(), self.bot.loop)
-    
+    async def cleanup(self):
+        """Clean up resources when application exits"""
+        self.stopAudioLevelTimer.emit() 
+        self.prefetcher.shutdown()
+        await self.core.cleanup()
+
+    # Servers and channels
+
     @Slot(str, str)
     def connect_to_channel(self, server_id, channel_id):
-        """Connect to the specified voice channel"""
-        async def connect_wrapper():
-            if not server_id or not channel_id:
-                print("Error: connect_to_channel called with missing server_id or channel_id")
-                return
-    
-            self.current_server = server_id
-            self.current_channel = channel_id
-    
-            selected_server = discord.utils.get(self.bot.guilds, id=int(server_id))
-            if not selected_server:
-                self.issue.emit("Selected server not found")
-                return
-    
-            selected_channel = discord.utils.get(selected_server.voice_channels, id=int(channel_id))
-            if not selected_channel:
-                self.issue.emit("Selected channel not found")
-                return
-    
-            if all(member.bot for member in selected_channel.members):
-                self.issue.emit("Cannot join empty channel")
-                return
-    
-            if self.bot.voice_client and self.bot.voice_client.is_connected():
-                if self.bot.voice_client.channel.id == int(channel_id):
-                    return
-                else:
-                    await self.bot.voice_client.disconnect()
-                    self.bot.voice_client = None
-                    self._reset_playback_state()
-    
-            try:
-                self.bot.voice_client = await selected_channel.connect()
-                self.voice_connected = True
-                self.placeholder_status = ""
-            except Exception as e:
-                self.issue.emit(f"Failed to connect: {str(e)}")
-    
-        asyncio.run_coroutine_threadsafe(connect_wrapper(), self.bot.loop)
-    
-    def _reset_playback_state(self):
-        """Reset all playback-related states"""
-        self.is_playing = False
-        self.song_loaded = False
-        self.stopTimerSignal.emit()
-        self.position = 0
-        self.song_title = ""
-        self.thumbnail_url = ""
-        self.channel_name = ""
-        self.voice_connected = False
-    
+        """Connect the session of a server to one of its voice channels"""
+        if not server_id or not channel_id:
+            print("Error: connect_to_channel called with missing server_id or channel_id")
+            return
+
+        if server_id != self.current_server:
+            self.view_session(server_id)
+        self.current_channel = channel_id
+        self.core.submit(self.core.connect(int(server_id), int(channel_id)))
+
     @Slot()
     def disconnect_voice(self):
-        """Disconnect from voice channel"""
-        self._disconnecting = True
-    
-        async def disconnect_wrapper():
-            try:
-                await self._stop_playing_async()
-    
-                if self.bot.voice_client:
-                    await self.bot.voice_client.disconnect()
-                    self.bot.voice_client = None
-                    self.voice_connected = False
-                    self._current_channel = ""
-                    self._current_server = ""
-    
-                await asyncio.sleep(0.2)
-            finally:
-                self._disconnecting = False
-    
-        asyncio.run_coroutine_threadsafe(disconnect_wrapper(), self.bot.loop)
+        """Disconnect the viewed session from its voice channel"""
+        if self._session is not None:
+            self.core.submit(self.core.close_session(self._session))
     
     @Slot(result=str)
     def get_invitation_link(self):
@@ -1078,168 +937,129 @@ class BotBridge(QObject):
             return ""
     
     @Slot()
-    def update_servers(self):
-        """Update the list of available servers"""
+    def refresh_servers(self):
+        """Rebuild the server model from the guild cache"""
         if self.bot:
-            self.servers = [{"name": guild.name, "id": str(guild.id)} for guild in self.bot.guilds]
+            presence = self.bot.voice_presence
+            self._server_model.reset([guild_snapshot(guild, presence) for guild in self.bot.guilds])
+
+    # Resolving and downloading
+
+    @Slot(str)
+    def extract_urls_from_playlist(self, playlist_url):
+        """Extract video URLs from a YouTube playlist (non-blocking)"""
+        async def extractor():
+            try:
+                self.placeholder_status = "Extracting playlist info..."
+                urls = await self.core.extract_playlist_urls(playlist_url)
+                self.urlsExtractedSignal.emit(urls)
+            except Exception as e:
+                self.placeholder_status = f"Error extracting playlist: {str(e)}"
+                self.urlsExtractedSignal.emit([])
+            finally:
+                self.placeholder_status = ""
     
-    @Slot()
-    def update_channels(self):
-        """Update the list of available voice channels"""
-        if not self.bot or not self.current_server:
-            self.channels = []
-        else:
-            server = discord.utils.get(self.bot.guilds, id=int(self.current_server))
-            if server:
-                self.channels = [{"name": channel.name, "id": str(channel.id)} for channel in server.voice_channels]
-            else:
-                self.channels = []
+        self.core.submit(extractor())
     
-    @Slot(result=str)
-    def get_cache_directory(self):
-        """Get the audio cache directory path"""
-        return self.audio_cache.cache_dir
+    @Slot(str)
+    def add_to_queue(self, user_input):
+        """Append a URL or search term to the queue and resolve its title"""
+        if user_input.strip():
+            self._resolve_rows(self._queue_model.append([{"userTyped": user_input.strip()}]))
+
+    def _append_extracted(self, urls):
+        self._resolve_rows(self._queue_model.append([{"userTyped": url} for url in urls]))
+
+    def _resolve_rows(self, rows):
+        for row_id, user_input in rows:
+            self.core.submit(self._resolve_row(row_id, user_input))
+
+    async def _resolve_row(self, row_id, user_input):
+        """Resolve the title and channel of a queue row for a YouTube URL or search term"""
+        self.resolving = True
+        try:
+            self.placeholder_status = "Resolving title..."
+            title, url, channel_name = await self.core.resolve(user_input)
+            self._queue_model.set_resolved(row_id, title, url, channel_name)
+            if url:
+                self.prefetcher.prefetch([self._artwork_key(url)], ROW_SIZE)
+            self.placeholder_status = ""
+        except Exception as e:
+            self._queue_model.set_resolved(row_id, f"Error: {str(e)}", "", "")
+            self.placeholder_status = ""
+
+        self.resolving = False
     
+    @Slot(str, result=list)
+    def search_cache(self, text):
+        """Cached files matching what is typed in the input box"""
+        if len(text.strip()) < 2 or is_url(text):
+            return []
+        try:
+            return self.core.library.search(text, limit=6)
+        except Exception as e:
+            print(f"Error searching cache: {e}")
+            return []
+
     @Slot("QVariantList")
     def download_all_playlist_items(self, urls):
         """Download all playlist items to cache with parallel processing based on user settings"""
-        async def downloader():
-            self.bulk_downloading = True
-            cached_count = 0
-            non_cached_urls = []
-            for i, url in enumerate(urls):
-                if self.audio_cache.get_cached_file(url) is not None:
-                    cached_count += 1
-                else:
-                    non_cached_urls.append((i, url))
-    
-            non_cached_total = len(non_cached_urls)
-    
-            if non_cached_total == 0:
-                self.placeholder_status = "All items already cached"
-                self.bulk_downloading = False
-                return
-    
-            self.bulk_current = 0
-            self.bulk_total = non_cached_total
-            self.placeholder_status = "Downloading playlist items..."
-    
-            max_parallel_downloads = self._settings.value("maxParallelDownloads", 3, type=int)
-            downloaded_count = 0
-            semaphore = asyncio.Semaphore(max_parallel_downloads)
-            download_tasks = []
-    
-            async def download_item(url_index, url):
-                nonlocal downloaded_count
-                idx, current_url = url_index, url
-    
-                async with semaphore:
-                    try:
-                        self.itemDownloadStarted.emit(current_url, idx)
-    
-                        import tempfile
-                        temp_dir = tempfile.mkdtemp()
-                        temp_path = os.path.join(temp_dir, "audio.webm")
-    
-                        ydl_opts = {
-                            "format": "bestaudio/best",
-                            "outtmpl": temp_path,
-                            "noplaylist": True,
-                            "quiet": True,
-                            "no_warnings": True
-                        }
-    
-                        loop = asyncio.get_event_loop()
-                        info = await loop.run_in_executor(
-                            self._yt_pool,
-                            lambda: self._extract_video_info(current_url, ydl_opts)
-                        )
-    
-                        if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
-                            cached_path = self.audio_cache.add_file(current_url, temp_path, info)
-                        else:
-                            print(f"Error: Downloaded file is missing or empty: {temp_path}")
-    
-                        import shutil
-                        shutil.rmtree(temp_dir, ignore_errors=True)
-    
-                    except Exception as e:
-                        print(f"Error downloading {current_url}: {str(e)}")
-                    finally:
-                        self.itemDownloadCompleted.emit(current_url, idx)
-                        downloaded_count += 1
-                        self.bulk_current = downloaded_count
-                        max_cache_size_mb = self._settings.value("maxCacheSize", 1024, type=int)
-                        self.audio_cache.cleanup(max_size_mb=max_cache_size_mb)
-                        cache_info = self.get_cache_info()
-                        self.cacheInfoUpdated.emit(
-                            cache_info['total_size'],
-                            cache_info['file_count'],
-                            cache_info['cache_location']
-                        )
-    
-            for url_index, url in non_cached_urls:
-                download_tasks.append(download_item(url_index, url))
-    
-            await asyncio.gather(*download_tasks)
-            self.placeholder_status = "Download complete!"
-            self.bulk_downloading = False
-    
-        asyncio.run_coroutine_threadsafe(downloader(), self.bot.loop)
-    
-    def _extract_video_info(self, url, ydl_opts):
-        """Helper method to run yt_dlp in thread pool"""
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            return ydl.extract_info(url, download=True)
-    
-    @Slot(str, int, int, result=str)
-    def process_thumbnail(self, url, size=96, corner_radius=6):
-        """
-        Process a thumbnail image to be square with rounded corners.
-        Returns a data URL for use in QML.
-    
-        Args:
-            url (str): URL or path of the image
-            size (int): Size of the output square image
-            corner_radius (int): Radius of the rounded corners
-    
-        Returns:
-            str: Data URL containing the processed image
-        """
-        if not url or url.startswith("data:"):
-            return url  
-    
-        if url.startswith("http"):
-            import tempfile
-            import requests
-    
-            try:
-                response = requests.get(url, timeout=5)
-                if response.status_code != 200:
-                    return ""
-    
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-                    tmp.write(response.content)
-                    tmp_path = tmp.name
-    
-                processed = create_rounded_thumbnail(tmp_path, size, corner_radius)
-                os.unlink(tmp_path) 
-    
-            except Exception as e:
-                print(f"Error downloading image: {e}")
-                return ""
-        else:
-            processed = create_rounded_thumbnail(url, size, corner_radius)
-    
-        if processed is None:
+        self.core.submit(self.core.download_all(urls))
+    
+    @Property(QObject, constant=True)
+    def queue_model(self):
+        return self._queue_model
+
+    @Property(int, constant=True)
+    def artwork_size(self):
+        return ROW_SIZE
+
+    def _artwork_key(self, video_url):
+        """Key of a video's artwork, registering the cached thumbnail URL if there is one"""
+        key = thumbnail_key(video_url)
+        info = self.core.audio_cache.peek(video_url) if video_url else None
+        if info and info.get("thumbnail"):
+            self.thumbnails.register(info["thumbnail"], key)
+        return key
+
+    @Slot(str, result=str)
+    def artwork_source(self, video_url):
+        """Image source of the artwork of a playlist entry"""
+        if not video_url:
             return ""
-    
-        buffer = QBuffer()
-        buffer.open(QIODevice.WriteOnly)
-        processed.save(buffer, "PNG")
-        image_data = buffer.data().toBase64().data().decode("ascii")
-    
-        return f"data:image/png;base64,{image_data}"
+        return f"image://{PROVIDER_ID}/{self._artwork_key(video_url)}"
+
+    @Slot("QVariantList")
+    def prefetch_artwork(self, urls):
+        """Render the row artwork of a whole list in the background"""
+        keys = [self._artwork_key(url) for url in urls if url]
+        self.prefetcher.prefetch(keys, ROW_SIZE, replace=True)
+
+    def _load_waveform(self, session):
+        """Show the waveform of the session's song; missing ones get analyzed and arrive through on_file_analyzed"""
+        peaks = None
+        if session and session.song_loaded and session.current_url:
+            peaks = self.core.waveform(session.current_url)
+        self.waveform = waveform_summary.normalized(peaks) if peaks is not None else []
+
+    def on_file_analyzed(self, url):
+        session = self._session
+        if session and session.song_loaded and segments.media_url(session.current_url) == url:
+            self._load_waveform(session)
+
+    def on_file_cached(self, url, info):
+        key = thumbnail_key(url)
+        if info and info.get("thumbnail"):
+            self.thumbnails.register(info["thumbnail"], key)
+        self.prefetcher.prefetch([key], ROW_SIZE)
+        self.prefetcher.prefetch([key], DEFAULT_SIZE)
+
+    @Slot(str, result=str)
+    def thumbnail_source(self, image_url):
+        """Image source serving a thumbnail through the async image provider"""
+        if not image_url:
+            return ""
+        return f"image://{PROVIDER_ID}/{self.thumbnails.register(image_url)}"
     
     @Slot(str)
     def save_token(self, token):
@@ -1255,16 +1075,25 @@ class BotBridge(QObject):
         QTimer.singleShot(0, self.restart_application)
     
     @Slot()
-    def restart_application(self):
+    def restart_application(self, *extra_args):
         """Restart the application"""
         import sys
         import os
     
         python = sys.executable
         script = os.path.abspath(sys.argv[0])
-        args = sys.argv[1:]
+        args = [arg for arg in sys.argv[1:] if arg not in extra_args] + list(extra_args)
     
         os.execl(python, python, script, *args)
+
+    def on_login_failed(self):
+        """Called from the bot thread when Discord rejected the token"""
+        self.valid_token_format = False
+        self.loginFailed.emit()
+
+    @Slot()
+    def _open_setup(self):
+        self.restart_application("--force-setup")
         
     @Slot(result=str)
     def get_token(self):
@@ -1,6 +1,9 @@
 import os
 import platform
 
+# JSON files in the config directory that are not playlists
+CONFIG_FILES = {"metadata.json", "settings.json", "startup_state.json"}
+
 def get_config_directory():
     """Get platform-specific config directory"""
     system = platform.system()
@@ -56,7 +59,7 @@ def migrate_playlists_if_needed():
     
     try:
         for file in os.listdir(config_dir):
-            if file.endswith(".json") and file != "metadata.json":
+            if file.endswith(".json") and file not in CONFIG_FILES:
                 old_path = os.path.join(config_dir, file)
                 new_path = os.path.join(playlist_dir, file)
                 
@@ -65,4 +68,16 @@ def migrate_playlists_if_needed():
                     shutil.move(old_path, new_path)
                     print(f"Migrated playlist: {file}")
     except Exception as e:
-        print(f"Error during playlist migration: {e}")
\ No newline at end of file
+        print(f"Error during playlist migration: {e}")
+
+def load_token():
+    """Read the saved bot token, or None if there is no usable token"""
+    token_path = get_token_path()
+    if not os.path.exists(token_path):
+        return None
+
+    with open(token_path, "r") as f:
+        token = f.read().strip()
+    if token == "" or token == "REPLACE_THIS_WITH_YOUR_BOT_TOKEN":
+        return None
+    return token
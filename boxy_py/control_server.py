@@ -0,0 +1,212 @@
+import asyncio
+import json
+
+from boxy_py.queue_engine import REPEAT_MODES
+
+
+class ControlServer:
+    """
+    Local control socket for driving Boxy without a GUI.
+
+    Clients connect over TCP on localhost and send one JSON object per line,
+    for example {"command": "play", "guild": 1234, "query": "tavern music"}.
+    Every request gets one JSON line back with an "ok" field. The guild can
+    be omitted when exactly one session exists.
+    """
+    def __init__(self, core, host="127.0.0.1", port=8765):
+        self.core = core
+        self.host = host
+        self.port = port
+        self._server = None
+        self._commands = {
+            "status": self._status,
+            "join": self._join,
+            "leave": self._leave,
+            "play": self._play,
+            "pause": self._pause,
+            "stop": self._stop,
+            "skip": self._skip,
+            "previous": self._previous,
+            "volume": self._volume,
+            "repeat": self._repeat,
+            "shuffle": self._shuffle,
+            "offline": self._offline,
+            "readiness": self._readiness,
+            "chapters": self._chapters,
+            "local": self._local,
+            "layer": self._layer,
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        print(f"Control socket listening on {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_line(line)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line):
+        """Execute one JSON request and return the response dictionary"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return {"ok": False, "error": f"Invalid JSON: {e}"}
+
+        handler = self._commands.get(request.get("command"))
+        if handler is None:
+            return {"ok": False, "error": f"Unknown command, expected one of {sorted(self._commands)}"}
+
+        try:
+            result = await handler(request)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, **(result or {})}
+
+    def _session(self, request, create=False):
+        guild = request.get("guild")
+        if guild is not None:
+            session = self.core.bot.get_session(int(guild), create=create)
+        elif len(self.core.bot.sessions) == 1:
+            session = next(iter(self.core.bot.sessions.values()))
+        else:
+            session = None
+
+        if session is None and not create:
+            raise ValueError("No matching session, pass a guild ID")
+        return session
+
+    async def _status(self, request):
+        return {
+            "status": self.core.status,
+            "volume": self.core.volume,
+            "sessions": [
+                {**session.summary(), "position": session.elapsed(), "duration": session.duration,
+                 "queue_index": session.queue_index, "queue_length": len(session.queue),
+                 "next_up_index": session.next_up_index, "repeat": session.repeat_mode, "shuffle": session.shuffle}
+                for session in self.core.bot.sessions.values()
+            ],
+            "offline": self.core.offline_mode(),
+            "maintenance": dict(zip(("done", "total", "paused"), self.core.audio_cache.maintenance.progress())),
+        }
+
+    async def _join(self, request):
+        session = await self.core.connect(int(request["guild"]), int(request["channel"]))
+        if session is None:
+            raise RuntimeError("Could not join the channel")
+        return {"session": session.summary()}
+
+    async def _leave(self, request):
+        await self.core.close_session(self._session(request))
+
+    async def _play(self, request):
+        if "urls" in request:
+            urls = list(request["urls"])
+            index = int(request.get("index", 0))
+        else:
+            urls = [request["query"]]
+            index = 0
+
+        session = self._session(request, create=True) if request.get("guild") is not None else self._optional_session()
+        session = await self.core.play_queue_item(session, urls, index)
+        if session is None:
+            raise RuntimeError("Not connected to a voice channel")
+        return {"session": session.summary()}
+
+    def _optional_session(self):
+        sessions = list(self.core.bot.sessions.values())
+        return sessions[0] if len(sessions) == 1 else None
+
+    async def _pause(self, request):
+        await self.core.toggle_playback(self._session(request))
+
+    async def _stop(self, request):
+        await self.core.stop(self._session(request))
+
+    async def _skip(self, request):
+        await self.core.skip(self._session(request))
+
+    async def _previous(self, request):
+        await self.core.previous(self._session(request))
+
+    async def _volume(self, request):
+        self.core.set_volume(float(request["value"]))
+        return {"volume": self.core.volume}
+
+    async def _repeat(self, request):
+        session = self._session(request)
+        if "mode" in request:
+            mode = request["mode"]
+        else:
+            # Cycle off -> all -> one like the repeat button
+            mode = REPEAT_MODES[(REPEAT_MODES.index(session.repeat_mode) + 1) % len(REPEAT_MODES)]
+        if mode not in REPEAT_MODES:
+            raise ValueError(f"Repeat mode must be one of {', '.join(REPEAT_MODES)}")
+        self.core.set_repeat_mode(session, mode)
+        return {"repeat": session.repeat_mode}
+
+    async def _shuffle(self, request):
+        session = self._session(request)
+        self.core.set_shuffle(session, bool(request.get("enabled", not session.shuffle)))
+        return {"shuffle": session.shuffle}
+
+    async def _offline(self, request):
+        self.core.set_offline_mode(bool(request.get("enabled", not self.core.offline_mode())))
+        return {"offline": self.core.offline_mode()}
+
+    async def _readiness(self, request):
+        if "playlist" in request:
+            playlist = request["playlist"]
+            playlist_id = playlist if isinstance(playlist, int) else self.core.library.playlist_id(playlist)
+            if playlist_id is None or self.core.library.playlist_name(playlist_id) is None:
+                raise ValueError(f"No playlist {playlist!r}")
+            return self.core.playlist_readiness(playlist_id)
+        return self.core.readiness(self._session(request).queue.sources())
+
+    async def _chapters(self, request):
+        url = request.get("url") or self._session(request).current_url
+        if not url:
+            raise ValueError("Nothing is playing, pass a url")
+        return {"chapters": self.core.chapters(url)}
+
+    async def _layer(self, request):
+        session = self._session(request)
+        if "source" in request:
+            fade = float(request.get("fade", 0))
+            if request.get("remove"):
+                if not self.core.remove_layer(session, request["source"], fade):
+                    raise ValueError(f"No layer {request['source']!r}")
+            elif self.core.set_layer(session, request["source"], float(request.get("volume", 1.0)), fade,
+                                     bool(request.get("loop", True))) is None:
+                raise ValueError(f"{request['source']!r} is not cached")
+        return {"layers": session.layers()}
+
+    async def _local(self, request):
+        if "folders" in request:
+            if not isinstance(request["folders"], list):
+                raise ValueError("folders must be a list of paths")
+            self.core.set_local_folders(request["folders"])
+        elif request.get("rescan"):
+            self.core.rescan_local_library()
+        return {
+            "folders": self.core.local_folders(),
+            "scanning": self.core.local_library.scanning,
+            "files": len(self.core.audio_cache.local_files()),
+        }
@@ -0,0 +1,945 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import concurrent.futures
+import importlib
+import discord
+
+from boxy_py.utils import get_first_video_url, is_url
+from boxy_py import segments
+from boxy_py.audio_cache import AudioCache
+from boxy_py.library import PlaylistLibrary
+from boxy_py.local_library import LocalLibrary, is_local_url
+from boxy_py.loudness import track_gain
+from boxy_py.waveform import SILENCE_THRESHOLD
+from boxy_py.queue_engine import REPEAT_OFF, REPEAT_ONE, REPEAT_MODES
+from boxy_py.startup_state import StartupState
+
+
+class BoxyCore:
+    """
+    UI-independent playback, download and cache logic.
+
+    Front-ends (the Qt bridge, the control socket, slash commands) call the
+    methods of the core and register themselves with add_frontend() to be
+    told about state changes. A front-end implements whichever on_<event>
+    methods it cares about; events without a handler are ignored.
+    """
+    def __init__(self, bot, settings, startup_state=None):
+        """
+        Initialize the core.
+
+        Args:
+            bot: The BoxyBot instance
+            settings: Settings store with value(key, default, type=...) and setValue(key, value)
+            startup_state: Optional shared StartupState, created when omitted
+        """
+        self.bot = bot
+        self.settings = settings
+        self.startup_state = startup_state or StartupState()
+        self.frontends = []
+        self.status = "Connecting..."
+        self.volume = settings.value("volume", 0.8, type=float)
+        self.repeat_mode = settings.value("repeatMode", REPEAT_OFF, type=str)
+        if self.repeat_mode not in REPEAT_MODES:
+            self.repeat_mode = REPEAT_OFF
+        self.shuffle = settings.value("shuffle", False, type=bool)
+        self._preloads = {}
+
+        self.audio_cache = AudioCache()
+        self.library = PlaylistLibrary(self.audio_cache)
+        self.audio_cache.on_analyzed = lambda url: self.notify("file_analyzed", url)
+        self.audio_cache.maintenance.listener = lambda *progress: self.notify("maintenance_progress", *progress)
+        self.audio_cache.silence_threshold = settings.value("silenceThreshold", SILENCE_THRESHOLD, type=float)
+        self.local_library = LocalLibrary(self.audio_cache, settings.value("localFolders", [], type=list))
+        self.local_library.listener = lambda *state: self.notify("local_library_changed", *state)
+        self._yt_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="yt_worker")
+
+        bot.core = self
+
+    def add_frontend(self, frontend):
+        self.frontends.append(frontend)
+
+    def notify(self, event, *args):
+        """Call on_<event>(*args) on every front-end that handles it"""
+        for frontend in self.frontends:
+            handler = getattr(frontend, f"on_{event}", None)
+            if handler is not None:
+                handler(*args)
+
+    def submit(self, coro):
+        """Schedule a coroutine on the bot loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.bot.loop)
+
+    def shutdown(self):
+        self._yt_pool.shutdown(wait=False)
+        self.local_library.close()
+        self.audio_cache.close()
+        self.library.close()
+
+    def warm_up(self):
+        """
+        Load what startup skipped in the background: yt-dlp, the search
+        module, the cache index and the playlist library, then rescan the
+        local folders. Anything used before this finished is loaded on
+        demand instead.
+        """
+        def load():
+            for module in ("yt_dlp", "youtube_search"):
+                importlib.import_module(module)
+            self.audio_cache.load()
+            self.audio_cache.start_maintenance()
+            self.library.list_playlists()
+            self.local_library.scan()
+
+        self._yt_pool.submit(load)
+
+    async def on_ready(self):
+        """Called by the bot once the gateway session is ready"""
+        self.startup_state.record_token(self.bot.http.token)
+        self.warm_up()
+        await self.update_rich_presence()
+        self.set_status("Connected")
+        self.notify("ready")
+
+    def set_status(self, status):
+        if self.status != status:
+            self.status = status
+            self.notify("status_changed", status)
+
+    # Sessions
+
+    def attach_session(self, session):
+        """Called by the bot when a guild session is created"""
+        session.listener = self._on_session_changed
+        session.volume = self.volume
+        session.queue.set_repeat(self.repeat_mode)
+        session.queue.set_shuffle(self.shuffle)
+        self.notify("sessions_changed")
+
+    def detach_session(self, session):
+        """Called by the bot when a guild session is removed"""
+        session.listener = None
+        self.notify("session_removed", session)
+        self.notify("sessions_changed")
+        self._pause_maintenance()
+
+    def _on_session_changed(self, session, changed):
+        self.notify("session_changed", session, changed)
+        if "next_up_index" in changed and session.song_loaded:
+            self._preload_next(session)
+        if "is_playing" in changed:
+            self._pause_maintenance()
+
+    def _pause_maintenance(self):
+        """Leave the cores to playback while any guild streams, cache maintenance waits"""
+        self.audio_cache.maintenance.paused = any(s.is_playing for s in self.bot.sessions.values())
+
+    def set_volume(self, value):
+        if 0.0 <= value <= 1.0 and self.volume != value:
+            self.volume = value
+            for session in self.bot.sessions.values():
+                session.volume = value
+            self.settings.setValue("volume", value)
+
+    def set_repeat_mode(self, session, mode):
+        """Set the repeat mode of a session and the default for new sessions"""
+        if mode not in REPEAT_MODES:
+            return
+        self.repeat_mode = mode
+        self.settings.setValue("repeatMode", mode)
+        if session is not None:
+            session.queue.set_repeat(mode)
+
+    def set_shuffle(self, session, enabled):
+        """Switch shuffling of a session on or off and make it the default for new sessions"""
+        self.shuffle = enabled
+        self.settings.setValue("shuffle", enabled)
+        if session is not None:
+            session.queue.set_shuffle(enabled)
+
+    def offline_mode(self):
+        """Whether playback must stay off the network and use the cache only"""
+        return self.settings.value("offlineMode", False, type=bool)
+
+    def set_offline_mode(self, enabled):
+        self.settings.setValue("offlineMode", enabled)
+
+    def set_silence_threshold(self, threshold):
+        """Level in dBFS below which songs analyzed from now on are trimmed"""
+        self.settings.setValue("silenceThreshold", threshold)
+        self.audio_cache.silence_threshold = threshold
+
+    def find_user_channel(self, user_id):
+        """Find the voice channel a user is currently in, or None"""
+        channel_id = self.bot.voice_presence.channel_of(user_id)
+        if channel_id is None:
+            return None
+        return self.bot.get_channel(channel_id)
+
+    async def connect(self, guild_id, channel_id):
+        """
+        Connect the session of a guild to one of its voice channels.
+
+        Returns:
+            The connected PlayerSession, or None if the connection failed
+        """
+        selected_server = self.bot.get_guild(guild_id)
+        if not selected_server:
+            self.notify("issue", "Selected server not found")
+            return None
+
+        selected_channel = discord.utils.get(selected_server.voice_channels, id=channel_id)
+        if not selected_channel:
+            self.notify("issue", "Selected channel not found")
+            return None
+
+        if self.bot.voice_presence.humans(channel_id) == 0:
+            self.notify("issue", "Cannot join empty channel")
+            return None
+
+        session = self.bot.get_session(guild_id)
+        if session.is_connected():
+            if session.voice_client.channel.id == channel_id:
+                return session
+            await session.disconnect()
+
+        try:
+            session.voice_client = await selected_channel.connect()
+            session.channel_id = str(channel_id)
+            session.update(voice_connected=True, placeholder_status="")
+            self.notify("session_connected", session)
+            return session
+        except Exception as e:
+            self.notify("issue", f"Failed to connect: {str(e)}")
+            return None
+
+    async def auto_join(self):
+        """Join the voice channel of the configured auto-join user, if any"""
+        user_id = self.settings.value("autoJoinUserId", "", type=str)
+        if not user_id or not user_id.isdigit():
+            return None
+
+        channel = self.find_user_channel(int(user_id))
+        if channel is None:
+            return None
+        return await self.connect(channel.guild.id, channel.id)
+
+    async def close_session(self, session):
+        """Leave the voice channel of a session and drop it from the registry"""
+        self.notify("session_closing", session)
+        try:
+            await session.disconnect()
+        finally:
+            self.notify("session_closed", session)
+        self.bot.remove_session(session.guild_id)
+        await self.update_rich_presence()
+
+    # Playback
+
+    async def stop(self, session):
+        if session is not None and session.is_active():
+            session.stop()
+            session.reset_playback()
+            await self.update_rich_presence(session)
+
+    async def toggle_playback(self, session):
+        if session is None or not session.voice_client:
+            return
+
+        if session.voice_client.is_paused():
+            session.resume()
+        elif session.voice_client.is_playing():
+            session.pause()
+
+    async def skip(self, session):
+        """Play the next entry of the session's queue, or stop at the end"""
+        if session is None:
+            return
+        source = session.queue.advance(manual=True)
+        if source is not None:
+            await self._switch_to(session, source)
+        else:
+            await self.stop(session)
+
+    async def previous(self, session):
+        """Play the entry played before the current one"""
+        if session is None:
+            return
+        source = session.queue.previous()
+        if source is not None:
+            await self._switch_to(session, source)
+
+    async def play_queue_item(self, session, entries, index, owner=None):
+        """
+        Play one entry of a queue in a session.
+
+        If the session is not connected, the auto-join user is looked up
+        and the session of their guild is used instead.
+
+        Args:
+            session: Session to play in, or None
+            entries: URLs or search terms, or (key, source) pairs with keys
+                that stay the same when the queue is edited
+            index: Position of the entry to play
+            owner: Front-end that keeps the queue in sync, if any
+
+        Returns:
+            The session that is playing, or None
+        """
+        if session is None or not session.is_connected():
+            session = await self.auto_join()
+            if session is None:
+                self.notify("issue", "Please connect to a channel first")
+                return None
+
+        source = session.queue.load(entries, index, owner)
+        if source is None:
+            return session
+
+        await self._switch_to(session, source)
+        return session
+
+    async def _switch_to(self, session, source):
+        """Stop what a session plays without advancing its queue, then play a source"""
+        if session.is_active():
+            session.changing_song = True
+            session.voice_client.stop()
+            await session.wait_stopped()
+        else:
+            session.changing_song = False
+
+        await self.play_from_gui(session, source)
+
+        session.changing_song = False
+
+    async def play_from_gui(self, session, search):
+        """Download and play audio from URL or search term"""
+        if not session.is_connected():
+            self.notify("issue", "Not connected to voice channel")
+            return
+
+        session.stop()
+        session.update(placeholder_status="Preparing...", position=0, song_loaded=False)
+
+        if self.offline_mode():
+            await self._play_offline(session, search)
+            return
+
+        url = search
+        if not is_url(search):
+            loop = asyncio.get_event_loop()
+            url = await loop.run_in_executor(self._yt_pool, get_first_video_url, search)
+        if url is None:
+            session.update(placeholder_status="No video found")
+            return
+
+        session.update(media_session_active=True)
+
+        preload = self._preloads.get(segments.media_url(url))
+        if preload is not None:
+            session.update(placeholder_status="Finishing preload...")
+            try:
+                await asyncio.shield(preload)
+            except Exception:
+                pass
+
+        cached = self.audio_cache.get_cached_file(url)
+        if cached:
+            audio_file, info = cached
+            await self._play_cached_file(session, audio_file, info, url)
+        elif is_local_url(url):
+            session.update(placeholder_status="Local file is not in the library", media_session_active=False)
+        else:
+            await self._download_and_play_file(session, url)
+
+    async def _play_offline(self, session, search):
+        """
+        Play from the cache only. Search terms are looked up in the cache
+        index, and entries that are not cached are skipped by moving on in
+        the queue, at most once around it.
+        """
+        for _ in range(max(len(session.queue), 1)):
+            url = search if is_url(search) else self._cached_url(search)
+            cached = self.audio_cache.get_cached_file(url) if url else None
+            if cached:
+                audio_file, info = cached
+                session.update(media_session_active=True)
+                await self._play_cached_file(session, audio_file, info, url)
+                return
+
+            search = session.queue.advance(manual=True)
+            if search is None:
+                break
+
+        session.update(placeholder_status="Nothing cached to play offline", media_session_active=False)
+
+    def _cached_url(self, text):
+        """URL of the cached file best matching a search term, or None"""
+        matches = self.library.search(text, limit=1, playlists=False, fuzzy=False)
+        return matches[0]["url"] if matches else None
+
+    async def _play_cached_file(self, session, audio_file, info, url):
+        """Play a file that's already in the cache"""
+        session.update(
+            duration=segments.length(url, info['duration']),
+            channel_name=info['channel'],
+            thumbnail_url=info['thumbnail'],
+            song_title=segments.title(info['title'], info['chapters'], url),
+            placeholder_status="Using cached file..."
+        )
+        session.current_url = url
+
+        await self._start_playback(session, audio_file)
+
+    async def _download_and_play_file(self, session, url):
+        """Download a file and add it to cache before playing"""
+        self.notify("downloading_changed", True)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            temp_file = os.path.join(temp_dir, "audio.webm")
+
+            ydl_opts = {
+                "format": "bestaudio/best",
+                "outtmpl": temp_file,
+                "noplaylist": True,
+                "progress_hooks": [lambda d: self.download_hook(d, session)],
+                "quiet": True,
+                "no_warnings": True
+            }
+
+            session.update(placeholder_status="Extracting video info...")
+
+            loop = asyncio.get_event_loop()
+            info = await loop.run_in_executor(
+                self._yt_pool,
+                lambda: self._extract_video_info(url, ydl_opts)
+            )
+
+            session.update(
+                song_title=segments.title(info["title"], segments.chapters_from_info(info), url),
+                channel_name=info.get("channel", "") or info.get("uploader", ""),
+                duration=segments.length(url, info.get("duration") or 0),
+                thumbnail_url=info.get("thumbnail") or info.get("thumbnails", [{}])[0].get("url", "")
+            )
+            audio_file = self.audio_cache.add_file(url, temp_file, info)
+            self.notify("file_cached", url, self.audio_cache.peek(url))
+
+            self.enforce_cache_limit()
+
+            session.current_url = url
+            self.notify("downloading_changed", False)
+
+            await self._start_playback(session, audio_file)
+
+        except Exception as e:
+            self.notify("downloading_changed", False)
+            session.update(placeholder_status=f"Error: {str(e)}")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    async def _start_playback(self, session, audio_file):
+        """Start playing an audio file"""
+        try:
+            if os.path.exists(audio_file):
+                session.update(placeholder_status="Starting playback...")
+                if session.voice_client:
+                    start, end = self.track_trim(session.current_url)
+                    session.play(audio_file, after=self.on_playback_finished, position=start, end=end,
+                                 gain=self.track_gain(session.current_url), offset=self.track_offset(session.current_url))
+                    session.update(placeholder_status="")
+
+                    await session.wait_started()
+
+                    session.update(song_loaded=True)
+                    self._preload_next(session)
+
+                    await self.update_rich_presence(session)
+            else:
+                session.update(placeholder_status="Error: Audio file not found")
+        except Exception as e:
+            if isinstance(e, discord.ClientException) and "ffmpeg" in str(e).lower():
+                # The cached ffmpeg check is wrong, make the next launch look again
+                self.startup_state.invalidate_ffmpeg()
+            session.update(placeholder_status=f"Playback error: {str(e)}")
+
+    def track_gain(self, url):
+        """
+        Playback gain that levels a cached track with the others, from the
+        loudness measured when it was cached. Tracks not measured yet play
+        unchanged, as they do with the normalizeLoudness setting off.
+        """
+        if not url or not self.settings.value("normalizeLoudness", True, type=bool):
+            return 1.0
+        info = self.audio_cache.peek(url)
+        if info is None:
+            return 1.0
+        return track_gain(info["loudness"], info["peak"])
+
+    def track_trim(self, url):
+        """
+        Start and end offsets that skip the silence around a cached track,
+        found when it was cached. Returns (0, None), playing the whole file,
+        for tracks not analyzed yet and with the trimSilence setting off.
+        Segment URLs play exactly their segment.
+        """
+        media, start, end = segments.parse(url)
+        if media != url:
+            return start, end
+        if not url or not self.settings.value("trimSilence", True, type=bool):
+            return 0, None
+        info = self.audio_cache.peek(url)
+        if info is None or info["trim_start"] is None:
+            return 0, None
+        return info["trim_start"], info["trim_end"]
+
+    def track_offset(self, url):
+        """Where the timeline shown for a URL starts in its file: the segment start, or 0"""
+        return segments.parse(url)[1] if url else 0
+
+    def waveform(self, url):
+        """
+        Waveform summary of what a URL plays, cut to the segment for segment
+        URLs. Missing summaries are analyzed ahead of the backlog.
+
+        Returns:
+            numpy int8 array of (min, max) pairs, or None if not available yet
+        """
+        peaks = self.audio_cache.waveform(url)
+        media, start, end = segments.parse(url)
+        if peaks is None or media == url:
+            return peaks
+        info = self.audio_cache.peek(url)
+        if info is None or not info["duration"]:
+            return peaks
+        first = min(int(start / info["duration"] * len(peaks)), len(peaks) - 1)
+        last = len(peaks) if end is None else int(end / info["duration"] * len(peaks))
+        return peaks[first:max(last, first + 1)]
+
+    async def update_rich_presence(self, session=None):
+        """Show the song of the given session, or of any other playing session"""
+        candidates = [session] if session else []
+        candidates += [s for s in self.bot.sessions.values() if s is not session]
+        playing = next((s for s in candidates if s.is_playing and s.song_title), None)
+
+        if playing:
+            activity = discord.Activity(
+                type=discord.ActivityType.listening,
+                name=playing.song_title,
+                details=f"by {playing.channel_name}" if playing.channel_name else None,
+                state="via Boxy Music Bot"
+            )
+
+            await self.bot.change_presence(activity=activity)
+        else:
+            await self.bot.change_presence(activity=None)
+
+    def download_hook(self, d, session):
+        """Progress hook for youtube-dl"""
+        if d["status"] == "downloading":
+            try:
+                downloaded = d.get("downloaded_bytes", 0)
+                total = d.get("total_bytes", 0) or d.get("total_bytes_estimate", 0)
+                if total:
+                    progress = (downloaded / total)
+                    self.notify("download_progress", session, progress)
+                    session.update(placeholder_status=f"Downloading: {progress * 100:.1f}%")
+                else:
+                    session.update(placeholder_status="Downloading...")
+            except:
+                session.update(placeholder_status="Downloading...")
+                self.notify("download_progress", session, 0.0)
+        elif d["status"] == "finished":
+            session.update(placeholder_status="Download complete, processing...")
+
+    def on_playback_finished(self, session, error, audio_file):
+        """Called from the player thread when a session's source finishes"""
+        session.audio_level = 0.0
+
+        if session.changing_song:
+            return
+
+        session.stop()
+        repeating = session.queue.repeat == REPEAT_ONE and audio_file == session.current_audio_file
+
+        if not repeating:
+            session.update(is_playing=False, position=0, song_loaded=False,
+                           song_title="", thumbnail_url="", channel_name="")
+
+        if error:
+            return
+
+        if repeating:
+            self.submit(self.replay_audio(session, audio_file))
+            return
+
+        self.submit(self.update_rich_presence())
+
+        if session.media_session_active:
+            source = session.queue.advance()
+            if source is not None:
+                self.submit(self.play_from_gui(session, source))
+            else:
+                session.update(media_session_active=False)
+
+    async def replay_audio(self, session, audio_file):
+        if os.path.exists(audio_file) and audio_file == session.current_audio_file and session.voice_client:
+            start, end = self.track_trim(session.current_url)
+            session.play(audio_file, after=self.on_playback_finished, position=start, end=end,
+                         gain=self.track_gain(session.current_url), offset=self.track_offset(session.current_url))
+            session.update(song_loaded=True)
+
+    async def cleanup(self):
+        """Disconnect every session when the application exits"""
+        for session in list(self.bot.sessions.values()):
+            await session.disconnect()
+            self.bot.remove_session(session.guild_id)
+
+    # Resolving and downloading
+
+    def _extract_video_info(self, url, ydl_opts):
+        """Helper method to run yt_dlp in thread pool, segment URLs download their whole video"""
+        import yt_dlp
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(segments.media_url(url), download=True)
+
+    async def extract_playlist_urls(self, playlist_url):
+        """Extract up to 100 video URLs from a YouTube playlist"""
+        if self.offline_mode():
+            raise RuntimeError("not available in offline mode")
+
+        ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "extract_flat": "in_playlist",
+            "skip_download": True,
+            "format": None,
+            "playlist_items": "1-100",
+        }
+
+        def extractor():
+            import yt_dlp
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                return ydl.extract_info(playlist_url, download=False)
+
+        info = await asyncio.get_event_loop().run_in_executor(self._yt_pool, extractor)
+
+        urls = []
+        if info and "entries" in info:
+            urls.extend([
+                f"https://www.youtube.com/watch?v={entry['id']}"
+                for entry in info["entries"]
+                if entry and "id" in entry
+            ])
+        return urls
+
+    async def resolve(self, user_input):
+        """
+        Resolve the title and channel for a YouTube URL or search term.
+        Cached URLs are answered from the cache index. With the
+        searchCacheFirst setting, a search term matching a cached title or
+        channel is answered from the cache too, without asking YouTube.
+        In offline mode only the cache is asked.
+
+        Returns:
+            Tuple of (title, url, channel_name); url is empty when nothing was found
+        """
+        title_ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "extract_flat": True,
+            "skip_download": True,
+            "format": None,
+        }
+        loop = asyncio.get_event_loop()
+        offline = self.offline_mode()
+
+        if is_url(user_input):
+            url = user_input
+            info = self.audio_cache.peek(url)
+            if info is not None:
+                return segments.title(info["title"], info["chapters"], url), url, info["channel"]
+            if is_local_url(url):
+                return "Not in the local library", "", ""
+            if offline:
+                return "", url, ""
+        else:
+            if offline or self.settings.value("searchCacheFirst", False, type=bool):
+                matches = self.library.search(user_input, limit=1, playlists=False, fuzzy=False)
+                if matches:
+                    return matches[0]["title"], matches[0]["url"], matches[0]["channel"]
+            if offline:
+                return "Not in cache", "", ""
+
+            def search():
+                from youtube_search import YoutubeSearch
+                return YoutubeSearch(user_input, max_results=1).to_dict()
+
+            results = await loop.run_in_executor(self._yt_pool, search)
+            if not results:
+                return "No video found", "", ""
+            url = f"https://www.youtube.com{results[0]['url_suffix']}"
+
+        def extract():
+            import yt_dlp
+            with yt_dlp.YoutubeDL(title_ydl_opts) as ydl:
+                return ydl.extract_info(segments.media_url(url), download=False, process=False)
+
+        info = await loop.run_in_executor(self._yt_pool, extract)
+        if not info:
+            return "Error fetching title", "", ""
+
+        title = segments.title(info.get("title", "Unknown Title"), segments.chapters_from_info(info), url)
+        channel_name = info.get("channel", "") or info.get("uploader", "")
+        return title, url, channel_name
+
+    async def download_all(self, urls):
+        """Download all playlist items to cache with parallel processing based on user settings"""
+        if self.offline_mode():
+            self.notify("placeholder", "Offline mode is on, nothing downloaded")
+            return
+
+        self.notify("bulk_downloading_changed", True)
+        non_cached_urls = []
+        queued = set()
+        for i, url in enumerate(urls):
+            # Segments of one video share its download
+            media_url = segments.media_url(url)
+            if is_local_url(url):
+                continue
+            if media_url not in queued and self.audio_cache.get_cached_file(url) is None:
+                queued.add(media_url)
+                non_cached_urls.append((i, url))
+
+        non_cached_total = len(non_cached_urls)
+
+        if non_cached_total == 0:
+            self.notify("placeholder", "All items already cached")
+            self.notify("bulk_downloading_changed", False)
+            return
+
+        self.notify("bulk_progress", 0, non_cached_total)
+        self.notify("placeholder", "Downloading playlist items...")
+
+        max_parallel_downloads = self.settings.value("maxParallelDownloads", 3, type=int)
+        downloaded_count = 0
+        semaphore = asyncio.Semaphore(max_parallel_downloads)
+
+        async def download_item(idx, current_url):
+            nonlocal downloaded_count
+
+            async with semaphore:
+                try:
+                    self.notify("item_download_started", current_url, idx)
+                    await self._download_to_cache(current_url)
+                except Exception as e:
+                    print(f"Error downloading {current_url}: {str(e)}")
+                finally:
+                    self.notify("item_download_completed", current_url, idx)
+                    downloaded_count += 1
+                    self.notify("bulk_progress", downloaded_count, non_cached_total)
+                    self.enforce_cache_limit()
+
+        await asyncio.gather(*(download_item(idx, url) for idx, url in non_cached_urls))
+        self.notify("placeholder", "Download complete!")
+        self.notify("bulk_downloading_changed", False)
+
+    async def _download_to_cache(self, url):
+        """Download a URL into the cache without playing it"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            temp_path = os.path.join(temp_dir, "audio.webm")
+
+            ydl_opts = {
+                "format": "bestaudio/best",
+                "outtmpl": temp_path,
+                "noplaylist": True,
+                "quiet": True,
+                "no_warnings": True
+            }
+
+            loop = asyncio.get_event_loop()
+            info = await loop.run_in_executor(
+                self._yt_pool,
+                lambda: self._extract_video_info(url, ydl_opts)
+            )
+
+            if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
+                self.audio_cache.add_file(url, temp_path, info)
+                self.notify("file_cached", url, self.audio_cache.peek(url))
+            else:
+                print(f"Error: Downloaded file is missing or empty: {temp_path}")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _preload_next(self, session):
+        """
+        Download the entry that comes after the current one while the
+        current one plays, so the switch does not wait for the network.
+        Can be called from any thread, the preloads are only tracked on the
+        bot loop.
+        """
+        if self.offline_mode() or not self.settings.value("preloadNext", True, type=bool):
+            return
+
+        url = segments.media_url(session.queue.next_up())
+        if not url or not url.startswith("http"):
+            return
+
+        self.submit(self._preload(url))
+
+    async def _preload(self, url):
+        if url in self._preloads or self.audio_cache.peek(url) is not None:
+            return
+
+        self._preloads[url] = asyncio.current_task()
+        self.notify("item_download_started", url, -1)
+        try:
+            await self._download_to_cache(url)
+            self.enforce_cache_limit()
+        except Exception as e:
+            print(f"Error preloading {url}: {str(e)}")
+        finally:
+            self._preloads.pop(url, None)
+            self.notify("item_download_completed", url, -1)
+
+    # Layers
+
+    def set_layer(self, session, source, volume=1.0, fade=0.0, loop=True):
+        """
+        Mix a cached file, like an ambience loop, under the songs of a
+        session, or move the volume of the layer already playing it.
+        The loudness gain of the file is applied on top of the volume.
+
+        Args:
+            session: Session to mix into
+            source: URL or search term of a cached file, naming the layer
+            volume: Linear volume of the layer
+            fade: Seconds the change takes
+            loop: Start the file over when it ends
+
+        Returns:
+            Name of the layer, or None if the file is not cached
+        """
+        url = source if is_url(source) else self._cached_url(source)
+        if not url:
+            return None
+        volume *= self.track_gain(url)
+        if session.fade_layer(url, volume, fade):
+            return url
+        cached = self.audio_cache.get_cached_file(url)
+        if cached is None:
+            return None
+        session.add_layer(url, cached[0], volume, loop, fade)
+        return url
+
+    def remove_layer(self, session, source, fade=0.0):
+        """Fade out and drop a layer, returns False if there is no such layer"""
+        url = source if is_url(source) else self._cached_url(source)
+        return bool(url) and session.remove_layer(url, fade)
+
+    # Cache
+
+    def get_cache_info(self):
+        """Get information about the cache"""
+        file_count, total_size = self.audio_cache.stats()
+
+        return {
+            'total_size': total_size,
+            'file_count': file_count,
+            'cache_location': self.audio_cache.cache_dir
+        }
+
+    def chapters(self, url):
+        """
+        Chapters yt-dlp reported for a cached video, as segment URLs that
+        can be queued and saved in playlists like any other URL.
+
+        Returns:
+            List of dictionaries with title, start, end, url and full_title
+        """
+        info = self.audio_cache.peek(url)
+        if info is None:
+            return []
+        result = []
+        for chapter in info["chapters"]:
+            chapter_url = segments.segment_url(url, chapter["start"], chapter["end"])
+            result.append({
+                **chapter,
+                "url": chapter_url,
+                "full_title": segments.title(info["title"], info["chapters"], chapter_url),
+            })
+        return result
+
+    def readiness(self, sources):
+        """
+        Count how many entries of a queue play without network.
+
+        Args:
+            sources: URLs or search terms; a search term is checked with the
+                cached file it resolves to offline
+
+        Returns:
+            Dictionary with entries, cached, stale and missing counts
+        """
+        return self.audio_cache.readiness(
+            source if is_url(source) else self._cached_url(source) or "" for source in sources
+        )
+
+    def playlist_readiness(self, playlist_id):
+        """Count how many entries of a library playlist play without network"""
+        return self.readiness(self.library.sources(playlist_id))
+
+    def enforce_cache_limit(self):
+        """Evict old files above the configured size and report the new totals"""
+        max_cache_size_mb = self.settings.value("maxCacheSize", 1024, type=int)
+        self.audio_cache.cleanup(max_size_mb=max_cache_size_mb)
+        self.notify("cache_changed", self.get_cache_info())
+
+    def clear_cache(self):
+        self.audio_cache.clear_all()
+        self.notify("cache_changed", self.get_cache_info())
+
+    # Local library
+
+    def local_folders(self):
+        return list(self.local_library.folders)
+
+    def set_local_folders(self, folders):
+        """Save the folders of the local library and index them"""
+        folders = list(dict.fromkeys(os.path.abspath(folder) for folder in folders if folder))
+        self.settings.setValue("localFolders", folders)
+        self.local_library.set_folders(folders)
+
+    def rescan_local_library(self):
+        self.local_library.scan()
+
+    # Playlists
+
+    def list_playlists(self):
+        """Get the playlists of the library with their size and cache state"""
+        try:
+            return self.library.list_playlists()
+        except Exception as e:
+            print(f"Error reading playlist library: {e}")
+            return []
+
+    def save_playlist(self, name, items):
+        """Save a playlist to the library"""
+        self.library.save(name, items)
+
+    def load_playlist(self, playlist_id):
+        """
+        Load a playlist from the library.
+
+        Returns:
+            Tuple of (items, playlist_name)
+        """
+        name = self.library.playlist_name(playlist_id)
+        if name is None:
+            raise KeyError(f"No playlist with ID {playlist_id}")
+        return self.library.entries(playlist_id), name
+
+    def delete_playlist(self, playlist_id):
+        self.library.delete(playlist_id)
@@ -0,0 +1,24 @@
+import sqlite3
+
+
+def connect(path):
+    """
+    Open a SQLite database the way every Boxy store uses it.
+
+    The connection may be used from any thread; callers serialize access
+    with their own lock. WAL journaling lets one store read while another
+    connection writes, which the playlist library relies on when it joins
+    against the audio cache.
+
+    Args:
+        path: Path of the database file
+
+    Returns:
+        sqlite3.Connection returning sqlite3.Row rows
+    """
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    return connection
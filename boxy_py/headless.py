@@ -0,0 +1,85 @@
+import asyncio
+import discord
+
+import boxy_py.config as config
+from boxy_py.bot import BoxyBot
+from boxy_py.core import BoxyCore
+from boxy_py.control_server import ControlServer
+from boxy_py.settings import JsonSettings
+from boxy_py.startup_state import StartupState
+from boxy_py.slash_commands import register_slash_commands
+
+
+class ConsoleFrontend:
+    """Front-end printing the core's notable events to stdout"""
+    def on_status_changed(self, status):
+        print(f"Status: {status}")
+
+    def on_issue(self, message):
+        print(f"Issue: {message}")
+
+    def on_session_connected(self, session):
+        print(f"Joined {session.voice_client.channel.name} in {session.guild_name}")
+
+    def on_session_closed(self, session):
+        print(f"Left voice channel in {session.guild_name}")
+
+    def on_session_changed(self, session, changed):
+        if changed.get("song_title"):
+            print(f"[{session.guild_name}] Now playing: {changed['song_title']}")
+
+
+async def _run(token, control_port, sync_commands):
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.voice_states = True
+
+    bot = BoxyBot(command_prefix="/", intents=intents)
+    bot.force_command_sync = sync_commands
+    core = BoxyCore(bot, JsonSettings())
+    if not core.startup_state.ffmpeg_available():
+        print("Warning: ffmpeg was not found, playback will fail until it is installed")
+    core.add_frontend(ConsoleFrontend())
+    register_slash_commands(bot, core)
+    control = ControlServer(core, port=control_port) if control_port else None
+
+    async with bot:
+        try:
+            if control:
+                await control.start()
+            await bot.start(token, reconnect=True)
+        finally:
+            if control:
+                await control.stop()
+            await core.cleanup()
+            core.shutdown()
+            if core.settings.value("clearCacheOnExit", False, type=bool):
+                core.audio_cache.clear_all()
+
+
+def run_headless(control_port=8765, sync_commands=False):
+    """
+    Run the bot without a window.
+
+    Playback is driven by slash commands and by the local control socket.
+    The token is the one saved by the setup window.
+
+    Args:
+        control_port: Port of the control socket on localhost, 0 to disable it
+        sync_commands: Sync the slash commands with Discord even if they did not change
+    """
+    token = config.load_token()
+    if not token:
+        print(f"No bot token found. Run the setup window once, or write the token to {config.get_token_path()}")
+        return 1
+
+    config.migrate_playlists_if_needed()
+    try:
+        asyncio.run(_run(token, control_port, sync_commands))
+    except KeyboardInterrupt:
+        pass
+    except discord.LoginFailure:
+        print("Invalid bot token")
+        StartupState().invalidate_token()
+        return 1
+    return 0
@@ -0,0 +1,450 @@
+import os
+import re
+import json
+import time
+import difflib
+import threading
+
+import boxy_py.config as config
+from boxy_py import database, segments
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS playlists (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    user_typed TEXT NOT NULL,
+    url TEXT NOT NULL DEFAULT '',
+    resolved_title TEXT NOT NULL DEFAULT '',
+    channel_name TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (playlist_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_url ON entries(url);
+CREATE TABLE IF NOT EXISTS imported_files (
+    filename TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS playlists_fts USING fts5(
+    name, content='playlists', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS playlists_search_insert AFTER INSERT ON playlists BEGIN
+    INSERT INTO playlists_fts (rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS playlists_search_delete AFTER DELETE ON playlists BEGIN
+    INSERT INTO playlists_fts (playlists_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+CREATE TRIGGER IF NOT EXISTS playlists_search_update AFTER UPDATE OF name ON playlists BEGIN
+    INSERT INTO playlists_fts (playlists_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO playlists_fts (rowid, name) VALUES (new.id, new.name);
+END;
+"""
+
+# Entries joined with the audio cache, so cache state comes with every row.
+# Segment entries (URLs ending in #t=start,end) join the file of their
+# whole video through media_url() and count only their own length.
+ENTRY_QUERY = """
+SELECT e.user_typed, e.url, e.resolved_title, e.channel_name,
+       f.file_id IS NOT NULL AS cached,
+       COALESCE(segment_length(e.url, f.duration), 0) AS duration,
+       f.last_accessed AS last_played
+FROM entries e
+LEFT JOIN cache.files f ON e.url != '' AND f.url = media_url(e.url)
+WHERE e.playlist_id = ?
+ORDER BY e.position
+LIMIT ? OFFSET ?
+"""
+
+PLAYLIST_QUERY = """
+SELECT p.id, p.name,
+       COUNT(e.position) AS entries,
+       COUNT(f.file_id) AS cached,
+       COALESCE(SUM(segment_length(e.url, f.duration)), 0) AS duration,
+       MAX(f.last_accessed) AS last_played
+FROM playlists p
+LEFT JOIN entries e ON e.playlist_id = p.id
+LEFT JOIN cache.files f ON e.url != '' AND f.url = media_url(e.url)
+GROUP BY p.id
+ORDER BY p.name COLLATE NOCASE
+"""
+
+
+# Searches over the cache's full-text tables. {table} is files_fts or
+# files_trigram and {order} either ranks by relevance or by recency.
+MATCH_PROBE_QUERY = "SELECT rowid FROM cache.{table} WHERE {table} MATCH ? LIMIT ?"
+
+MATCH_QUERY = """
+SELECT f.url, f.title, f.channel, f.duration, f.thumbnail FROM cache.{table} t
+JOIN cache.files f ON f.rowid = t.rowid
+WHERE t.{table} MATCH ?
+ORDER BY {order}
+LIMIT ?
+"""
+
+# Cached files that are entries of playlists whose name matches
+PLAYLIST_SEARCH_QUERY = """
+SELECT DISTINCT f.url, f.title, f.channel, f.duration, f.thumbnail FROM playlists_fts t
+JOIN entries e ON e.playlist_id = t.rowid
+JOIN cache.files f ON e.url != '' AND f.url = media_url(e.url)
+WHERE t.playlists_fts MATCH ?
+LIMIT ?
+"""
+
+# Ranking scores every matching row, about a microsecond each. A query
+# matching more rows than this is too broad to be worth it and returns the
+# most recently cached matches instead.
+RANK_WINDOW = 2000
+
+# Trigrams found in more than this share of the cached files are dropped
+# from fuzzy queries, like stop words
+COMMON_TRIGRAM_SHARE = 0.05
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_expression(text):
+    """FTS5 query matching rows containing a word starting with each word of text, or None"""
+    words = _WORD.findall(text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def query_trigrams(text):
+    """Trigrams of the words of text, as the trigram tokenizer indexes them"""
+    trigrams = set()
+    for word in _WORD.findall(text.lower()):
+        trigrams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return sorted(trigrams)
+
+
+def _entry_row(item):
+    return (
+        item.get("userTyped") or "",
+        item.get("url") or "",
+        item.get("resolvedTitle") or "",
+        item.get("channelName") or "",
+    )
+
+
+class PlaylistLibrary:
+    """
+    Playlists stored in an indexed SQLite database (library.db).
+
+    Every entry is one row keyed by (playlist, position), and the audio
+    cache database is attached, so whether an entry is cached, its
+    duration and when it was last played come from a join instead of from
+    reading files. Saving only writes the rows that changed.
+
+    JSON playlists found in the playlists directory are imported when the
+    library is opened and whenever the playlists are listed, so files
+    from older versions or shared by other users keep working. A file is
+    imported again only after it was modified.
+    """
+    def __init__(self, audio_cache, path=None, import_directory=None):
+        """
+        Initialize the library. The database is opened on first use.
+
+        Args:
+            audio_cache: AudioCache whose database is joined for cache state
+            path: Optional path of the database file
+            import_directory: Optional directory scanned for JSON playlists
+        """
+        self.audio_cache = audio_cache
+        self.path = path or os.path.join(config.get_config_directory(), "library.db")
+        self.import_directory = import_directory
+        self._connection = None
+        self._lock = threading.RLock()
+
+    def _db(self):
+        with self._lock:
+            if self._connection is None:
+                self.audio_cache.load()
+                connection = database.connect(self.path)
+                connection.create_function("media_url", 1, segments.media_url, deterministic=True)
+                connection.create_function("segment_length", 2, segments.length, deterministic=True)
+                with connection:
+                    indexed = connection.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'playlists_fts'"
+                    ).fetchone() is not None
+                    connection.executescript(SCHEMA)
+                    if not indexed:
+                        connection.execute("INSERT INTO playlists_fts (playlists_fts) VALUES ('rebuild')")
+                connection.execute("ATTACH DATABASE ? AS cache", (self.audio_cache.database_path,))
+                self._connection = connection
+                self.import_json_playlists()
+            return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # Playlists
+
+    def list_playlists(self):
+        """
+        Get every playlist with its size and cache state.
+
+        Returns:
+            List of dictionaries with id, name, entries, cached, duration and lastPlayed
+        """
+        with self._lock:
+            self.import_json_playlists()
+            rows = self._db().execute(PLAYLIST_QUERY).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "entries": row["entries"],
+                "cached": row["cached"],
+                "duration": row["duration"],
+                "lastPlayed": row["last_played"] or 0,
+            }
+            for row in rows
+        ]
+
+    def sources(self, playlist_id):
+        """URL of every entry of a playlist in order, or its typed text if it was never resolved"""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT CASE WHEN url != '' THEN url ELSE user_typed END AS source "
+                "FROM entries WHERE playlist_id = ? ORDER BY position", (playlist_id,)
+            ).fetchall()
+        return [row["source"] for row in rows]
+
+    def playlist_id(self, name):
+        """Get the ID of the playlist with this name, or None"""
+        with self._lock:
+            row = self._db().execute("SELECT id FROM playlists WHERE name = ?", (name,)).fetchone()
+        return row["id"] if row is not None else None
+
+    def playlist_name(self, playlist_id):
+        with self._lock:
+            row = self._db().execute("SELECT name FROM playlists WHERE id = ?", (playlist_id,)).fetchone()
+        return row["name"] if row is not None else None
+
+    def entries(self, playlist_id, offset=0, limit=None):
+        """
+        Get entries of a playlist in order, joined with the audio cache.
+
+        Args:
+            playlist_id: ID of the playlist
+            offset: Index of the first entry to return
+            limit: Maximum number of entries, or None for all
+
+        Returns:
+            List of dictionaries with userTyped, url, resolvedTitle,
+            channelName, cached, duration and lastPlayed
+        """
+        with self._lock:
+            rows = self._db().execute(
+                ENTRY_QUERY, (playlist_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [
+            {
+                "userTyped": row["user_typed"],
+                "url": row["url"],
+                "resolvedTitle": row["resolved_title"],
+                "channelName": row["channel_name"],
+                "cached": bool(row["cached"]),
+                "duration": row["duration"],
+                "lastPlayed": row["last_played"] or 0,
+            }
+            for row in rows
+        ]
+
+    def save(self, name, items):
+        """
+        Create or overwrite a playlist, writing only entries that changed.
+
+        Args:
+            name: Name of the playlist
+            items: List of dictionaries with userTyped, url, resolvedTitle and channelName
+
+        Returns:
+            Tuple of (playlist_id, number_of_rows_written)
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            with connection:
+                row = connection.execute("SELECT id FROM playlists WHERE name = ?", (name,)).fetchone()
+                if row is None:
+                    playlist_id = connection.execute(
+                        "INSERT INTO playlists (name, created_at, updated_at) VALUES (?, ?, ?)", (name, now, now)
+                    ).lastrowid
+                    existing = {}
+                else:
+                    playlist_id = row["id"]
+                    existing = {
+                        entry[0]: tuple(entry[1:])
+                        for entry in connection.execute(
+                            "SELECT position, user_typed, url, resolved_title, channel_name "
+                            "FROM entries WHERE playlist_id = ?",
+                            (playlist_id,)
+                        )
+                    }
+
+                changed = []
+                for position, item in enumerate(items):
+                    values = _entry_row(item)
+                    if existing.get(position) != values:
+                        changed.append((playlist_id, position) + values)
+
+                connection.executemany(
+                    "INSERT OR REPLACE INTO entries "
+                    "(playlist_id, position, user_typed, url, resolved_title, channel_name) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    changed
+                )
+                removed = connection.execute(
+                    "DELETE FROM entries WHERE playlist_id = ? AND position >= ?", (playlist_id, len(items))
+                ).rowcount
+                if changed or removed or row is None:
+                    connection.execute("UPDATE playlists SET updated_at = ? WHERE id = ?", (now, playlist_id))
+
+        return playlist_id, len(changed) + removed
+
+    def delete(self, playlist_id):
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
+
+    # Search
+
+    def search(self, text, limit=8, playlists=True, fuzzy=True):
+        """
+        Search the cached files by title, channel and playlist membership.
+
+        Word prefix matches on titles and channels come first, then files in
+        playlists whose name matches, then, if there is still room, fuzzy
+        matches on shared trigrams re-ranked by similarity.
+
+        Args:
+            text: What the user typed
+            limit: Maximum number of results
+            playlists: Include files from playlists whose name matches
+            fuzzy: Include typo-tolerant matches
+
+        Returns:
+            List of dictionaries with url, title, channel, duration,
+            thumbnail and match ("title", "playlist" or "fuzzy")
+        """
+        results = {}
+
+        def collect(rows, match):
+            for row in rows:
+                if len(results) >= limit:
+                    return
+                if row["url"] not in results:
+                    result = dict(row)
+                    result["match"] = match
+                    results[row["url"]] = result
+
+        expression = prefix_expression(text)
+        with self._lock:
+            connection = self._db()
+            if expression is not None:
+                collect(self._match(connection, "files_fts", expression, limit), "title")
+                if playlists and len(results) < limit:
+                    collect(connection.execute(PLAYLIST_SEARCH_QUERY, (expression, limit)), "playlist")
+
+            candidates = []
+            if fuzzy and len(results) < limit:
+                expression = self._fuzzy_expression(connection, text)
+                if expression is not None:
+                    candidates = self._match(connection, "files_trigram", expression, limit * 8)
+
+        if candidates:
+            folded = text.lower()
+            candidates.sort(
+                key=lambda row: difflib.SequenceMatcher(None, folded, row["title"].lower()).ratio(), reverse=True
+            )
+            collect(candidates, "fuzzy")
+
+        return list(results.values())
+
+    def _match(self, connection, table, expression, limit):
+        """Rows matching a full-text query, ranked when the query is selective enough"""
+        probe = connection.execute(MATCH_PROBE_QUERY.format(table=table), (expression, RANK_WINDOW + 1)).fetchall()
+        if not probe:
+            return []
+        order = "t.rank" if len(probe) <= RANK_WINDOW else "t.rowid DESC"
+        return connection.execute(MATCH_QUERY.format(table=table, order=order), (expression, limit)).fetchall()
+
+    def _fuzzy_expression(self, connection, text):
+        """
+        FTS5 query matching cached files that share a distinctive trigram
+        with text, or None. Trigrams most files contain are left out unless
+        nothing else is left.
+        """
+        trigrams = query_trigrams(text)
+        if not trigrams:
+            return None
+
+        placeholders = ", ".join("?" * len(trigrams))
+        frequencies = connection.execute(
+            f"SELECT term, doc FROM cache.files_trigram_vocab WHERE term IN ({placeholders}) ORDER BY doc",
+            trigrams
+        ).fetchall()
+        if not frequencies:
+            return None
+
+        file_count = connection.execute("SELECT COUNT(*) FROM cache.files").fetchone()[0]
+        distinctive = [term for term, doc in frequencies if doc <= file_count * COMMON_TRIGRAM_SHARE]
+        terms = distinctive or [term for term, _ in frequencies[:2]]
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    # JSON import
+
+    def import_json_playlists(self):
+        """
+        Import JSON playlists that are new or changed since they were last imported.
+
+        Returns:
+            Number of playlists imported
+        """
+        directory = self.import_directory or config.get_playlists_directory()
+        try:
+            filenames = [name for name in os.listdir(directory) if name.endswith(".json")]
+        except OSError as e:
+            print(f"Error reading playlist directory: {e}")
+            return 0
+
+        imported = 0
+        with self._lock:
+            connection = self._db()
+            known = dict(connection.execute("SELECT filename, mtime FROM imported_files").fetchall())
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if known.get(filename) == mtime:
+                    continue
+
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        items = json.load(f)
+                except (json.JSONDecodeError, IOError) as e:
+                    print(f"Error importing playlist {filename}: {e}")
+                    continue
+                if not isinstance(items, list):
+                    continue
+
+                self.save(os.path.splitext(filename)[0], [item for item in items if isinstance(item, dict)])
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO imported_files (filename, mtime) VALUES (?, ?)", (filename, mtime)
+                    )
+                imported += 1
+                print(f"Imported playlist: {filename}")
+        return imported
@@ -0,0 +1,197 @@
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+AUDIO_EXTENSIONS = {".mp3", ".ogg", ".oga", ".opus", ".flac", ".wav", ".m4a", ".aac", ".webm", ".wma"}
+
+
+def file_url(path):
+    """file:// URL a local file is indexed, queued and saved in playlists under"""
+    return Path(path).absolute().as_uri()
+
+
+def is_local_url(text):
+    return text.startswith("file:")
+
+
+def path_from_url(url):
+    """Local path of a file:// URL"""
+    return url2pathname(urlparse(url).path)
+
+
+def probe(path):
+    """
+    Read the duration and tags of an audio file with ffprobe.
+
+    Returns:
+        Dictionary with title, channel and duration, holding what the file
+        has of them, or an empty dictionary if ffprobe is missing or failed
+    """
+    executable = shutil.which("ffprobe")
+    if executable is None:
+        return {}
+
+    try:
+        result = subprocess.run(
+            [executable, "-v", "quiet", "-print_format", "json", "-show_format", path],
+            capture_output=True, timeout=30,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+        data = json.loads(result.stdout or b"{}")
+    except (OSError, subprocess.TimeoutExpired, json.JSONDecodeError) as e:
+        print(f"Error probing {path}: {e}")
+        return {}
+
+    fields = data.get("format", {})
+    tags = {key.lower(): value for key, value in (fields.get("tags") or {}).items()}
+    info = {}
+    if tags.get("title"):
+        info["title"] = tags["title"]
+    if tags.get("artist") or tags.get("album_artist") or tags.get("album"):
+        info["channel"] = tags.get("artist") or tags.get("album_artist") or tags.get("album")
+    try:
+        info["duration"] = float(fields["duration"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    return info
+
+
+class LocalLibrary:
+    """
+    Audio files in local folders, indexed into the AudioCache database.
+
+    Indexed files are rows of the cache like downloads, under their file://
+    URL and pointing at the file where it is, so they show up in search,
+    playlists and readiness, get analyzed by the maintenance jobs and play
+    without a download step. The cache never evicts or deletes them.
+
+    A scan runs on a worker thread. Files are probed for duration and tags
+    once; later scans only compare modification time and size with the
+    index, probe what changed and drop what disappeared. Files of a folder
+    that is currently missing, like an unplugged drive, are kept.
+
+    listener, if set, is called with (scanning, file_count) from the
+    worker thread when a scan starts and ends.
+    """
+
+    def __init__(self, cache, folders=()):
+        """
+        Initialize the library without scanning.
+
+        Args:
+            cache: AudioCache the files are indexed in
+            folders: Directories to index, with their subdirectories
+        """
+        self.cache = cache
+        self.folders = list(folders)
+        self.listener = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._rescan = False
+        self._closed = False
+
+    @property
+    def scanning(self):
+        return self._thread is not None
+
+    def scan(self):
+        """Index the folders in the background; a scan asked for during a scan runs after it"""
+        with self._lock:
+            if self._closed:
+                return
+            if self._thread is not None:
+                self._rescan = True
+                return
+            self._thread = threading.Thread(target=self._run, name="local_library", daemon=True)
+            self._thread.start()
+        self._report()
+
+    def set_folders(self, folders):
+        """Index another set of folders, dropping the files of removed ones"""
+        self.folders = list(folders)
+        self.scan()
+
+    def close(self):
+        """Stop scanning after the file being probed"""
+        with self._lock:
+            self._closed = True
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    self._scan()
+                except Exception as e:
+                    print(f"Error scanning local folders: {e}")
+                with self._lock:
+                    if not self._rescan or self._closed:
+                        self._thread = None
+                        break
+                    self._rescan = False
+        finally:
+            self._report()
+
+    def _scan(self):
+        folders = [os.path.abspath(folder) for folder in self.folders]
+        known = self.cache.local_files()
+        seen = set()
+
+        for folder in folders:
+            for path in self._audio_files(folder):
+                if self._closed:
+                    return
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                indexed = known.get(path)
+                if indexed is not None and indexed[1:] == (stat.st_size, stat.st_mtime):
+                    continue
+
+                info = {
+                    "title": os.path.splitext(os.path.basename(path))[0],
+                    "channel": os.path.basename(os.path.dirname(path)),
+                    "duration": 0,
+                }
+                info.update(probe(path))
+                self.cache.add_local_file(file_url(path), path, info, stat.st_size, stat.st_mtime)
+
+        missing = [folder for folder in folders if not os.path.isdir(folder)]
+        removed = [
+            file_id for path, (file_id, size, mtime) in known.items()
+            if path not in seen and not any(self._inside(path, folder) for folder in missing)
+        ]
+        self.cache.remove_local_files(removed)
+
+    @staticmethod
+    def _inside(path, folder):
+        try:
+            return os.path.commonpath([path, folder]) == folder
+        except ValueError:
+            # Paths on different drives
+            return False
+
+    @staticmethod
+    def _audio_files(folder):
+        """Paths of the audio files under a folder, without following directory links"""
+        stack = [folder]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                            yield entry.path
+            except OSError:
+                continue
+
+    def _report(self):
+        if self.listener:
+            self.listener(self.scanning, len(self.cache.local_files()))
@@ -0,0 +1,195 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+def percentile(sorted_values, p):
+    """
+    Linear-interpolated percentile of an already sorted sequence.
+
+    Args:
+        sorted_values: Values sorted in ascending order
+        p: Percentile between 0 and 100
+
+    Returns:
+        The percentile value, or 0.0 for an empty sequence
+    """
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+
+    rank = (len(sorted_values) - 1) * (p / 100.0)
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = rank - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+class LoopLagMonitor:
+    """
+    Watchdog measuring how late the event loop runs its scheduled callbacks.
+
+    A heartbeat coroutine sleeps for a fixed interval on the loop and records
+    how late it woke up. A separate thread watches the heartbeat and, when it
+    is overdue by more than the threshold, samples the loop thread's stack so
+    the code that is blocking the loop gets recorded while it is still running.
+    """
+    def __init__(self, interval=0.1, threshold=0.1, max_samples=3000, max_stalls=50):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Heartbeat period in seconds
+            threshold: Lag in seconds above which a stall is recorded
+            max_samples: Number of lag samples kept for percentiles
+            max_stalls: Number of stall reports kept
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self._samples = deque(maxlen=max_samples)
+        self._stalls = deque(maxlen=max_stalls)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog_thread = None
+        self._stop_event = threading.Event()
+        self._beat_deadline = 0.0
+        self._beat_id = 0
+        self._pending_sample = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self, loop=None):
+        """Start monitoring. Must be called from the thread running the loop."""
+        if self.running:
+            return
+
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._beat_deadline = time.monotonic() + self.interval
+        self._task = self._loop.create_task(self._heartbeat(), name="boxy-loop-monitor")
+
+        self._watchdog_thread = threading.Thread(
+            target=self._watchdog, name="boxy-loop-watchdog", daemon=True
+        )
+        self._watchdog_thread.start()
+
+    def stop(self):
+        """Stop the heartbeat and the watchdog thread"""
+        self._stop_event.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _heartbeat(self):
+        try:
+            while not self._stop_event.is_set():
+                expected = time.monotonic() + self.interval
+                with self._lock:
+                    self._beat_id += 1
+                    self._beat_deadline = expected
+                    self._pending_sample = None
+
+                await asyncio.sleep(self.interval)
+
+                lag = max(0.0, time.monotonic() - expected)
+                with self._lock:
+                    self._samples.append(lag)
+                    sample = self._pending_sample
+                    self._pending_sample = None
+
+                if lag >= self.threshold:
+                    self._record_stall(lag, sample)
+        except asyncio.CancelledError:
+            pass
+
+    def _watchdog(self):
+        """Sample the loop thread's stack while the heartbeat is overdue"""
+        poll = max(self.threshold / 2, 0.01)
+        while not self._stop_event.wait(poll):
+            with self._lock:
+                overdue = time.monotonic() - self._beat_deadline
+                if overdue < self.threshold or self._pending_sample is not None:
+                    continue
+                beat_id = self._beat_id
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            stack = traceback.format_stack(frame)
+            task = self._current_task_name()
+            with self._lock:
+                if beat_id == self._beat_id:
+                    self._pending_sample = {"task": task, "stack": stack}
+            del frame
+
+    def _current_task_name(self):
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+        if task is None:
+            return None
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", None) or task.get_name()
+        return name
+
+    def _record_stall(self, lag, sample):
+        stall = {
+            "time": time.time(),
+            "lag": lag,
+            "task": sample["task"] if sample else None,
+            "stack": sample["stack"] if sample else [],
+        }
+        with self._lock:
+            self._stalls.append(stall)
+
+        where = stall["task"] or "unknown callback"
+        print(f"Event loop blocked for {lag * 1000:.0f} ms in {where}")
+        if stall["stack"]:
+            print("".join(stall["stack"][-6:]).rstrip())
+
+    def percentiles(self, *points):
+        """
+        Get lag percentiles in milliseconds.
+
+        Args:
+            points: Percentiles to compute, defaults to 50, 95 and 99
+
+        Returns:
+            Dictionary mapping "p<point>" to the lag in milliseconds
+        """
+        points = points or (50, 95, 99)
+        with self._lock:
+            values = sorted(self._samples)
+        return {f"p{point:g}": percentile(values, point) * 1000 for point in points}
+
+    def stats(self):
+        """Get a summary of the lag measurements, times in milliseconds"""
+        with self._lock:
+            values = sorted(self._samples)
+            stall_count = len(self._stalls)
+
+        summary = {
+            "samples": len(values),
+            "max": (values[-1] * 1000) if values else 0.0,
+            "stalls": stall_count,
+            "threshold": self.threshold * 1000,
+        }
+        for point in (50, 95, 99):
+            summary[f"p{point}"] = percentile(values, point) * 1000
+        return summary
+
+    def stalls(self):
+        """Get the recorded stalls, most recent last"""
+        with self._lock:
+            return list(self._stalls)
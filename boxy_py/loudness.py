@@ -0,0 +1,121 @@
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+# Loudness every track is brought to, the level YouTube normalizes to
+REFERENCE_LOUDNESS = -14.0
+# Highest true peak a gain may push a track to
+PEAK_CEILING = -1.0
+# Quiet tracks are never boosted by more than this
+MAX_BOOST = 12.0
+# ebur128 reports this or less for silence, which has no loudness to match
+SILENCE = -70.0
+# Bytes of decoded audio handed on at a time
+CHUNK_SIZE = 64 * 1024
+# End of the ffmpeg log read for the summary, after the per-frame lines
+SUMMARY_TAIL = 8192
+
+_SUMMARY = re.compile(r"Summary:(.*)", re.DOTALL)
+_INTEGRATED = re.compile(r"\bI:\s+(-?[\d.]+|-inf)\s+LUFS")
+_PEAK = re.compile(r"\bPeak:\s+(-?[\d.]+|-inf)\s+dBFS")
+
+
+def parse_summary(output):
+    """
+    Read the integrated loudness and true peak from the summary ffmpeg's
+    ebur128 filter prints when it finishes.
+
+    Returns:
+        Tuple of (loudness in LUFS, peak in dBTP), or None if there is no summary
+    """
+    summary = _SUMMARY.search(output)
+    if summary is None:
+        return None
+
+    integrated = _INTEGRATED.search(summary.group(1))
+    peak = _PEAK.search(summary.group(1))
+    if integrated is None:
+        return None
+    return float(integrated.group(1)), float(peak.group(1)) if peak else None
+
+
+def analyze(path, sample_rate=None, on_samples=None):
+    """
+    Measure the EBU R128 integrated loudness and true peak of an audio file.
+    Decodes the whole file with ffmpeg, so it is meant for a worker thread.
+    The same decode can also stream the audio to other summaries, chunk by
+    chunk, so memory use does not grow with the length of the file.
+
+    Args:
+        path: Path of the audio file
+        sample_rate: Rate of the samples handed to on_samples
+        on_samples: Called with each chunk of the audio as mono 16-bit samples
+
+    Returns:
+        Tuple of (loudness in LUFS, peak in dBTP), or None if ffmpeg is
+        missing or failed
+    """
+    executable = shutil.which("ffmpeg")
+    if executable is None:
+        return None
+
+    audio_filter = "ebur128=peak=true"
+    if on_samples is not None:
+        audio_filter += f",aresample={sample_rate},aformat=sample_fmts=s16:channel_layouts=mono"
+        output = ["-f", "s16le", "-"]
+    else:
+        output = ["-f", "null", "-"]
+
+    try:
+        # The filter logs a line per 100 ms of audio, so the log goes to a
+        # file rather than a pipe that would have to be drained meanwhile
+        with tempfile.TemporaryFile() as log:
+            process = subprocess.Popen(
+                [executable, "-hide_banner", "-nostats", "-i", path, "-map", "0:a:0", "-filter:a", audio_filter, *output],
+                stdout=subprocess.PIPE if on_samples is not None else subprocess.DEVNULL, stderr=log,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+            )
+            try:
+                if on_samples is not None:
+                    with process.stdout:
+                        for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b""):
+                            on_samples(chunk)
+                returncode = process.wait()
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+            log.seek(0, os.SEEK_END)
+            log.seek(max(log.tell() - SUMMARY_TAIL, 0))
+            output = log.read().decode("utf-8", errors="replace")
+    except OSError as e:
+        print(f"Error running ffmpeg for loudness analysis: {e}")
+        return None
+
+    if returncode != 0:
+        return None
+    return parse_summary(output)
+
+
+def track_gain(loudness, peak):
+    """
+    Linear gain bringing a track to the reference loudness without pushing
+    its true peak above the ceiling, in the style of ReplayGain.
+
+    Args:
+        loudness: Integrated loudness in LUFS, or None if not measured
+        peak: True peak in dBTP, or None if not measured
+
+    Returns:
+        Factor for the volume multiply, 1.0 when the track was not measured
+    """
+    if loudness is None or loudness <= SILENCE:
+        return 1.0
+
+    gain_db = min(REFERENCE_LOUDNESS - loudness, MAX_BOOST)
+    if peak is not None:
+        gain_db = min(gain_db, PEAK_CEILING - peak)
+    return 10 ** (gain_db / 20)
@@ -0,0 +1,200 @@
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+
+# Windows priority class of the worker processes
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+
+
+def lower_priority():
+    """Process pool initializer running the workers below normal priority, along with the ffmpeg they start"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(10)
+    except (OSError, AttributeError) as e:
+        print(f"Error lowering maintenance worker priority: {e}")
+
+
+class MaintenanceJob:
+    """
+    A task run once over every cached file, like an analysis or a re-encode.
+
+    run() executes in a worker process with the ID and audio path of a file and
+    returns a picklable result, so the job itself has to be picklable too.
+    apply() stores that result from the application process, inside the
+    transaction that checkpoints the file as done at the job's version.
+    Raising the version runs a job over every file again.
+    """
+    name = ""
+    version = 1
+
+    def run(self, file_id, path):
+        raise NotImplementedError
+
+    def apply(self, connection, file_id, result):
+        raise NotImplementedError
+
+
+class MaintenanceRunner:
+    """
+    Runs maintenance jobs over the files of an AudioCache in a process pool.
+
+    Files that are missing a job are worked through in the background
+    while paused is False; the core pauses the runner while a voice stream
+    plays. Files scheduled as urgent, like the song being looked at, run
+    even when paused. Progress is checkpointed per file in the cache
+    database, so a restart resumes with the files that are left.
+
+    listener, if set, is called with (done, total, paused) after every
+    change, from whichever thread made it.
+    """
+
+    def __init__(self, cache, jobs, max_workers=None):
+        """
+        Initialize the runner. Worker processes start on the first job.
+
+        Args:
+            cache: AudioCache whose files the jobs run over
+            jobs: MaintenanceJob instances, run in this order on each file
+            max_workers: Number of worker processes, a quarter of the cores by default
+        """
+        self.cache = cache
+        self.jobs = list(jobs)
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // 4)
+        self.listener = None
+        self._lock = threading.RLock()
+        self._pool = None
+        self._backlog = deque()
+        self._urgent = deque()
+        self._queued = set()
+        self._running = 0
+        self._paused = False
+        self._closed = False
+        self._done = 0
+        self._total = 0
+
+    @property
+    def paused(self):
+        return self._paused
+
+    @paused.setter
+    def paused(self, value):
+        with self._lock:
+            if self._paused == value:
+                return
+            self._paused = value
+            self._dispatch()
+        self._report()
+
+    def progress(self):
+        """Get (done, total, paused) of the files queued since the runner was last idle"""
+        with self._lock:
+            return self._done, self._total, self._paused
+
+    def start(self):
+        """Queue every file that is missing a job or has it at an older version"""
+        with self._lock:
+            for job in self.jobs:
+                for file_id in self.cache.pending_files(job):
+                    self._enqueue(job, file_id, urgent=False)
+            self._dispatch()
+        self._report()
+
+    def schedule(self, file_id, urgent=False):
+        """
+        Queue every job for one file, after an ingest or when its results are needed.
+
+        Args:
+            file_id: ID of the cached file
+            urgent: Run ahead of the backlog, even while paused
+        """
+        with self._lock:
+            for job in self.jobs:
+                self._enqueue(job, file_id, urgent)
+            self._dispatch()
+        self._report()
+
+    def _enqueue(self, job, file_id, urgent):
+        item = (job, file_id)
+        if item in self._queued:
+            if urgent and item in self._backlog:
+                self._backlog.remove(item)
+                self._urgent.append(item)
+            return
+        self._queued.add(item)
+        self._total += 1
+        (self._urgent if urgent else self._backlog).append(item)
+
+    def _dispatch(self):
+        """Hand queued files to the pool until every worker is busy"""
+        while self._running < self.max_workers and not self._closed:
+            if self._urgent:
+                job, file_id = self._urgent.popleft()
+            elif self._backlog and not self._paused:
+                job, file_id = self._backlog.popleft()
+            else:
+                return
+
+            path = self.cache.audio_path(file_id)
+            if not os.path.exists(path):
+                self._finish(job, file_id)
+                continue
+
+            if self._pool is None:
+                # Spawned rather than forked, forking a process running Qt
+                # and the bot loop threads is not safe
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=lower_priority
+                )
+            self._running += 1
+            try:
+                future = self._pool.submit(job.run, file_id, path)
+            except RuntimeError:
+                # The pool was shut down under us, by close() or at
+                # interpreter exit; the file stays pending for the next start
+                self._running -= 1
+                self._closed = True
+                return
+            future.add_done_callback(lambda future, job=job, file_id=file_id: self._completed(job, file_id, future))
+
+    def _completed(self, job, file_id, future):
+        if not future.cancelled():
+            try:
+                self.cache.complete_job(job, file_id, future.result())
+            except Exception as e:
+                print(f"Error running {job.name} on {file_id}: {e}")
+
+        with self._lock:
+            self._running -= 1
+            self._finish(job, file_id)
+            self._dispatch()
+        self._report()
+
+    def _finish(self, job, file_id):
+        self._queued.discard((job, file_id))
+        self._done += 1
+        if not self._queued:
+            self._done = self._total = 0
+
+    def _report(self):
+        if self.listener:
+            self.listener(*self.progress())
+
+    def close(self):
+        """Stop the workers; files not done yet are picked up again on the next start()"""
+        with self._lock:
+            self._closed = True
+            pool, self._pool = self._pool, None
+            self._backlog.clear()
+            self._urgent.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
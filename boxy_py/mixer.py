@@ -0,0 +1,225 @@
+import threading
+
+import discord
+import numpy as np
+
+# 20 ms of 48 kHz stereo 16-bit PCM, the frame discord.py reads
+SAMPLES_PER_FRAME = 960
+CHANNELS = 2
+FRAME_SIZE = SAMPLES_PER_FRAME * CHANNELS * 2
+FRAME_SECONDS = 0.02
+
+
+class Layer:
+    """
+    One stream mixed under the song, like an ambience loop.
+
+    The volume moves to its target over the fade time, ramped per sample so
+    fades do not click. A looping layer opens its source again when it runs
+    out, so it keeps a single FFmpeg process. The player paces frames by the
+    clock, so the few milliseconds starting one takes are caught up on.
+
+    read() and finish() run on the player thread only, an FFmpeg source
+    cannot be closed while it is being read.
+    """
+
+    def __init__(self, open_source, volume=1.0, loop=True, fade=0.0):
+        """
+        Initialize a layer, fading in from silence when fade is given.
+
+        Args:
+            open_source: Callable returning a new PCM AudioSource of the stream
+            volume: Linear volume of the layer
+            loop: Start over when the stream ends
+            fade: Seconds the fade in takes
+        """
+        self.open_source = open_source
+        self.loop = loop
+        self.finished = False
+        self._gain = 0.0 if fade else volume
+        self._target = volume
+        self._step = 0.0
+        self._remove_when_silent = False
+        self._source = open_source()
+        self.fade_to(volume, fade)
+
+    @property
+    def volume(self):
+        return self._target
+
+    def fade_to(self, volume, fade=0.0, remove=False):
+        """Move the volume to a new level over fade seconds, finishing the layer at silence if remove is set"""
+        self._target = volume
+        self._remove_when_silent = remove
+        frames = max(fade / FRAME_SECONDS, 1.0)
+        self._step = abs(volume - self._gain) / frames
+
+    def read(self):
+        """
+        Get the next frame and the gain at the start and end of it.
+
+        Returns:
+            Tuple of (samples, start_gain, end_gain), samples being an int16
+            array of shape (960, 2), or None once the layer finished
+        """
+        if self.finished:
+            return None
+
+        data = self._source.read()
+        if not data and self.loop:
+            self._source.cleanup()
+            self._source = self.open_source()
+            data = self._source.read()
+        if not data:
+            self.finish()
+            return None
+
+        samples = np.frombuffer(data, dtype="<i2")
+        if samples.size < SAMPLES_PER_FRAME * CHANNELS:
+            samples = np.pad(samples, (0, SAMPLES_PER_FRAME * CHANNELS - samples.size))
+
+        start = self._gain
+        if start != self._target:
+            delta = self._target - start
+            self._gain = self._target if abs(delta) <= self._step else start + (self._step if delta > 0 else -self._step)
+        if self._remove_when_silent and self._gain == 0:
+            self.finish()
+        return samples.reshape(SAMPLES_PER_FRAME, CHANNELS), start, self._gain
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self._source.cleanup()
+
+
+class Layers:
+    """
+    Named layers of a session, kept across the source chains of its songs
+    so an ambience carries on through song changes and seeks. volume is
+    the session volume, applied to every layer on top of its own.
+
+    Layers replaced or removed from other threads are only retired here;
+    the mixer finishes them on its next read, from the player thread.
+    """
+
+    def __init__(self, volume=1.0):
+        self.volume = volume
+        self._layers = {}
+        self._retired = []
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._layers or self._retired)
+
+    def add(self, name, layer):
+        """Add a layer, replacing the one of the same name"""
+        with self._lock:
+            previous, self._layers[name] = self._layers.get(name), layer
+            if previous is not None:
+                self._retired.append(previous)
+
+    def fade(self, name, volume, fade=0.0, remove=False):
+        """Change the volume of a layer, returns False if there is no such layer"""
+        with self._lock:
+            layer = self._layers.get(name)
+        if layer is None:
+            return False
+        if remove and not fade:
+            self.remove(name)
+        else:
+            layer.fade_to(volume, fade, remove=remove)
+        return True
+
+    def remove(self, name):
+        with self._lock:
+            layer = self._layers.pop(name, None)
+            if layer is not None:
+                self._retired.append(layer)
+
+    def snapshot(self):
+        """
+        Get the (name, layer) pairs playing now, dropping the ones that
+        finished. Finishes retired layers, so only the mixer may call it.
+        """
+        with self._lock:
+            retired, self._retired = self._retired, []
+            for name in [name for name, layer in self._layers.items() if layer.finished]:
+                del self._layers[name]
+            layers = list(self._layers.items())
+        for layer in retired:
+            layer.finish()
+        return layers
+
+    def summary(self):
+        with self._lock:
+            return [
+                {"name": name, "volume": layer.volume, "loop": layer.loop}
+                for name, layer in self._layers.items() if not layer.finished
+            ]
+
+    def clear(self):
+        """Finish every layer, once no mixer reads them any more"""
+        with self._lock:
+            layers = self._retired + list(self._layers.values())
+            self._layers, self._retired = {}, []
+        for layer in layers:
+            layer.finish()
+
+
+class MixerSource(discord.AudioSource):
+    """
+    Sums the layers of a session under the song.
+
+    The song, the primary source, decides when playback ends: the mixer
+    returns an empty frame when it does, while layers that run out before
+    it simply drop out. The frames of all layers are mixed in one NumPy
+    pass, accumulated as 32-bit floats and clipped back to 16 bits, with
+    per-sample gains only while a layer fades. Without layers the song
+    frames pass through untouched.
+    """
+
+    def __init__(self, primary, layers):
+        self.primary = primary
+        self.layers = layers
+
+    def read(self):
+        data = self.primary.read()
+        if len(data) != FRAME_SIZE or not self.layers:
+            return data
+
+        frames = []
+        gains = []
+        for _, layer in self.layers.snapshot():
+            frame = layer.read()
+            if frame is not None:
+                frames.append(frame[0])
+                gains.append(frame[1:])
+        if not frames:
+            return data
+
+        stacked = np.stack(frames).astype(np.float32)
+        gains = np.array(gains, dtype=np.float32) * np.float32(self.layers.volume)
+        if np.array_equal(gains[:, 0], gains[:, 1]):
+            mixed = np.einsum("lsc,l->sc", stacked, gains[:, 0])
+        else:
+            ramps = np.linspace(gains[:, 0], gains[:, 1], SAMPLES_PER_FRAME, endpoint=False, axis=1)
+            mixed = np.einsum("lsc,ls->sc", stacked, ramps)
+        mixed += np.frombuffer(data, dtype="<i2").reshape(SAMPLES_PER_FRAME, CHANNELS)
+        return np.clip(mixed, -32768, 32767).astype("<i2").tobytes()
+
+    @property
+    def volume(self):
+        return getattr(self.primary, 'volume', 1.0)
+
+    @volume.setter
+    def volume(self, value):
+        if hasattr(self.primary, 'volume'):
+            self.primary.volume = value
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        # The layers belong to the session and outlive this song
+        if hasattr(self.primary, 'cleanup'):
+            self.primary.cleanup()
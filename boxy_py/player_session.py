@@ -0,0 +1,308 @@
+import asyncio
+import time
+import discord
+
+from boxy_py.audio_level_source import AudioLevelSource
+from boxy_py.queue_engine import QueueEngine
+
+
+class PlayerSession:
+    """
+    Playback state of a single guild.
+
+    A session owns its voice client, its source chain, its queue, its
+    position and its repeat state, so several guilds can play at once.
+    Layers, like an ambience loop, are mixed under whatever song plays and
+    carry on from one song to the next.
+    State that a front-end displays is changed through update(), which
+    reports the changed fields to the listener.
+    """
+    STATE_DEFAULTS = {
+        "voice_connected": False,
+        "song_title": "",
+        "channel_name": "",
+        "thumbnail_url": "",
+        "duration": 0,
+        "position": 0,
+        "is_playing": False,
+        "song_loaded": False,
+        "media_session_active": False,
+        "repeat_mode": "off",
+        "shuffle": False,
+        "placeholder_status": "",
+        "queue_index": -1,
+        "next_up_index": -1,
+        "previous_index": -1,
+    }
+
+    def __init__(self, guild_id, guild_name="", volume=1.0, listener=None):
+        """
+        Initialize a session.
+
+        Args:
+            guild_id: ID of the guild this session plays in
+            guild_name: Display name of the guild
+            volume: Initial playback volume
+            listener: Callable receiving (session, changed_fields)
+        """
+        self.guild_id = guild_id
+        self.guild_name = guild_name
+        self.listener = listener
+        self.voice_client = None
+        self.channel_id = ""
+        self.current_audio_file = None
+        self.current_url = None
+        self.changing_song = False
+        self.queue = QueueEngine(listener=self._on_queue_changed)
+        self._volume = volume
+        self._gain = 1.0
+        self._end = None
+        self._offset = 0
+        self._layers = None
+        self._audio_level = 0.0
+        self._play_started = None
+        self._source_started = None
+        self._source_stopped = None
+
+        for field, default in self.STATE_DEFAULTS.items():
+            setattr(self, field, default)
+
+    def update(self, **changes):
+        """Set state fields and notify the listener about the ones that changed"""
+        changed = {}
+        for field, value in changes.items():
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed[field] = value
+
+        if changed and self.listener:
+            self.listener(self, changed)
+
+    def _on_queue_changed(self, queue):
+        self.update(**queue.state())
+
+    @property
+    def audio_level(self):
+        return self._audio_level
+
+    @audio_level.setter
+    def audio_level(self, value):
+        self._audio_level = value
+        if self.listener:
+            self.listener(self, {"audio_level": value})
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = value
+        if self._layers is not None:
+            self._layers.volume = value
+        source = self.voice_client.source if self.voice_client else None
+        if source is not None and hasattr(source, "volume"):
+            source.volume = value * self._gain
+
+    def is_connected(self):
+        return self.voice_client is not None and self.voice_client.is_connected()
+
+    def is_active(self):
+        """Check if a source is loaded, playing or paused"""
+        return self.voice_client is not None and (self.voice_client.is_playing() or self.voice_client.is_paused())
+
+    def elapsed(self):
+        """Get the current playback position in seconds"""
+        if self._play_started is None:
+            return self.position
+        return self.position + (time.monotonic() - self._play_started)
+
+    def _anchor_position(self, position, running):
+        self._play_started = time.monotonic() if running else None
+        self.update(position=position)
+
+    def build_source(self, audio_file, position=0, on_start=None):
+        """
+        Create the FFmpeg -> volume -> level meter source chain for a file,
+        with the layers mixed in before the level meter when there are any.
+        The track gain is folded into the volume, so normalizing costs no
+        more than the volume multiply that runs anyway, and the end point is
+        an input option of FFmpeg, which stops decoding there.
+        """
+        options = []
+        if position:
+            options.append(f"-ss {int(position * 1000)}ms")
+        if self._end:
+            options.append(f"-to {int(self._end * 1000)}ms")
+        source = discord.FFmpegPCMAudio(audio_file, before_options=" ".join(options) or None)
+        source = discord.PCMVolumeTransformer(source, volume=self._volume * self._gain)
+        if self._layers:
+            from boxy_py.mixer import MixerSource
+            source = MixerSource(source, self._layers)
+        return AudioLevelSource(source, self, on_start=on_start)
+
+    def play(self, audio_file, after, position=0, gain=1.0, end=None, offset=0):
+        """
+        Start playing a file on the voice client. Must be called on the bot loop.
+
+        Args:
+            audio_file: Path of the file to play
+            after: Callable receiving (session, error, audio_file) when playback ends
+            position: Offset in seconds to start from
+            gain: Linear loudness gain of the file, applied on top of the volume
+            end: Offset in seconds to stop at, the end of the file when None
+            offset: Offset in seconds the shown position and seek() count
+                from, the start of the segment being played
+        """
+        loop = asyncio.get_running_loop()
+        started = self._source_started = asyncio.Event()
+        stopped = self._source_stopped = asyncio.Event()
+
+        def set_from_player_thread(event):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+        def finished(error):
+            after(self, error, audio_file)
+            set_from_player_thread(stopped)
+
+        self.current_audio_file = audio_file
+        self._gain = gain
+        self._end = end
+        self._offset = offset
+        self.voice_client.play(
+            self.build_source(audio_file, position, on_start=lambda: set_from_player_thread(started)),
+            after=finished
+        )
+        self._anchor_position(position - offset, running=True)
+        self.update(is_playing=True)
+
+    async def wait_started(self, timeout=2.0):
+        """Wait until the current source produced its first frame, returns False on timeout"""
+        return await self._wait_for(self._source_started, timeout)
+
+    async def wait_stopped(self, timeout=3.0):
+        """Wait until the after callback of the current source ran, returns False on timeout"""
+        return await self._wait_for(self._source_stopped, timeout)
+
+    async def _wait_for(self, event, timeout):
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def pause(self):
+        if self.voice_client and self.voice_client.is_playing():
+            self.voice_client.pause()
+            self._anchor_position(self.elapsed(), running=False)
+            self.update(is_playing=False)
+            self.audio_level = 0.0
+
+    def resume(self):
+        if self.voice_client and self.voice_client.is_paused():
+            self.voice_client.resume()
+            self._anchor_position(self.position, running=True)
+            self.update(is_playing=True)
+
+    def seek(self, position):
+        """Restart the current file at a new position, keeping the pause state"""
+        if not self.is_active() or not self.current_audio_file:
+            return
+
+        was_playing = self.voice_client.is_playing()
+        self.voice_client.source = self.build_source(self.current_audio_file, self._offset + position)
+        if was_playing:
+            self.voice_client.resume()
+        else:
+            self.voice_client.pause()
+        self._anchor_position(position, running=was_playing)
+
+    def add_layer(self, name, audio_file, volume=1.0, loop=True, fade=0.0):
+        """
+        Mix a file under the songs of this session, replacing the layer of
+        the same name. Layers only sound while a song plays.
+
+        Args:
+            name: Name the layer is changed and removed by
+            audio_file: Path of the file to play
+            volume: Linear volume of the layer, on top of the session volume
+            loop: Start the file over when it ends
+            fade: Seconds the fade in takes
+        """
+        from boxy_py.mixer import Layer, Layers, MixerSource
+
+        if self._layers is None:
+            self._layers = Layers(self._volume)
+        self._layers.add(name, Layer(lambda: discord.FFmpegPCMAudio(audio_file), volume, loop, fade))
+
+        # Mix into the song playing now without restarting it
+        source = self.voice_client.source if self.voice_client else None
+        if isinstance(source, AudioLevelSource) and not isinstance(source.original, MixerSource):
+            source.original = MixerSource(source.original, self._layers)
+
+    def fade_layer(self, name, volume, fade=0.0, remove=False):
+        """
+        Change the volume of a layer over fade seconds.
+
+        Returns:
+            False if the session has no layer of that name
+        """
+        return self._layers is not None and self._layers.fade(name, volume, fade, remove=remove)
+
+    def remove_layer(self, name, fade=0.0):
+        """Fade a layer out and drop it, returns False if there is no such layer"""
+        return self.fade_layer(name, 0.0, fade, remove=True)
+
+    def layers(self):
+        """List the layers as dictionaries with name, volume and loop"""
+        return self._layers.summary() if self._layers is not None else []
+
+    def stop(self):
+        """Stop the current source without touching the displayed state"""
+        if self.is_active():
+            self.voice_client.stop()
+        self._play_started = None
+
+    def reset_playback(self):
+        """Clear everything describing the current song"""
+        self.current_audio_file = None
+        self.current_url = None
+        self._play_started = None
+        self.update(
+            is_playing=False,
+            song_loaded=False,
+            media_session_active=False,
+            position=0,
+            song_title="",
+            channel_name="",
+            thumbnail_url="",
+            placeholder_status="",
+        )
+        self.audio_level = 0.0
+
+    async def disconnect(self):
+        """Stop playback and leave the voice channel"""
+        self.stop()
+        if self.voice_client:
+            await self.voice_client.disconnect()
+        if self._layers is not None:
+            # The player thread is gone now, nothing reads the layers
+            self._layers.clear()
+        self.voice_client = None
+        self.channel_id = ""
+        self.reset_playback()
+        self.update(voice_connected=False)
+
+    def summary(self):
+        """Short description used by the session switcher"""
+        channel = self.voice_client.channel.name if self.is_connected() else ""
+        return {
+            "id": str(self.guild_id),
+            "name": self.guild_name,
+            "channel": channel,
+            "title": self.song_title,
+            "playing": self.is_playing,
+        }
@@ -0,0 +1,315 @@
+import itertools
+import random
+import threading
+from collections import deque
+
+REPEAT_OFF = "off"
+REPEAT_ALL = "all"
+REPEAT_ONE = "one"
+REPEAT_MODES = (REPEAT_OFF, REPEAT_ALL, REPEAT_ONE)
+
+
+class QueueEngine:
+    """
+    Play order of a session's queue.
+
+    Entries are (key, source) pairs. The key identifies an entry across
+    edits of the queue (a queue row ID for the GUI) and the source is the
+    URL or search text that gets played. The engine owns the queue order,
+    the shuffled play order, the history of played entries and the repeat
+    mode, and knows what comes next before the current song ends, so the
+    download and playback layers can prepare it ahead of time.
+
+    Shuffle draws one Fisher-Yates permutation from a seeded generator and
+    walks it. It is redrawn only when shuffle is switched on, when an entry
+    is picked to play, or when repeat-all starts a new round, so skipping
+    back and forth keeps the same order and a seed reproduces it.
+
+    Methods can be called from any thread. The listener is called with the
+    engine after every change of the current or upcoming entry.
+    """
+    HISTORY_SIZE = 200
+
+    def __init__(self, listener=None, seed=None):
+        """
+        Initialize an empty queue.
+
+        Args:
+            listener: Optional callable receiving the engine after a change
+            seed: Seed of the shuffle generator, random when omitted
+        """
+        self.listener = listener
+        self.owner = None
+        self.repeat = REPEAT_OFF
+        self.shuffle = False
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self._random = random.Random(self.seed)
+        self._lock = threading.RLock()
+        self._keys = []
+        self._sources = {}
+        self._positions = {}
+        self._order = []
+        self._order_index = {}
+        self._next_round = None
+        self._current = None
+        self._resume = None
+        self._history = deque(maxlen=self.HISTORY_SIZE)
+        self._auto_keys = itertools.count()
+
+    def __len__(self):
+        return len(self._keys)
+
+    # Order
+
+    def _shuffled(self, first=None):
+        """Fisher-Yates permutation of the queue, optionally starting with one key"""
+        order = list(self._keys)
+        for i in range(len(order) - 1, 0, -1):
+            j = self._random.randint(0, i)
+            order[i], order[j] = order[j], order[i]
+        if first is not None and first in self._sources:
+            order.remove(first)
+            order.insert(0, first)
+        return order
+
+    def _set_order(self, order):
+        self._order = order
+        self._order_index = {key: i for i, key in enumerate(order)}
+        self._next_round = None
+
+    def _set_entries(self, entries):
+        self._keys = []
+        self._sources = {}
+        for entry in entries:
+            key, source = entry if isinstance(entry, (tuple, list)) else (f"auto-{next(self._auto_keys)}", entry)
+            if key in self._sources:
+                continue
+            self._keys.append(key)
+            self._sources[key] = source
+        self._positions = {key: i for i, key in enumerate(self._keys)}
+
+    def _round_after(self):
+        """Play order of the round following the current one under repeat-all"""
+        if not self.shuffle:
+            return self._order
+        if self._next_round is None:
+            order = self._shuffled()
+            # Do not start the new round with the song that ended the last one
+            if len(order) > 1 and order[0] == self._current:
+                order[0], order[-1] = order[-1], order[0]
+            self._next_round = order
+        return self._next_round
+
+    def _following(self, manual):
+        """Key of the entry that plays after the current one, or None"""
+        if not self._order:
+            return None
+        if self._current is None:
+            return self._resume
+        if not manual and self.repeat == REPEAT_ONE:
+            return self._current
+
+        index = self._order_index[self._current] + 1
+        if index < len(self._order):
+            return self._order[index]
+        if self.repeat != REPEAT_OFF:
+            return self._round_after()[0]
+        return None
+
+    def _go_to(self, key, remember=True):
+        if remember and self._current is not None and self._current != key:
+            self._history.append(self._current)
+        self._current = key
+        self._resume = None
+
+    # Changes
+
+    def load(self, entries, start=0, owner=None):
+        """
+        Replace the queue and make one entry current.
+
+        History of entries that are still in the queue is kept, so going
+        back after picking another song of the same queue returns to the
+        song that was playing.
+
+        Args:
+            entries: (key, source) pairs, or plain sources that get their own keys
+            start: Queue position of the entry to play
+            owner: Front-end that keeps this queue in sync, if any
+
+        Returns:
+            Source of the entry to play, or None if start is out of range
+        """
+        with self._lock:
+            self._set_entries(entries)
+            self.owner = owner
+            if not 0 <= start < len(self._keys):
+                self._set_order(list(self._keys))
+                self._current = self._resume = None
+                source = None
+            else:
+                if self._current not in self._sources:
+                    self._current = None
+                key = self._keys[start]
+                self._set_order(self._shuffled(first=key) if self.shuffle else list(self._keys))
+                self._history = deque((k for k in self._history if k in self._sources), maxlen=self.HISTORY_SIZE)
+                self._go_to(key)
+                source = self._sources[key]
+        self._changed()
+        return source
+
+    def sync(self, entries):
+        """
+        Follow an edit of the queue without interrupting what plays.
+
+        Removed entries leave the play order and the history. Entries that
+        are new get a random place among the songs still to come when
+        shuffling, and their queue place otherwise. If the current entry was
+        removed, the entry that would have come after it plays next.
+
+        Args:
+            entries: (key, source) pairs in queue order
+        """
+        with self._lock:
+            upcoming = []
+            if self._current is not None:
+                upcoming = self._order[self._order_index[self._current] + 1:]
+            elif self._resume is not None:
+                upcoming = self._order[self._order_index[self._resume]:]
+
+            self._set_entries(entries)
+
+            if self.shuffle:
+                order = [key for key in self._order if key in self._sources]
+                known = set(order)
+                start = order.index(self._current) + 1 if self._current in known else 0
+                for key in self._keys:
+                    if key not in known:
+                        order.insert(self._random.randint(start, len(order)), key)
+            else:
+                order = list(self._keys)
+            self._set_order(order)
+
+            self._history = deque((k for k in self._history if k in self._sources), maxlen=self.HISTORY_SIZE)
+            if self._current is not None and self._current not in self._sources:
+                self._current = None
+                self._resume = next((key for key in upcoming if key in self._sources), None)
+            elif self._resume is not None and self._resume not in self._sources:
+                self._resume = next((key for key in upcoming if key in self._sources), None)
+        self._changed()
+
+    def advance(self, manual=False):
+        """
+        Move to the next entry.
+
+        Args:
+            manual: True for a skip, which leaves the song even under repeat-one
+
+        Returns:
+            Source of the new current entry, or None at the end of the queue
+        """
+        with self._lock:
+            key = self._following(manual)
+            if key is None:
+                return None
+            if self._current is not None and self._order_index[key] < self._order_index[self._current]:
+                # Wrapped around under repeat-all, start the next round
+                self._set_order(self._round_after())
+            self._go_to(key)
+            source = self._sources[key]
+        self._changed()
+        return source
+
+    def previous(self):
+        """
+        Move back to the song played before the current one, or to the
+        entry before it in play order when there is no history.
+
+        Returns:
+            Source of the new current entry, or None if there is nothing before
+        """
+        with self._lock:
+            key = self._previous_key()
+            if key is None:
+                return None
+            if self._history and self._history[-1] == key:
+                self._history.pop()
+            self._go_to(key, remember=False)
+            source = self._sources[key]
+        self._changed()
+        return source
+
+    def _previous_key(self):
+        if self._history:
+            return self._history[-1]
+        if self._current is not None and self._order_index[self._current] > 0:
+            return self._order[self._order_index[self._current] - 1]
+        return None
+
+    def set_shuffle(self, enabled, seed=None):
+        """
+        Switch shuffling on or off. Switching it on draws a new order that
+        starts with the current entry.
+
+        Args:
+            enabled: Whether to shuffle
+            seed: Seed for the new order, drawn from the previous generator when omitted
+        """
+        with self._lock:
+            if enabled == self.shuffle and seed is None:
+                return
+            self.shuffle = enabled
+            if enabled:
+                self.seed = seed if seed is not None else self._random.randrange(2 ** 32)
+                self._random = random.Random(self.seed)
+                self._set_order(self._shuffled(first=self._current))
+            else:
+                self._set_order(list(self._keys))
+        self._changed()
+
+    def set_repeat(self, mode):
+        """Set the repeat mode to REPEAT_OFF, REPEAT_ALL or REPEAT_ONE"""
+        if mode not in REPEAT_MODES:
+            raise ValueError(f"Unknown repeat mode: {mode}")
+        with self._lock:
+            if mode == self.repeat:
+                return
+            self.repeat = mode
+        self._changed()
+
+    # Reading
+
+    def sources(self):
+        """URL or search text of every entry, in queue order"""
+        with self._lock:
+            return [self._sources[key] for key in self._keys]
+
+    def current_source(self):
+        with self._lock:
+            return self._sources.get(self._current)
+
+    def next_up(self):
+        """
+        Source of the entry a skip would play, or None. Under repeat-one this
+        is not what plays when the song ends, but the song that plays then
+        is the current one, which needs no preparing.
+        """
+        with self._lock:
+            return self._sources.get(self._following(manual=True))
+
+    def state(self):
+        """Queue fields shown by front-ends, as PlayerSession state"""
+        with self._lock:
+            following = self._following(manual=True)
+            previous = self._previous_key()
+            return {
+                "queue_index": self._positions.get(self._current, -1),
+                "next_up_index": self._positions.get(following, -1),
+                "previous_index": self._positions.get(previous, -1),
+                "repeat_mode": self.repeat,
+                "shuffle": self.shuffle,
+            }
+
+    def _changed(self):
+        if self.listener:
+            self.listener(self)
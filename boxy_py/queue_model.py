@@ -0,0 +1,343 @@
+import itertools
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer, Signal, Slot, Property
+
+
+class _Row:
+    __slots__ = ("id", "user_typed", "url", "title", "channel", "resolving", "downloading")
+
+    def __init__(self, row_id, user_typed, url="", title="", channel="", resolving=False):
+        self.id = row_id
+        self.user_typed = user_typed
+        self.url = url
+        self.title = title
+        self.channel = channel
+        self.resolving = resolving
+        self.downloading = False
+
+    @property
+    def source(self):
+        """What gets played or downloaded for this row"""
+        return self.url or self.user_typed
+
+    def as_item(self):
+        return {
+            "userTyped": self.user_typed,
+            "url": self.url,
+            "resolvedTitle": self.title,
+            "channelName": self.channel,
+        }
+
+
+class QueueModel(QAbstractListModel):
+    """
+    The play queue shown in the playlist view.
+
+    Rows are compact slotted objects with a stable ID, so a title that
+    resolves after its row was moved still lands on the right row. Rows
+    are found by ID or by URL through dictionaries; positions are
+    recomputed once after a structural change instead of on every lookup.
+
+    The update methods can be called from the bot thread: they emit a
+    private signal delivered to the model's own thread. Changes are stored
+    right away and the dataChanged notifications are coalesced into
+    contiguous ranges on the next event loop pass, so resolving a
+    thousand titles does not re-render the view a thousand times.
+    Artwork is computed only when a delegate asks for it.
+    """
+    UserTypedRole = Qt.UserRole + 1
+    UrlRole = Qt.UserRole + 2
+    ResolvedTitleRole = Qt.UserRole + 3
+    ChannelNameRole = Qt.UserRole + 4
+    IsResolvingRole = Qt.UserRole + 5
+    IsDownloadingRole = Qt.UserRole + 6
+    ArtworkRole = Qt.UserRole + 7
+
+    countChanged = Signal(int)
+    resolvingCountChanged = Signal(int)
+
+    _resolvedRequested = Signal(int, str, str, str)
+    _downloadingRequested = Signal(str, bool)
+
+    def __init__(self, artwork_source=None, parent=None):
+        """
+        Initialize the model.
+
+        Args:
+            artwork_source: Optional callable mapping a video URL to an image source
+            parent: Optional parent QObject
+        """
+        super().__init__(parent)
+        self.artwork_source = artwork_source
+        self._rows = []
+        self._by_id = {}
+        self._by_source = {}
+        self._positions = None
+        self._ids = itertools.count()
+        self._resolving_count = 0
+        self._pending_changes = {}
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(0)
+        self._flush_timer.timeout.connect(self._flush_changes)
+
+        self._resolvedRequested.connect(self._apply_resolved)
+        self._downloadingRequested.connect(self._apply_downloading)
+
+    # Thread-safe change requests
+
+    def set_resolved(self, row_id, title, url, channel_name):
+        """Store the resolved title, URL and channel of a row"""
+        self._resolvedRequested.emit(row_id, title, url, channel_name)
+
+    def set_downloading(self, url, downloading):
+        """Mark every row playing this URL as downloading or not"""
+        self._downloadingRequested.emit(url, downloading)
+
+    # QAbstractListModel
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+
+        row = self._rows[index.row()]
+        if role == self.UserTypedRole:
+            return row.user_typed
+        if role == self.UrlRole:
+            return row.url
+        if role in (Qt.DisplayRole, self.ResolvedTitleRole):
+            return row.title
+        if role == self.ChannelNameRole:
+            return row.channel
+        if role == self.IsResolvingRole:
+            return row.resolving
+        if role == self.IsDownloadingRole:
+            return row.downloading
+        if role == self.ArtworkRole:
+            return self.artwork_source(row.url) if self.artwork_source and row.url else ""
+        return None
+
+    def roleNames(self):
+        return {
+            self.UserTypedRole: b"userTyped",
+            self.UrlRole: b"url",
+            self.ResolvedTitleRole: b"resolvedTitle",
+            self.ChannelNameRole: b"channelName",
+            self.IsResolvingRole: b"isResolving",
+            self.IsDownloadingRole: b"isDownloading",
+            self.ArtworkRole: b"artwork",
+        }
+
+    @Property(int, notify=countChanged)
+    def count(self):
+        return len(self._rows)
+
+    @Property(int, notify=resolvingCountChanged)
+    def resolvingCount(self):
+        return self._resolving_count
+
+    # Reading
+
+    @Slot(int, result="QVariantMap")
+    def get(self, position):
+        if 0 <= position < len(self._rows):
+            return self._rows[position].as_item()
+        return {}
+
+    @Slot(result=list)
+    def urls(self):
+        """URL or search text of every row, in queue order"""
+        return [row.source for row in self._rows]
+
+    def entries(self):
+        """(row ID, URL or search text) of every row, for the queue engine"""
+        return [(row.id, row.source) for row in self._rows]
+
+    def items(self):
+        """Every row as a playlist item dictionary"""
+        return [row.as_item() for row in self._rows]
+
+    def position_of(self, row_id):
+        """Current position of a row, or -1 if it was removed"""
+        if self._positions is None:
+            self._positions = {row.id: position for position, row in enumerate(self._rows)}
+        return self._positions.get(row_id, -1)
+
+    def positions_of_url(self, url):
+        """Positions of the rows playing a URL or search text"""
+        return sorted(self.position_of(row.id) for row in self._by_source.get(url, ()))
+
+    # Structural changes, GUI thread only
+
+    def _new_row(self, item):
+        user_typed = item.get("userTyped") or ""
+        url = item.get("url") or ""
+        title = item.get("resolvedTitle") or ""
+        channel = item.get("channelName") or ""
+        return _Row(next(self._ids), user_typed, url, title, channel, resolving=not (url and title and channel))
+
+    def _index_row(self, row):
+        self._by_id[row.id] = row
+        self._by_source.setdefault(row.source, set()).add(row)
+
+    def _unindex_row(self, row):
+        self._by_id.pop(row.id, None)
+        rows = self._by_source.get(row.source)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._by_source[row.source]
+
+    def _set_resolving_count(self, value):
+        if self._resolving_count != value:
+            self._resolving_count = value
+            self.resolvingCountChanged.emit(value)
+
+    def reset(self, items):
+        """
+        Replace every row.
+
+        Returns:
+            List of (row_id, user_typed) for the rows that still need resolving
+        """
+        self.beginResetModel()
+        self._rows = [self._new_row(item) for item in items]
+        self._by_id = {}
+        self._by_source = {}
+        for row in self._rows:
+            self._index_row(row)
+        self._positions = None
+        self._pending_changes.clear()
+        self.endResetModel()
+
+        unresolved = [(row.id, row.user_typed) for row in self._rows if row.resolving]
+        self._set_resolving_count(len(unresolved))
+        self.countChanged.emit(len(self._rows))
+        return unresolved
+
+    def append(self, items):
+        """
+        Add rows at the end of the queue.
+
+        Returns:
+            List of (row_id, user_typed) for the rows that still need resolving
+        """
+        return self.insert(len(self._rows), items)
+
+    def insert(self, position, items):
+        """
+        Add rows before a position of the queue.
+
+        Returns:
+            List of (row_id, user_typed) for the rows that still need resolving
+        """
+        rows = [self._new_row(item) for item in items]
+        if not rows:
+            return []
+
+        first = max(0, min(position, len(self._rows)))
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows[first:first] = rows
+        for row in rows:
+            self._index_row(row)
+        if first == len(self._rows) - len(rows) and self._positions is not None:
+            for offset, row in enumerate(rows):
+                self._positions[row.id] = first + offset
+        else:
+            self._positions = None
+        self.endInsertRows()
+
+        unresolved = [(row.id, row.user_typed) for row in rows if row.resolving]
+        self._set_resolving_count(self._resolving_count + len(unresolved))
+        self.countChanged.emit(len(self._rows))
+        return unresolved
+
+    @Slot(int)
+    def remove(self, position):
+        if not 0 <= position < len(self._rows):
+            return
+
+        self.beginRemoveRows(QModelIndex(), position, position)
+        row = self._rows.pop(position)
+        self._unindex_row(row)
+        self._positions = None
+        self.endRemoveRows()
+
+        if row.resolving:
+            self._set_resolving_count(self._resolving_count - 1)
+        self.countChanged.emit(len(self._rows))
+
+    @Slot(int, int)
+    def move(self, source, destination):
+        """Move one row so it ends up at the destination position"""
+        if source == destination or not 0 <= source < len(self._rows) or not 0 <= destination < len(self._rows):
+            return
+
+        # beginMoveRows expects the position before which the row is inserted
+        self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), destination + 1 if destination > source else destination)
+        self._rows.insert(destination, self._rows.pop(source))
+        self._positions = None
+        self.endMoveRows()
+
+    @Slot()
+    def clear(self):
+        self.reset([])
+
+    # Applied on the model's thread
+
+    def _mark_changed(self, row, roles):
+        self._pending_changes.setdefault(row.id, set()).update(roles)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _apply_resolved(self, row_id, title, url, channel_name):
+        row = self._by_id.get(row_id)
+        if row is None:
+            return
+
+        roles = {self.ResolvedTitleRole, self.ChannelNameRole, self.IsResolvingRole}
+        if url and url != row.url:
+            self._unindex_row(row)
+            row.url = url
+            self._index_row(row)
+            roles.update((self.UrlRole, self.ArtworkRole))
+        row.title = title
+        row.channel = channel_name
+
+        if row.resolving:
+            row.resolving = False
+            self._set_resolving_count(self._resolving_count - 1)
+        self._mark_changed(row, roles)
+
+    def _apply_downloading(self, url, downloading):
+        for row in self._by_source.get(url, ()):
+            if row.downloading != downloading:
+                row.downloading = downloading
+                self._mark_changed(row, (self.IsDownloadingRole,))
+
+    def _flush_changes(self):
+        """Emit one dataChanged per run of adjacent changed rows"""
+        changes = sorted(
+            (self.position_of(row_id), roles) for row_id, roles in self._pending_changes.items()
+            if self.position_of(row_id) != -1
+        )
+        self._pending_changes.clear()
+
+        run_start = run_end = None
+        run_roles = set()
+        for position, roles in changes:
+            if run_start is not None and position == run_end + 1:
+                run_end = position
+                run_roles |= roles
+                continue
+            if run_start is not None:
+                self.dataChanged.emit(self.index(run_start), self.index(run_end), sorted(run_roles))
+            run_start = run_end = position
+            run_roles = set(roles)
+        if run_start is not None:
+            self.dataChanged.emit(self.index(run_start), self.index(run_end), sorted(run_roles))
@@ -0,0 +1,112 @@
+import re
+from urllib.parse import urldefrag
+
+# A part of a video is addressed with a media fragment on its URL,
+# https://youtu.be/ID#t=start,end, so a segment goes wherever a URL goes:
+# queues, playlists and the control socket. The cache keys files by the
+# URL without the fragment, so every segment of a video shares one download.
+
+_CLOCK = re.compile(r"^(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)$")
+_UNITS = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+(?:\.\d+)?)s)?$")
+
+
+def _parse_time(text):
+    """Seconds of 90, 90.5, 1:30, 1:02:03 or 1m30s, or None"""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _CLOCK.match(text) or _UNITS.match(text)
+    if match is None or not any(match.groups()):
+        return None
+    hours, minutes, seconds = (float(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse(url):
+    """
+    Split a URL into the URL of the whole video and the segment its #t=
+    fragment selects.
+
+    Returns:
+        Tuple of (media_url, start, end); start is 0 and end None when the
+        URL plays to the end, and a URL without a valid #t= comes back as is
+    """
+    base, fragment = urldefrag(url or "")
+    if not fragment.startswith("t="):
+        return url, 0, None
+
+    start_text, _, end_text = fragment[2:].partition(",")
+    start = _parse_time(start_text) if start_text else 0
+    end = _parse_time(end_text) if end_text else None
+    if start is None or (end_text and end is None) or (end is not None and end <= start):
+        return url, 0, None
+    return base, start, end
+
+
+def media_url(url):
+    """URL of the whole video a URL or segment URL plays from"""
+    return parse(url)[0]
+
+
+def is_segment(url):
+    return parse(url)[0] != url
+
+
+def format_time(seconds):
+    """Shortest text of a number of seconds for a fragment: 90, 90.5"""
+    return f"{seconds:.3f}".rstrip("0").rstrip(".")
+
+
+def segment_url(url, start, end=None):
+    """URL playing a video from start to end seconds, to its end when end is None"""
+    fragment = f"t={format_time(start)}"
+    if end is not None:
+        fragment += f",{format_time(end)}"
+    return f"{media_url(url)}#{fragment}"
+
+
+def length(url, duration):
+    """Seconds a URL plays for given the duration of the whole video, None if that is unknown"""
+    if duration is None:
+        return None
+    media, start, end = parse(url)
+    if media == url:
+        return duration
+    return max(min(end if end is not None else duration, duration) - start, 0)
+
+
+def chapters_from_info(info):
+    """Chapters of a yt-dlp info dictionary as a list of {title, start, end}"""
+    chapters = []
+    for chapter in info.get("chapters") or []:
+        start = chapter.get("start_time")
+        end = chapter.get("end_time")
+        if start is None or end is None or end <= start:
+            continue
+        chapters.append({"title": chapter.get("title") or "", "start": float(start), "end": float(end)})
+    return chapters
+
+
+def _clock(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def title(video_title, chapters, url):
+    """
+    Title of what a URL plays: the video title, followed by the chapter
+    title when the segment is a chapter or by its time range otherwise.
+    """
+    media, start, end = parse(url)
+    if media == url:
+        return video_title
+    for chapter in chapters or []:
+        if abs(chapter["start"] - start) < 0.5 and (end is None or abs(chapter["end"] - end) < 0.5):
+            return f"{video_title} - {chapter['title']}" if chapter["title"] else video_title
+    return f"{video_title} ({_clock(start)}-{_clock(end) if end is not None else 'end'})"
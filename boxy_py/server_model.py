@@ -0,0 +1,266 @@
+import bisect
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt, Signal, Slot
+
+
+def channel_snapshot(channel, presence):
+    """Plain description of a voice channel that can cross to the GUI thread"""
+    return {
+        "id": str(channel.id),
+        "name": channel.name,
+        "position": channel.position,
+        "members": presence.occupancy(channel.id),
+    }
+
+
+def guild_snapshot(guild, presence):
+    """Plain description of a guild and its voice channels"""
+    return {
+        "id": str(guild.id),
+        "name": guild.name,
+        "channels": [channel_snapshot(channel, presence) for channel in guild.voice_channels],
+    }
+
+
+class _GuildEntry:
+    def __init__(self, snapshot):
+        self.id = snapshot["id"]
+        self.name = snapshot["name"]
+        self.channels = sorted(snapshot["channels"], key=lambda channel: channel["position"])
+
+
+class ServerModel(QAbstractItemModel):
+    """
+    Tree of guilds (top level rows) and their voice channels (child rows).
+
+    The change methods can be called from the bot thread: each one emits a
+    private signal that is delivered to the model's own thread, where the
+    matching rows are inserted, removed or changed one by one, so views
+    only re-render the entries that changed.
+    """
+    NameRole = Qt.UserRole + 1
+    EntryIdRole = Qt.UserRole + 2
+    MembersRole = Qt.UserRole + 3
+
+    _resetRequested = Signal(object)
+    _guildAdded = Signal(object)
+    _guildRemoved = Signal(str)
+    _guildRenamed = Signal(str, str)
+    _channelAdded = Signal(str, object)
+    _channelRemoved = Signal(str, str)
+    _channelChanged = Signal(str, object)
+    _membersChanged = Signal(str, str, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._guilds = []
+
+        self._resetRequested.connect(self._apply_reset)
+        self._guildAdded.connect(self._apply_guild_added)
+        self._guildRemoved.connect(self._apply_guild_removed)
+        self._guildRenamed.connect(self._apply_guild_renamed)
+        self._channelAdded.connect(self._apply_channel_added)
+        self._channelRemoved.connect(self._apply_channel_removed)
+        self._channelChanged.connect(self._apply_channel_changed)
+        self._membersChanged.connect(self._apply_members_changed)
+
+    # Thread-safe change requests
+
+    def reset(self, guild_snapshots):
+        self._resetRequested.emit(guild_snapshots)
+
+    def add_guild(self, snapshot):
+        self._guildAdded.emit(snapshot)
+
+    def remove_guild(self, guild_id):
+        self._guildRemoved.emit(str(guild_id))
+
+    def rename_guild(self, guild_id, name):
+        self._guildRenamed.emit(str(guild_id), name)
+
+    def add_channel(self, guild_id, snapshot):
+        self._channelAdded.emit(str(guild_id), snapshot)
+
+    def remove_channel(self, guild_id, channel_id):
+        self._channelRemoved.emit(str(guild_id), str(channel_id))
+
+    def change_channel(self, guild_id, snapshot):
+        self._channelChanged.emit(str(guild_id), snapshot)
+
+    def set_members(self, guild_id, channel_id, count):
+        self._membersChanged.emit(str(guild_id), str(channel_id), count)
+
+    # QAbstractItemModel
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if column != 0 or row < 0:
+            return QModelIndex()
+
+        if not parent.isValid():
+            if row < len(self._guilds):
+                return self.createIndex(row, 0)
+            return QModelIndex()
+
+        if parent.internalPointer() is not None:
+            return QModelIndex()
+        guild = self._guilds[parent.row()]
+        if row < len(guild.channels):
+            return self.createIndex(row, 0, guild)
+        return QModelIndex()
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        guild = index.internalPointer()
+        if guild is None:
+            return QModelIndex()
+        return self.createIndex(self._guild_row(guild.id), 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._guilds)
+        if parent.internalPointer() is None:
+            return len(self._guilds[parent.row()].channels)
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        guild = index.internalPointer()
+        if guild is None:
+            guild = self._guilds[index.row()]
+            if role in (Qt.DisplayRole, self.NameRole):
+                return guild.name
+            if role == self.EntryIdRole:
+                return guild.id
+            if role == self.MembersRole:
+                return sum(channel["members"] for channel in guild.channels)
+            return None
+
+        channel = guild.channels[index.row()]
+        if role in (Qt.DisplayRole, self.NameRole):
+            return channel["name"]
+        if role == self.EntryIdRole:
+            return channel["id"]
+        if role == self.MembersRole:
+            return channel["members"]
+        return None
+
+    def roleNames(self):
+        return {
+            self.NameRole: b"name",
+            self.EntryIdRole: b"entryId",
+            self.MembersRole: b"members",
+        }
+
+    @Slot(int, result=QModelIndex)
+    def guildIndex(self, row):
+        """Index of a guild row, used by views as the root of its channels"""
+        return self.index(row, 0)
+
+    # Applied on the model's thread
+
+    def _guild_row(self, guild_id):
+        for row, guild in enumerate(self._guilds):
+            if guild.id == guild_id:
+                return row
+        return -1
+
+    def _channel_row(self, guild, channel_id):
+        for row, channel in enumerate(guild.channels):
+            if channel["id"] == channel_id:
+                return row
+        return -1
+
+    def _apply_reset(self, guild_snapshots):
+        self.beginResetModel()
+        self._guilds = [_GuildEntry(snapshot) for snapshot in guild_snapshots]
+        self.endResetModel()
+
+    def _apply_guild_added(self, snapshot):
+        if self._guild_row(snapshot["id"]) != -1:
+            return
+        row = len(self._guilds)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._guilds.append(_GuildEntry(snapshot))
+        self.endInsertRows()
+
+    def _apply_guild_removed(self, guild_id):
+        row = self._guild_row(guild_id)
+        if row == -1:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._guilds[row]
+        self.endRemoveRows()
+
+    def _apply_guild_renamed(self, guild_id, name):
+        row = self._guild_row(guild_id)
+        if row == -1 or self._guilds[row].name == name:
+            return
+        self._guilds[row].name = name
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, [self.NameRole])
+
+    def _apply_channel_added(self, guild_id, snapshot):
+        row = self._guild_row(guild_id)
+        if row == -1:
+            return
+        guild = self._guilds[row]
+        if self._channel_row(guild, snapshot["id"]) != -1:
+            return
+
+        positions = [channel["position"] for channel in guild.channels]
+        channel_row = bisect.bisect_right(positions, snapshot["position"])
+        self.beginInsertRows(self.index(row, 0), channel_row, channel_row)
+        guild.channels.insert(channel_row, snapshot)
+        self.endInsertRows()
+
+    def _apply_channel_removed(self, guild_id, channel_id):
+        row = self._guild_row(guild_id)
+        if row == -1:
+            return
+        guild = self._guilds[row]
+        channel_row = self._channel_row(guild, channel_id)
+        if channel_row == -1:
+            return
+
+        self.beginRemoveRows(self.index(row, 0), channel_row, channel_row)
+        del guild.channels[channel_row]
+        self.endRemoveRows()
+
+    def _apply_channel_changed(self, guild_id, snapshot):
+        row = self._guild_row(guild_id)
+        if row == -1:
+            return
+        guild = self._guilds[row]
+        channel_row = self._channel_row(guild, snapshot["id"])
+        if channel_row == -1:
+            self._apply_channel_added(guild_id, snapshot)
+            return
+
+        if guild.channels[channel_row]["position"] != snapshot["position"]:
+            self._apply_channel_removed(guild_id, snapshot["id"])
+            self._apply_channel_added(guild_id, snapshot)
+            return
+
+        guild.channels[channel_row] = snapshot
+        index = self.index(channel_row, 0, self.index(row, 0))
+        self.dataChanged.emit(index, index, [self.NameRole, self.MembersRole])
+
+    def _apply_members_changed(self, guild_id, channel_id, count):
+        row = self._guild_row(guild_id)
+        if row == -1:
+            return
+        guild = self._guilds[row]
+        channel_row = self._channel_row(guild, channel_id)
+        if channel_row == -1 or guild.channels[channel_row]["members"] == count:
+            return
+
+        guild.channels[channel_row]["members"] = count
+        guild_index = self.index(row, 0)
+        index = self.index(channel_row, 0, guild_index)
+        self.dataChanged.emit(index, index, [self.MembersRole])
+        self.dataChanged.emit(guild_index, guild_index, [self.MembersRole])
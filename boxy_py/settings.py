@@ -0,0 +1,50 @@
+import os
+import json
+import threading
+
+import boxy_py.config as config
+
+
+class JsonSettings:
+    """
+    Settings store backed by a JSON file in the config directory.
+
+    Implements the value()/setValue() subset of QSettings used by BoxyCore,
+    so the core can run without Qt.
+    """
+    def __init__(self, path=None):
+        """
+        Initialize the store.
+
+        Args:
+            path: Optional path of the JSON file
+        """
+        self.path = path or os.path.join(config.get_config_directory(), "settings.json")
+        self._lock = threading.Lock()
+        self._values = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._values = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Error loading settings: {e}")
+
+    def value(self, key, default=None, type=None):
+        """Get a setting, converted to type when given"""
+        with self._lock:
+            value = self._values.get(key, default)
+        if type is not None and value is not None:
+            try:
+                return type(value)
+            except (TypeError, ValueError):
+                return default
+        return value
+
+    def setValue(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(self._values, f, indent=2)
+            except IOError as e:
+                print(f"Error saving settings: {e}")
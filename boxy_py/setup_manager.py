@@ -3,9 +3,10 @@ import platform
 import subprocess
 import threading
 import asyncio
-import requests
 from PySide6.QtCore import QObject, Signal, Slot, Property
 
+from boxy_py.startup_state import StartupState
+
 class SetupManager(QObject):
     # Define the signals
     setupCompleted = Signal(str)  # Emitted when setup is complete with token
@@ -19,8 +20,9 @@ class SetupManager(QObject):
         super().__init__()
         self.config_dir = self.get_config_dir()
         self.token_file = os.path.join(self.config_dir, "token.txt")
+        self.startup_state = StartupState()
         self._ffmpeg_install_in_progress = False
-        self._ffmpeg_installed = self.check_ffmpeg_installed()
+        self._ffmpeg_installed = False  # Checked by is_setup_complete()
         self._ffmpeg_install_message = ""
         self._os_type = platform.system()
         self._linux_distro = self.get_linux_distro() if self._os_type == "Linux" else ""
@@ -128,13 +130,8 @@ class SetupManager(QObject):
         return "Unknown"
     
     def check_ffmpeg_installed(self):
-        """Check if FFmpeg is installed"""
-        try:
-            # Try to run ffmpeg -version
-            subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            return True
-        except:
-            return False
+        """Check if FFmpeg is installed, using the cached result while it is valid"""
+        return self.startup_state.ffmpeg_available()
     
     @Slot(str)
     def validate_token(self, token):
@@ -144,6 +141,8 @@ class SetupManager(QObject):
             return
 
         async def validate():
+            import requests
+
             try:
                 # Fetch client ID from Discord API
                 url = "https://discord.com/api/v10/users/@me"
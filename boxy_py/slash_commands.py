@@ -0,0 +1,84 @@
+import discord
+from discord import app_commands
+
+
+def register_slash_commands(bot, core):
+    """
+    Register the playback slash commands on the bot's command tree.
+
+    The commands act on the session of the guild they are used in and are
+    meant for headless mode, where there is no window to drive playback.
+    """
+    def session_of(interaction):
+        return bot.get_session(interaction.guild_id, create=False)
+
+    @bot.tree.command(name="play", description="Play a URL or search result in your voice channel")
+    @app_commands.describe(query="YouTube URL or search terms")
+    async def play(interaction: discord.Interaction, query: str):
+        voice = interaction.user.voice if isinstance(interaction.user, discord.Member) else None
+        if voice is None or voice.channel is None:
+            await interaction.response.send_message("Join a voice channel first.", ephemeral=True)
+            return
+
+        await interaction.response.defer()
+        session = await core.connect(interaction.guild_id, voice.channel.id)
+        if session is None:
+            await interaction.followup.send("Could not join your voice channel.")
+            return
+
+        session = await core.play_queue_item(session, [query], 0)
+        if session is None or not session.song_loaded:
+            await interaction.followup.send("Could not play that.")
+            return
+        await interaction.followup.send(f"Playing **{session.song_title}**")
+
+    @bot.tree.command(name="pause", description="Pause or resume playback")
+    async def pause(interaction: discord.Interaction):
+        session = session_of(interaction)
+        if session is None or not session.is_active():
+            await interaction.response.send_message("Nothing is playing.", ephemeral=True)
+            return
+        await core.toggle_playback(session)
+        await interaction.response.send_message("Resumed." if session.is_playing else "Paused.")
+
+    @bot.tree.command(name="stop", description="Stop playback")
+    async def stop(interaction: discord.Interaction):
+        await core.stop(session_of(interaction))
+        await interaction.response.send_message("Stopped.")
+
+    @bot.tree.command(name="skip", description="Play the next song in the queue")
+    async def skip(interaction: discord.Interaction):
+        session = session_of(interaction)
+        if session is None:
+            await interaction.response.send_message("Nothing is playing.", ephemeral=True)
+            return
+        await interaction.response.defer()
+        await core.skip(session)
+        if session.song_loaded:
+            await interaction.followup.send(f"Playing **{session.song_title}**")
+        else:
+            await interaction.followup.send("End of the queue.")
+
+    @bot.tree.command(name="leave", description="Leave the voice channel")
+    async def leave(interaction: discord.Interaction):
+        session = session_of(interaction)
+        if session is None:
+            await interaction.response.send_message("Not in a voice channel.", ephemeral=True)
+            return
+        await core.close_session(session)
+        await interaction.response.send_message("Left the voice channel.")
+
+    @bot.tree.command(name="status", description="Show what is playing")
+    async def status(interaction: discord.Interaction):
+        session = session_of(interaction)
+        if session is None or not session.song_loaded:
+            await interaction.response.send_message("Nothing is playing.", ephemeral=True)
+            return
+
+        position = int(session.elapsed())
+        duration = int(session.duration)
+        state = "Playing" if session.is_playing else "Paused"
+        await interaction.response.send_message(
+            f"{state} **{session.song_title}** "
+            f"({position // 60}:{position % 60:02d} / {duration // 60}:{duration % 60:02d})"
+        )
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Records how long the import and initialization steps of startup take.
+
+    Steps are timed with step() and single points in time with mark(). The
+    profiler does nothing unless it was enabled, so the calls can stay in
+    the startup path.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self._entries = []
+        self._reported = False
+
+    def enable(self, origin=None):
+        self.enabled = True
+        if origin is not None:
+            self.origin = origin
+
+    @contextmanager
+    def step(self, label):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._entries.append((label, start - self.origin, end - start))
+
+    def mark(self, label):
+        if self.enabled:
+            self._entries.append((label, time.perf_counter() - self.origin, None))
+
+    def report(self):
+        """Print the recorded steps once, with their start offset and duration in ms"""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+
+        print("Startup profile:")
+        print(f"  {'step':<28} {'at ms':>8} {'took ms':>8}")
+        for label, offset, duration in self._entries:
+            took = f"{duration * 1000:8.1f}" if duration is not None else f"{'':>8}"
+            print(f"  {label:<28} {offset * 1000:8.1f} {took}")
+
+
+profiler = StartupProfiler()
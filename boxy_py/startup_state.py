@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import subprocess
+import threading
+
+import boxy_py.config as config
+
+# How long a successful check is trusted before it is repeated
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def token_fingerprint(token):
+    """Short hash identifying a token without storing it"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+class StartupState:
+    """
+    Cache of the results of the checks done at launch.
+
+    Records which ffmpeg binary was found and its version, and the
+    fingerprint of the last token that logged in successfully, each with
+    the time it was checked. A recorded result is trusted until it is
+    older than the TTL or the ffmpeg binary changed, so a normal launch
+    neither spawns ffmpeg nor calls the Discord API before connecting.
+    Callers invalidate an entry when the real login or decode fails.
+    """
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Optional path of the JSON file
+            ttl: Seconds a recorded check stays valid
+        """
+        self.path = path or os.path.join(config.get_config_directory(), "startup_state.json")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._state = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._state = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Error loading startup state: {e}")
+
+    def _save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, indent=2)
+        except IOError as e:
+            print(f"Error saving startup state: {e}")
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry.get("checked_at", 0) < self.ttl
+
+    # ffmpeg
+
+    def ffmpeg_available(self):
+        """
+        Check that ffmpeg can be run, spawning it only when the cached
+        result is missing, stale or about a different binary.
+
+        Returns:
+            True if ffmpeg is available
+        """
+        path = shutil.which("ffmpeg")
+        if path is None:
+            self.invalidate_ffmpeg()
+            return False
+
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            entry = self._state.get("ffmpeg")
+        if self._fresh(entry) and entry.get("path") == path and entry.get("mtime") == mtime:
+            return True
+
+        try:
+            result = subprocess.run([path, "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            self.invalidate_ffmpeg()
+            return False
+
+        first_line = result.stdout.decode("utf-8", errors="replace").splitlines()[:1]
+        with self._lock:
+            self._state["ffmpeg"] = {
+                "path": path,
+                "mtime": mtime,
+                "version": first_line[0] if first_line else "",
+                "checked_at": time.time(),
+            }
+            self._save()
+        return True
+
+    def invalidate_ffmpeg(self):
+        with self._lock:
+            if self._state.pop("ffmpeg", None) is not None:
+                self._save()
+
+    # Token
+
+    def token_known(self, token):
+        """Check if this token logged in successfully within the TTL"""
+        with self._lock:
+            entry = self._state.get("token")
+        return self._fresh(entry) and entry.get("fingerprint") == token_fingerprint(token)
+
+    def record_token(self, token):
+        with self._lock:
+            self._state["token"] = {"fingerprint": token_fingerprint(token), "checked_at": time.time()}
+            self._save()
+
+    def invalidate_token(self):
+        with self._lock:
+            if self._state.pop("token", None) is not None:
+                self._save()
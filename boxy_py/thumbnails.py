@@ -0,0 +1,318 @@
+import os
+import re
+import hashlib
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+from PySide6.QtCore import QRunnable, QThreadPool, QSize, Qt
+from PySide6.QtGui import QImage
+from PySide6.QtQuick import QQuickAsyncImageProvider, QQuickImageResponse, QQuickTextureFactory
+
+from boxy_py.utils import create_rounded_thumbnail
+
+PROVIDER_ID = "boxythumb"
+DEFAULT_SIZE = 96
+ROW_SIZE = 40
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+# Shiboken resolves enum types lazily and that lookup is not safe when the
+# first access happens on several worker threads at once, so resolve the
+# ones create_rounded_thumbnail uses here, on the importing thread.
+_ENUMS = (Qt.AspectRatioMode, Qt.TransformationMode, Qt.GlobalColor, QImage.Format)
+
+
+def thumbnail_key(url):
+    """
+    Get the key a thumbnail is stored under.
+
+    YouTube video and thumbnail URLs map to their video ID, so a video URL
+    and the thumbnail URL yt-dlp reports for it share one entry. Other URLs
+    map to a hash of the URL.
+    """
+    if not url:
+        return ""
+
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    if "youtube.com" in host:
+        video_id = parse_qs(parsed.query).get("v", [""])[0]
+        if not video_id and parsed.path.startswith("/shorts/"):
+            video_id = parsed.path.split("/")[2]
+    elif host == "youtu.be":
+        video_id = parsed.path.lstrip("/")
+    elif "ytimg.com" in host:
+        parts = parsed.path.split("/")
+        video_id = parts[2] if len(parts) > 2 and parts[1] in ("vi", "vi_webp") else ""
+    else:
+        video_id = ""
+
+    if _VIDEO_ID.match(video_id):
+        return video_id
+    return hashlib.md5(url.encode("utf-8")).hexdigest()
+
+
+def thumbnail_source(url):
+    """QML image source for the thumbnail of a video or thumbnail URL"""
+    key = thumbnail_key(url)
+    return f"image://{PROVIDER_ID}/{key}" if key else ""
+
+
+class ThumbnailStore:
+    """
+    Fetches, rounds and stores thumbnails on disk and in memory.
+
+    Processed images are written as <key>_<size>.png into a thumbnails
+    directory next to the audio cache and kept in a size-keyed LRU of
+    QImages, so a thumbnail is fetched and painted once per size. Remote
+    images are fetched through one pooled HTTP session shared by all
+    worker threads.
+    """
+    def __init__(self, directory, max_connections=8, max_memory=2000):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the processed thumbnails
+            max_connections: Size of the HTTP connection pool
+            max_memory: Number of processed images kept in memory
+        """
+        self.directory = directory
+        self.max_connections = max_connections
+        self.max_memory = max_memory
+        self._sources = {}
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._session = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def register(self, image_url, key=None):
+        """
+        Remember where the image for a key comes from.
+
+        Args:
+            image_url: URL or path of the source image
+            key: Key to register it under, derived from image_url when omitted
+
+        Returns:
+            The key
+        """
+        key = key or thumbnail_key(image_url)
+        if key and image_url:
+            with self._lock:
+                self._sources[key] = image_url
+        return key
+
+    def _http(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_connections)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def _remote_url(self, key):
+        with self._lock:
+            url = self._sources.get(key)
+        if url:
+            return url
+        if _VIDEO_ID.match(key):
+            return f"https://i.ytimg.com/vi/{key}/hqdefault.jpg"
+        return None
+
+    def path(self, key, size):
+        return os.path.join(self.directory, f"{key}_{size}.png")
+
+    def cached(self, key, size):
+        """Get a processed thumbnail from memory, or None"""
+        with self._lock:
+            image = self._memory.get((key, size))
+            if image is not None:
+                self._memory.move_to_end((key, size))
+            return image
+
+    def _remember(self, key, size, image):
+        with self._lock:
+            self._memory[(key, size)] = image
+            self._memory.move_to_end((key, size))
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+
+    def load(self, key, size=DEFAULT_SIZE):
+        """
+        Get a processed thumbnail, fetching and rounding it if needed.
+        Blocking, meant to run on a worker thread. Concurrent requests for
+        the same key and size wait for one another instead of fetching twice.
+
+        Args:
+            key: Key from thumbnail_key()
+            size: Edge length of the square thumbnail in pixels
+
+        Returns:
+            QImage, or None if the thumbnail could not be obtained
+        """
+        image = self.cached(key, size)
+        if image is not None:
+            return image
+
+        with self._lock:
+            inflight = self._inflight.setdefault((key, size), threading.Lock())
+        with inflight:
+            image = self.cached(key, size)
+            if image is None:
+                image = self._load_uncached(key, size)
+                if image is not None:
+                    self._remember(key, size, image)
+        with self._lock:
+            self._inflight.pop((key, size), None)
+        return image
+
+    def _load_uncached(self, key, size):
+        path = self.path(key, size)
+        if os.path.exists(path):
+            image = QImage(path)
+            if not image.isNull():
+                return image
+
+        url = self._remote_url(key)
+        if url is None:
+            return None
+
+        try:
+            if url.startswith("http"):
+                response = self._http().get(url, timeout=5)
+                if response.status_code != 200:
+                    return None
+                original = QImage.fromData(response.content)
+            else:
+                original = QImage(url)
+        except Exception as e:
+            print(f"Error downloading image: {e}")
+            return None
+
+        processed = create_rounded_thumbnail(original, size, max(2, size // 16))
+        if processed is None:
+            return None
+
+        processed.save(path, "PNG")
+        return processed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".png"):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError as e:
+                    print(f"Error deleting thumbnail {filename}: {e}")
+
+
+class ThumbnailPrefetcher:
+    """
+    Renders thumbnails ahead of time for whole lists.
+
+    Requests go to a worker pool with a bounded number of threads. A new
+    prefetch with replace=True drops the requests of the previous one that
+    have not started yet, so loading another playlist does not wait for
+    the artwork of the last one.
+    """
+    def __init__(self, store, max_workers=4):
+        self.store = store
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._pending = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def prefetch(self, keys, size=ROW_SIZE, replace=False):
+        """
+        Queue thumbnails for rendering.
+
+        Args:
+            keys: Keys from thumbnail_key(), in the order they should be rendered
+            size: Edge length of the thumbnails in pixels
+            replace: Drop queued requests from earlier calls
+        """
+        with self._lock:
+            if replace:
+                self._generation += 1
+                self._pending.clear()
+            generation = self._generation
+
+            for key in keys:
+                if not key or (key, size) in self._pending or self.store.cached(key, size) is not None:
+                    continue
+                self._pending.add((key, size))
+                self._pool.submit(self._render, key, size, generation)
+
+    def _render(self, key, size, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+        try:
+            self.store.load(key, size)
+        except Exception as e:
+            print(f"Error prefetching thumbnail: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard((key, size))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _ThumbnailResponse(QQuickImageResponse):
+    def __init__(self):
+        super().__init__()
+        self._image = QImage()
+
+    def textureFactory(self):
+        return QQuickTextureFactory.textureFactoryForImage(self._image)
+
+    def errorString(self):
+        return "" if not self._image.isNull() else "Thumbnail not available"
+
+    def finish(self, image):
+        if image is not None:
+            self._image = image
+        self.finished.emit()
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, store, key, size, response):
+        super().__init__()
+        self.store = store
+        self.key = key
+        self.size = size
+        self.response = response
+
+    def run(self):
+        self.response.finish(self.store.load(self.key, self.size))
+
+
+class ThumbnailProvider(QQuickAsyncImageProvider):
+    """
+    Serves image://boxythumb/<key> from the ThumbnailStore.
+
+    Every request runs on a thread pool, so QML never waits on network or
+    painting. The thumbnail size follows the Image's sourceSize.
+    """
+    def __init__(self, store, max_threads=4):
+        super().__init__()
+        self.store = store
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+
+    def requestImageResponse(self, key, requested_size):
+        size = requested_size.width() if isinstance(requested_size, QSize) and requested_size.width() > 0 else DEFAULT_SIZE
+        response = _ThumbnailResponse()
+        self.pool.start(_LoadTask(self.store, key, size, response))
+        return response
@@ -1,10 +1,6 @@
 import os
 import sys
 import asyncio
-import aiohttp
-from youtube_search import YoutubeSearch
-from PySide6.QtGui import QImage, QPainter, QPainterPath
-from PySide6.QtCore import Qt
 
 
 def get_script_dir():
@@ -21,8 +17,14 @@ async def delete_file(file_path):
         except PermissionError:
             await asyncio.sleep(0.1)
 
+def is_url(text):
+    """Whether queue text is a web or local file URL to play as is, rather than a search term"""
+    return text.startswith(("http", "file:"))
+
 def get_first_video_url(keywords):
     """Search YouTube and get the URL of the first result"""
+    from youtube_search import YoutubeSearch
+
     try:
         results = YoutubeSearch(keywords, max_results=1).to_dict()
         if results:
@@ -61,33 +63,25 @@ def get_token():
 
     return token
 
-async def verify_token(token):
-    """Verify token before starting the GUI"""
-    async with aiohttp.ClientSession() as session:
-        headers = {"Authorization": f"Bot {token}"}
-
-        try:
-            async with session.get("https://discord.com/api/v10/users/@me", headers=headers) as response:
-                return response.status == 200
-        except Exception as e:
-            print(f"Error verifying token: {e}")
-            return False
-        
-def create_rounded_thumbnail(image_path, size=96, corner_radius=6):
+def create_rounded_thumbnail(image, size=96, corner_radius=6):
     """
     Process an image to be square with rounded corners.
     
     Args:
-        image_path (str): Path to the image file
+        image (str or QImage): Path to the image file, or an already loaded image
         size (int): Size of the output square image
         corner_radius (int): Radius of the rounded corners
         
     Returns:
         QImage: Processed image, or None if processing failed
     """
+    # Imported here so the headless daemon never loads Qt
+    from PySide6.QtGui import QImage, QPainter, QPainterPath
+    from PySide6.QtCore import Qt
+
     try:
         # Load the original image
-        original = QImage(image_path)
+        original = image if isinstance(image, QImage) else QImage(image)
         if original.isNull():
             return None
             
@@ -108,11 +102,11 @@ def create_rounded_thumbnail(image_path, size=96, corner_radius=6):
         cropped = original.copy(*crop_rect)
         
         # Scale to desired size
-        scaled = cropped.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        scaled = cropped.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
         
         # Create rounded version
-        rounded = QImage(size, size, QImage.Format_ARGB32)
-        rounded.fill(Qt.transparent)
+        rounded = QImage(size, size, QImage.Format.Format_ARGB32)
+        rounded.fill(Qt.GlobalColor.transparent)
         
         # Create a path with rounded corners
         path = QPainterPath()
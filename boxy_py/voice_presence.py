@@ -0,0 +1,121 @@
+class VoicePresence:
+    """
+    Index of which voice channel every visible member is in.
+
+    Seeded from the guild caches when the bot becomes ready and kept up to
+    date from voice state updates, so looking up a user's channel or the
+    occupancy of a channel does not walk guilds, channels and members.
+    """
+    def __init__(self):
+        self._user_channels = {}  # user_id -> {guild_id: channel_id}
+        self._channel_members = {}  # channel_id -> set of user_ids
+        self._channel_humans = {}  # channel_id -> number of members that are not bots
+        self._bots = set()
+
+    def clear(self):
+        self._user_channels.clear()
+        self._channel_members.clear()
+        self._channel_humans.clear()
+        self._bots.clear()
+
+    def seed(self, guilds):
+        """Rebuild the index from the current state of the given guilds"""
+        self.clear()
+        for guild in guilds:
+            self.add_guild(guild)
+
+    def add_guild(self, guild):
+        for channel in guild.voice_channels:
+            for member in channel.members:
+                self._join(guild.id, member, channel.id)
+
+    def remove_guild(self, guild):
+        for channel in guild.voice_channels:
+            self.remove_channel(channel)
+
+    def remove_channel(self, channel):
+        self._channel_humans.pop(channel.id, None)
+        for user_id in self._channel_members.pop(channel.id, ()):
+            self._forget(channel.guild.id, user_id)
+
+    def update(self, member, before, after):
+        """
+        Apply a voice state update.
+
+        Returns:
+            True if the member changed channel, False for mute, deafen and
+            other updates that leave the index untouched
+        """
+        before_id = before.channel.id if before.channel else None
+        after_id = after.channel.id if after.channel else None
+        if before_id == after_id:
+            return False
+
+        if before_id is not None:
+            self._leave(member.guild.id, member.id, before_id)
+        if after_id is not None:
+            self._join(member.guild.id, member, after_id)
+        return True
+
+    def channel_of(self, user_id):
+        """
+        Get the ID of the voice channel a user is in.
+
+        Args:
+            user_id: ID of the user
+
+        Returns:
+            A voice channel ID, or None if the user is in no visible channel
+        """
+        guild_channels = self._user_channels.get(user_id)
+        if not guild_channels:
+            return None
+        return next(iter(guild_channels.values()))
+
+    def occupancy(self, channel_id):
+        """Get the number of members in a voice channel"""
+        return len(self._channel_members.get(channel_id, ()))
+
+    def humans(self, channel_id):
+        """Get the number of members in a voice channel that are not bots"""
+        return self._channel_humans.get(channel_id, 0)
+
+    def members(self, channel_id):
+        """Get the IDs of the members in a voice channel"""
+        return frozenset(self._channel_members.get(channel_id, ()))
+
+    def _join(self, guild_id, member, channel_id):
+        user_id = member.id
+        previous = self._user_channels.get(user_id, {}).get(guild_id)
+        if previous == channel_id:
+            return
+        if previous is not None:
+            self._leave(guild_id, user_id, previous)
+
+        if member.bot:
+            self._bots.add(user_id)
+        else:
+            self._channel_humans[channel_id] = self._channel_humans.get(channel_id, 0) + 1
+        self._user_channels.setdefault(user_id, {})[guild_id] = channel_id
+        self._channel_members.setdefault(channel_id, set()).add(user_id)
+
+    def _leave(self, guild_id, user_id, channel_id):
+        members = self._channel_members.get(channel_id)
+        if members is not None and user_id in members:
+            members.discard(user_id)
+            if user_id not in self._bots:
+                humans = self._channel_humans.get(channel_id, 0) - 1
+                if humans > 0:
+                    self._channel_humans[channel_id] = humans
+                else:
+                    self._channel_humans.pop(channel_id, None)
+            if not members:
+                del self._channel_members[channel_id]
+        self._forget(guild_id, user_id)
+
+    def _forget(self, guild_id, user_id):
+        guild_channels = self._user_channels.get(user_id)
+        if guild_channels is not None:
+            guild_channels.pop(guild_id, None)
+            if not guild_channels:
+                del self._user_channels[user_id]
@@ -0,0 +1,154 @@
+import os
+
+# Resolution of the stored summaries: min/max pairs per file
+BUCKETS = 2048
+# Rate the audio is decoded at for summarizing, plenty for a few thousand buckets
+SAMPLE_RATE = 8000
+EXTENSION = ".peaks"
+# Level in dBFS below which the start and end of a song count as silence
+SILENCE_THRESHOLD = -50.0
+# Length of the windows whose level is compared with the threshold, in seconds
+SILENCE_WINDOW = 0.05
+# Windows converted to floats at a time when measuring their level
+WINDOWS_PER_BLOCK = 1024
+# Min/max pairs kept per silence window while decoding, 10 ms each
+PEAKS_PER_WINDOW = 5
+
+
+class Reduction:
+    """
+    Reduces mono 16-bit audio as it is decoded, without keeping it.
+
+    Every silence window leaves its level and the lowest and highest sample
+    of each fifth of it, a few bytes per 10 ms of audio, from which peaks()
+    and trim_points() are worked out once the stream ended. A trailing part
+    shorter than a window is left out.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        import numpy as np
+
+        self.sample_rate = sample_rate
+        self.block = max(int(sample_rate * SILENCE_WINDOW) // PEAKS_PER_WINDOW, 1)
+        self.window = self.block * PEAKS_PER_WINDOW
+        self._rest = b""
+        self._lows = []
+        self._highs = []
+        self._powers = []
+        self._empty = np.empty(0, dtype=np.int16)
+
+    def feed(self, data):
+        """Reduce the next chunk of little-endian 16-bit samples, of any length"""
+        import numpy as np
+
+        data = self._rest + data
+        usable = len(data) // (self.window * 2) * self.window * 2
+        self._rest = data[usable:]
+        if not usable:
+            return
+
+        samples = np.frombuffer(data, dtype="<i2", count=usable // 2)
+        blocks = samples.reshape(-1, self.block)
+        self._lows.append(blocks.min(axis=1))
+        self._highs.append(blocks.max(axis=1))
+        self._powers.append(window_powers(samples, self.window))
+
+    def peaks(self, buckets=BUCKETS):
+        """
+        Lowest and highest sample of each bucket.
+
+        Returns:
+            numpy int8 array of shape (buckets, 2) holding (min, max) pairs
+        """
+        import numpy as np
+
+        lows = np.concatenate(self._lows or [self._empty])
+        highs = np.concatenate(self._highs or [self._empty])
+        if lows.size == 0:
+            return np.zeros((buckets, 2), dtype=np.int8)
+
+        starts = np.minimum(np.linspace(0, lows.size, buckets + 1, dtype=np.int64)[:-1], lows.size - 1)
+        low = np.minimum.reduceat(lows, starts)
+        high = np.maximum.reduceat(highs, starts)
+        # The top byte of each sample is enough to draw with
+        return (np.stack((low, high), axis=1) >> 8).astype(np.int8)
+
+    def trim_points(self, threshold=SILENCE_THRESHOLD):
+        """
+        Find where the sound of a song starts and ends, skipping the silence
+        or near silence before and after it. Silence inside the song is kept.
+
+        Args:
+            threshold: RMS level in dBFS a window has to exceed to count as sound
+
+        Returns:
+            Tuple of (start, end) in seconds, end being None when the song does
+            not end in silence. (0.0, None) if the whole song is below the threshold.
+        """
+        import numpy as np
+
+        if not self._powers:
+            return 0.0, None
+        powers = np.concatenate(self._powers)
+        # Compare mean squares with the squared threshold rather than taking logs
+        loud = np.flatnonzero(powers > 10 ** (threshold / 10))
+        if loud.size == 0:
+            return 0.0, None
+
+        start = float(loud[0] * self.window / self.sample_rate)
+        last = int(loud[-1]) + 1
+        end = last * self.window / self.sample_rate if last < powers.size else None
+        return start, end
+
+
+def window_powers(samples, window):
+    """
+    Mean square of each whole window of 16-bit samples, full scale being 1.0.
+    Only a block of windows at a time is converted to floats, so this needs
+    little memory beyond the result however long the audio is.
+    """
+    import numpy as np
+
+    count = samples.size // window
+    powers = np.empty(count, dtype=np.float32)
+    for first in range(0, count, WINDOWS_PER_BLOCK):
+        last = min(first + WINDOWS_PER_BLOCK, count)
+        block = samples[first * window:last * window].reshape(last - first, window).astype(np.float32) / 32768.0
+        powers[first:last] = np.mean(block * block, axis=1)
+    return powers
+
+
+def save(path, peaks):
+    """Write a summary as raw int8 pairs, replacing any previous one at once"""
+    temp_path = path + ".tmp"
+    peaks.astype("i1").tofile(temp_path)
+    os.replace(temp_path, path)
+
+
+def load(path):
+    """
+    Read a summary written by save().
+
+    Returns:
+        numpy int8 array of shape (buckets, 2), or None if there is none
+    """
+    import numpy as np
+
+    try:
+        peaks = np.fromfile(path, dtype=np.int8)
+    except (OSError, ValueError):
+        return None
+    if peaks.size == 0 or peaks.size % 2:
+        return None
+    return peaks.reshape(-1, 2)
+
+
+def normalized(peaks):
+    """
+    Flatten a summary for drawing: min0, max0, min1, max1... scaled so the
+    loudest sample reaches -1.0 or 1.0.
+    """
+    import numpy as np
+
+    scale = max(int(np.abs(peaks.astype(np.int16)).max()), 1)
+    return (peaks.astype(np.float32) / scale).ravel().tolist()
@@ -1,21 +1,15 @@
+import time
+_process_start = time.perf_counter()
+
 import sys
 import os
 import threading
 import asyncio
 import logging
 import argparse
-from PySide6.QtGui import QGuiApplication, QIcon
-from PySide6.QtQml import QQmlApplicationEngine
-from PySide6.QtCore import QUrl, QSettings
-
-from boxy_py.bot import BoxyBot
-from boxy_py.bridge import BotBridge
-from boxy_py.setup_manager import SetupManager
-from boxy_py.utils import verify_token  
-from boxy_py.config import migrate_playlists_if_needed
 
-import discord
-import rc_main
+from boxy_py.startup_profile import profiler
+from boxy_py.config import migrate_playlists_if_needed
 
 def configure_logging():
     """Configure logging"""
@@ -25,6 +19,8 @@ def configure_logging():
 
 def load_setup_window(app, engine, setup_manager):
     """Load the setup window"""
+    from PySide6.QtCore import QUrl
+
     engine.clearComponentCache()
     for obj in engine.rootObjects():
         obj.deleteLater()
@@ -40,11 +36,24 @@ def load_setup_window(app, engine, setup_manager):
         sys.exit(1)
     
     root = engine.rootObjects()[0]
+    if profiler.enabled:
+        report_first_frame(root)
     root.setupFinished.connect(setup_manager.save_token)
-    setup_manager.setupCompleted.connect(lambda token: start_main_app(app, engine, token))
+    setup_manager.setupCompleted.connect(lambda token: start_main_app(app, engine, token, setup_manager))
 
-def start_main_app(app, engine, token):
+def start_main_app(app, engine, token, setup_manager):
     """Start the main application with the token"""
+    from PySide6.QtCore import QUrl, QSettings
+
+    with profiler.step("import discord"):
+        import discord
+    with profiler.step("import boxy_py.core"):
+        from boxy_py.bot import BoxyBot
+        from boxy_py.core import BoxyCore
+    with profiler.step("import boxy_py.bridge"):
+        from boxy_py.bridge import BotBridge
+        from boxy_py.thumbnails import ThumbnailProvider, PROVIDER_ID
+
     engine.clearComponentCache()
     for obj in engine.rootObjects():
         obj.deleteLater()
@@ -53,17 +62,17 @@ def start_main_app(app, engine, token):
     intents.message_content = True
     intents.voice_states = True
     
-    bot = BoxyBot(command_prefix="/", intents=intents)
-    bridge = BotBridge(bot)
-    bot.bridge = bridge
+    with profiler.step("BoxyCore()"):
+        bot = BoxyBot(command_prefix="/", intents=intents)
+        core = BoxyCore(bot, QSettings("Odizinne", "Boxy"), setup_manager.startup_state)
+    with profiler.step("BotBridge()"):
+        bridge = BotBridge(core)
     bot_started = False
     
     def cleanup():
-        settings = QSettings("Odizinne", "Boxy")
-        clear_on_exit = settings.value("clearCacheOnExit", False, type=bool)
+        clear_on_exit = core.settings.value("clearCacheOnExit", False, type=bool)
         if clear_on_exit:
-            if hasattr(bridge, 'audio_cache'):
-                bridge.audio_cache.clear_all()
+            core.audio_cache.clear_all()
 
         if bot_started:
             try:
@@ -77,50 +86,70 @@ def start_main_app(app, engine, token):
                 print("Cleanup timed out")
             except Exception as e:
                 print(f"Cleanup error: {e}")
-                
+
+        core.shutdown()
         engine.deleteLater()
     
     app.aboutToQuit.connect(cleanup)
     
     engine.rootContext().setContextProperty("botBridge", bridge)
+    engine.addImageProvider(PROVIDER_ID, ThumbnailProvider(bridge.thumbnails))
     
     def bot_runner():
         nonlocal bot_started
         try:
-            if not asyncio.run(verify_token(token)):
-                bridge._valid_token_format = False
-                app.quit()
-                return
-
+            # No separate token check: the gateway login validates the token
             bot_started = True
-            bridge.status = "Connecting..."
+            known = core.startup_state.token_known(token)
+            core.set_status("Connecting..." if known else "Validating token...")
             bot.run(token, reconnect=True)
 
+        except discord.LoginFailure:
+            print("Discord rejected the token, opening setup")
+            core.startup_state.invalidate_token()
+            core.notify("login_failed")
+
         except Exception as e:
             print(f"Bot error: {e}")
-            bridge.status = "Connection Error"
+            core.set_status("Connection Error")
     
     bot_thread = threading.Thread(target=bot_runner, daemon=True)
     bot_thread.start()
     
     script_dir = os.path.dirname(os.path.abspath(__file__))
     qml_path = os.path.join(script_dir, "qml/Main.qml")
-    engine.load(QUrl.fromLocalFile(qml_path))
+    with profiler.step("load Main.qml"):
+        engine.load(QUrl.fromLocalFile(qml_path))
     
     if not engine.rootObjects():
         print("Error loading main UI")
         sys.exit(1)
 
+    if profiler.enabled:
+        report_first_frame(engine.rootObjects()[0])
 
-if __name__ == "__main__":
-    configure_logging()
-    
-    parser = argparse.ArgumentParser(description='Boxy Discord Music Bot')
-    parser.add_argument('--force-setup', action='store_true', help='Force the setup screen to appear')
-    args = parser.parse_args()
-    
-    app = QGuiApplication(sys.argv)
-    engine = QQmlApplicationEngine()
+
+def report_first_frame(window):
+    """Print the startup profile once the window rendered its first frame"""
+    def on_frame():
+        window.frameSwapped.disconnect(on_frame)
+        profiler.mark("first frame")
+        profiler.report()
+
+    window.frameSwapped.connect(on_frame)
+
+
+def run_gui(args):
+    """Run the application with its window"""
+    with profiler.step("import PySide6"):
+        from PySide6.QtGui import QGuiApplication, QIcon
+        from PySide6.QtQml import QQmlApplicationEngine
+        from boxy_py.setup_manager import SetupManager
+        import rc_main  # noqa: F401 - registers the Qt resources
+
+    with profiler.step("QGuiApplication()"):
+        app = QGuiApplication(sys.argv)
+        engine = QQmlApplicationEngine()
     script_dir = os.path.dirname(os.path.abspath(__file__))
     icon = os.path.join(script_dir, "qml/icons/icon.png")
     
@@ -128,13 +157,38 @@ if __name__ == "__main__":
     app.setApplicationName("Boxy")
     app.setWindowIcon(QIcon(icon))
     
-    setup_manager = SetupManager()
-    migrate_playlists_if_needed()
+    with profiler.step("SetupManager()"):
+        setup_manager = SetupManager()
+        migrate_playlists_if_needed()
     
-    if setup_manager.is_setup_complete() and not args.force_setup:
+    with profiler.step("setup check"):
+        setup_complete = setup_manager.is_setup_complete()
+
+    if setup_complete and not args.force_setup:
         token = setup_manager.get_token()
-        start_main_app(app, engine, token)
+        start_main_app(app, engine, token, setup_manager)
     else:
         load_setup_window(app, engine, setup_manager)
     
-    sys.exit(app.exec())
\ No newline at end of file
+    return app.exec()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    
+    parser = argparse.ArgumentParser(description='Boxy Discord Music Bot')
+    parser.add_argument('--force-setup', action='store_true', help='Force the setup screen to appear')
+    parser.add_argument('--headless', action='store_true', help='Run without a window, controlled by slash commands and the control socket')
+    parser.add_argument('--control-port', type=int, default=8765, help='Port of the headless control socket on localhost, 0 to disable it')
+    parser.add_argument('--sync-commands', action='store_true', help='Sync the slash commands with Discord even if they did not change since the last sync')
+    parser.add_argument('--profile-startup', action='store_true', help='Print an import and initialization timing breakdown once the window is shown')
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        profiler.enable(origin=_process_start)
+    
+    if args.headless:
+        from boxy_py.headless import run_headless
+        sys.exit(run_headless(args.control_port, args.sync_commands))
+
+    sys.exit(run_gui(args))
\ No newline at end of file
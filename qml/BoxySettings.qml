@@ -3,8 +3,6 @@ import QtCore
 
 Settings {
     id: settings
-    property bool shuffle: false
-    property bool repeat: false
     property bool clearCacheOnExit: false
     property int maxCacheSize: 1024
     property int accentColor: 1
@@ -13,6 +11,13 @@ Settings {
     property int maxParallelDownloads: 3
     property double volume: 0.8
     property string autoJoinUserId: ""
+    property int autoLeaveDelay: 0
     property int accentColorIndex: 5
     property bool vuMeter: true
+    property bool searchCacheFirst: false
+    property bool preloadNext: true
+    property bool offlineMode: false
+    property bool normalizeLoudness: true
+    property bool trimSilence: true
+    property int silenceThreshold: -50
 }
@@ -1,6 +1,7 @@
 import QtQuick
 import QtQuick.Layouts
 import QtQuick.Controls.Material
+import QtQuick.Dialogs
 
 ApplicationWindow {
     id: configurationWindow
@@ -405,6 +406,148 @@ ApplicationWindow {
                             }
                         }
 
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Search cache before YouTube:"
+                                Layout.fillWidth: true
+                            }
+
+                            Switch {
+                                checked: BoxySettings.searchCacheFirst
+                                Layout.rightMargin: -5
+                                onCheckedChanged: {
+                                    BoxySettings.searchCacheFirst = checked
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Preload the next song:"
+                                Layout.fillWidth: true
+                            }
+
+                            Switch {
+                                checked: BoxySettings.preloadNext
+                                Layout.rightMargin: -5
+                                onCheckedChanged: {
+                                    BoxySettings.preloadNext = checked
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Level the loudness of songs:"
+                                Layout.fillWidth: true
+                            }
+
+                            Switch {
+                                checked: BoxySettings.normalizeLoudness
+                                Layout.rightMargin: -5
+                                onCheckedChanged: {
+                                    BoxySettings.normalizeLoudness = checked
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Skip silence at the start and end of songs:"
+                                Layout.fillWidth: true
+                            }
+
+                            Switch {
+                                checked: BoxySettings.trimSilence
+                                Layout.rightMargin: -5
+                                onCheckedChanged: {
+                                    BoxySettings.trimSilence = checked
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+                            enabled: BoxySettings.trimSilence
+
+                            Label {
+                                text: "Silence below (songs cached from now on):"
+                                Layout.fillWidth: true
+                            }
+
+                            SpinBox {
+                                id: silenceThresholdSpinBox
+                                from: -70
+                                to: -20
+                                stepSize: 5
+                                Layout.preferredHeight: 35
+                                value: BoxySettings.silenceThreshold
+                                editable: true
+
+                                onValueModified: {
+                                    BoxySettings.silenceThreshold = value
+                                    botBridge.set_silence_threshold(value)
+                                }
+
+                                textFromValue: function(value, locale) {
+                                    return value + " dB"
+                                }
+
+                                valueFromText: function(text, locale) {
+                                    return parseInt(text)
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Offline mode (cached songs only):"
+                                Layout.fillWidth: true
+                            }
+
+                            Switch {
+                                checked: BoxySettings.offlineMode
+                                Layout.rightMargin: -5
+                                onCheckedChanged: {
+                                    BoxySettings.offlineMode = checked
+                                    botBridge.set_offline_mode(checked)
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+                            visible: botBridge.maintenance_total > 0
+
+                            Label {
+                                text: "Analyzing cached songs:"
+                                Layout.fillWidth: true
+                            }
+
+                            Label {
+                                text: botBridge.maintenance_done + " / " + botBridge.maintenance_total
+                                      + (botBridge.maintenance_paused ? " (paused while playing)" : "")
+                                opacity: 0.7
+                            }
+                        }
+
                         RowLayout {
                             Layout.fillWidth: true
                             spacing: 10
@@ -433,6 +576,103 @@ ApplicationWindow {
                         }
                     }
                 }
+                Label {
+                    text: "Local library"
+                    Layout.bottomMargin: -15
+                    Layout.leftMargin: 10
+                    color: Material.accent
+                }
+                Pane {
+                    Layout.fillWidth: true
+                    Layout.preferredWidth: 450
+                    Layout.preferredHeight: implicitHeight + 20
+                    Material.background: Colors.paneColor
+                    Material.elevation: 6
+                    Material.roundedScale: Material.ExtraSmallScale
+                    ColumnLayout {
+                        anchors.fill: parent
+                        anchors.margins: 10
+                        spacing: 15
+
+                        Label {
+                            text: "Add folders of audio files to search and play them without downloading."
+                            visible: botBridge.local_folders.length === 0
+                            wrapMode: Text.Wrap
+                            opacity: 0.7
+                            Layout.fillWidth: true
+                        }
+
+                        Repeater {
+                            model: botBridge.local_folders
+
+                            RowLayout {
+                                required property string modelData
+                                Layout.preferredHeight: 35
+                                spacing: 10
+
+                                Label {
+                                    text: modelData
+                                    elide: Text.ElideMiddle
+                                    Layout.fillWidth: true
+                                }
+
+                                CustomRoundButton {
+                                    icon.source: "icons/trash.png"
+                                    icon.width: 16
+                                    icon.height: 16
+                                    flat: true
+                                    onClicked: botBridge.remove_local_folder(modelData)
+                                }
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Indexed files:"
+                                Layout.fillWidth: true
+                            }
+
+                            Label {
+                                text: botBridge.local_file_count + (botBridge.local_scanning ? " (scanning...)" : "")
+                                opacity: 0.7
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.fillWidth: true
+                            spacing: 10
+                            property int buttonWidth: Math.max(addFolderBtn.implicitWidth, rescanBtn.implicitWidth)
+
+                            MaterialButton {
+                                id: addFolderBtn
+                                Layout.preferredWidth: parent.buttonWidth
+                                Layout.fillWidth: true
+                                Material.roundedScale: Material.ExtraSmallScale
+                                text: "Add folder"
+                                onClicked: localFolderDialog.open()
+                            }
+
+                            MaterialButton {
+                                id: rescanBtn
+                                Layout.preferredWidth: parent.buttonWidth
+                                Layout.fillWidth: true
+                                Material.roundedScale: Material.ExtraSmallScale
+                                text: "Rescan"
+                                enabled: botBridge.local_folders.length > 0 && !botBridge.local_scanning
+                                onClicked: botBridge.rescan_local_library()
+                            }
+                        }
+
+                        FolderDialog {
+                            id: localFolderDialog
+                            title: "Add a folder to the local library"
+                            onAccepted: botBridge.add_local_folder(selectedFolder.toString())
+                        }
+                    }
+                }
                 Label {
                     text: "Discord bot token"
                     Layout.bottomMargin: -15
@@ -559,6 +799,99 @@ ApplicationWindow {
                                 wrapMode: Text.WordWrap
                             }
                         }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Leave empty channel after:"
+                                Layout.fillWidth: true
+                            }
+
+                            SpinBox {
+                                id: autoLeaveDelaySpinBox
+                                from: 0
+                                to: 300
+                                stepSize: 5
+                                Layout.preferredHeight: 35
+                                value: BoxySettings.autoLeaveDelay
+                                editable: true
+
+                                onValueModified: {
+                                    BoxySettings.autoLeaveDelay = value
+                                }
+
+                                textFromValue: function(value, locale) {
+                                    return value === 0 ? "Immediately" : value + " s"
+                                }
+
+                                valueFromText: function(text, locale) {
+                                    return parseInt(text) || 0
+                                }
+                            }
+                        }
+                    }
+                }
+                Label {
+                    text: "Diagnostics"
+                    Layout.bottomMargin: -15
+                    Layout.leftMargin: 10
+                    color: Material.accent
+                }
+                Pane {
+                    Layout.fillWidth: true
+                    Layout.preferredWidth: 450
+                    Layout.preferredHeight: implicitHeight + 20
+                    Material.background: Colors.paneColor
+                    Material.elevation: 6
+                    Material.roundedScale: Material.ExtraSmallScale
+                    ColumnLayout {
+                        id: diagnosticsLayout
+                        anchors.fill: parent
+                        anchors.margins: 10
+                        spacing: 15
+                        property var lagStats: ({})
+
+                        function refresh() {
+                            lagStats = botBridge.get_loop_lag_stats()
+                        }
+
+                        Timer {
+                            interval: 2000
+                            repeat: true
+                            triggeredOnStart: true
+                            running: configurationWindow.visible
+                            onTriggered: diagnosticsLayout.refresh()
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Event loop lag (p50 / p95 / p99):"
+                                Layout.fillWidth: true
+                            }
+                            Label {
+                                text: (diagnosticsLayout.lagStats.p50 || 0).toFixed(1) + " / " +
+                                      (diagnosticsLayout.lagStats.p95 || 0).toFixed(1) + " / " +
+                                      (diagnosticsLayout.lagStats.p99 || 0).toFixed(1) + " ms"
+                            }
+                        }
+
+                        RowLayout {
+                            Layout.preferredHeight: 35
+                            spacing: 10
+
+                            Label {
+                                text: "Stalls over " + (diagnosticsLayout.lagStats.threshold || 0).toFixed(0) + " ms:"
+                                Layout.fillWidth: true
+                            }
+                            Label {
+                                text: (diagnosticsLayout.lagStats.stalls || 0).toString()
+                            }
+                        }
                     }
                 }
             }
@@ -36,7 +36,8 @@ Popup {
                     width: scrlView.scrollBarVisible ? playlistList.width - 30: playlistList.width
                     height: 40
                     required property string name
-                    required property string filePath
+                    required property int playlistId
+                    required property string details
                     required property int index
 
                     RowLayout {
@@ -51,23 +52,31 @@ Popup {
                             Layout.alignment: Qt.AlignCenter
                         }
 
+                        Label {
+                            text: details
+                            visible: details !== ""
+                            opacity: 0.6
+                            font.pixelSize: 11
+                            Layout.alignment: Qt.AlignCenter
+                        }
+
                         CustomRoundButton {
                             Layout.alignment: Qt.AlignCenter
                             icon.source: "icons/trash.png"
                             icon.width: 16
                             icon.height: 16
-                            visible: filePath !== ""
+                            visible: playlistId >= 0
                             flat: true
                             onClicked: {
-                                botBridge.delete_playlist(filePath)
+                                botBridge.delete_playlist(playlistId)
                                 playlistList.model.remove(index)
                             }
                         }
                     }
 
                     onClicked: {
-                        if (filePath !== "") {
-                            botBridge.load_playlist(filePath)
+                        if (playlistId >= 0) {
+                            botBridge.load_playlist(playlistId)
                             playlistSelectorPopup.close()
                         }
                     }
@@ -96,16 +105,18 @@ Popup {
             if (playlists.length === 0) {
                 playlistList.model.append({
                                               name: "No playlists found",
-                                              filePath: "",
+                                              playlistId: -1,
+                                              details: "",
                                               enabled: false
                                           })
             } else {
-                playlists.sort((a, b) => a.name.toLowerCase().localeCompare(b.name.toLowerCase()))
-
                 playlists.forEach(function(playlist) {
+                    let readiness = botBridge.get_playlist_readiness(playlist.id)
                     playlistList.model.append({
                                                   name: playlist.name,
-                                                  filePath: playlist.filePath,
+                                                  playlistId: playlist.id,
+                                                  details: readiness.cached + "/" + playlist.entries + " offline"
+                                                           + (readiness.stale > 0 ? ", " + readiness.stale + " stale" : ""),
                                                   enabled: true
                                               })
                 })
@@ -2,6 +2,7 @@ import QtQuick
 import QtQuick.Layouts
 import QtQuick.Controls.Material
 import QtQuick.Effects
+import QtQml.Models
 
 import "."
 
@@ -18,15 +19,9 @@ ApplicationWindow {
     Material.primary: Colors.primaryColor
     color: Colors.backgroundColor
     property bool songLoaded: botBridge.song_loaded
-    property var shufflePlayedIndices: []
     property bool connectedToAPI: botBridge.status === "Connected"
-    property bool isAutoAdvancing: false
-    property bool isResolvingAny: {
-        for(let i = 0; i < playlistModel.count; i++) {
-            if(playlistModel.get(i).isResolving) return true
-        }
-        return false
-    }
+    property var queueModel: botBridge.queue_model
+    property bool isResolvingAny: queueModel.resolvingCount > 0
 
     onVisibleChanged: {
         if (!visible) {
@@ -73,9 +68,9 @@ ApplicationWindow {
                 
     Shortcut {
         sequence: "Ctrl+N"
-        enabled: root.connectedToAPI && playlistModel.count > 0 && !root.isResolvingAny
+        enabled: root.connectedToAPI && queueModel.count > 0 && !root.isResolvingAny
         onActivated: {
-            playlistModel.clear()
+            queueModel.clear()
             playlistName.text = ""
         }
     }
@@ -156,9 +151,9 @@ ApplicationWindow {
                 visible: false
 
                 MenuItem {
-                    enabled: root.connectedToAPI && playlistModel.count > 0 && !root.isResolvingAny
+                    enabled: root.connectedToAPI && queueModel.count > 0 && !root.isResolvingAny
                     onTriggered: {
-                        playlistModel.clear()
+                        queueModel.clear()
                         playlistName.text = ""
                     }
 
@@ -228,25 +223,10 @@ ApplicationWindow {
             text: "Servers"
             height: parent.height
             anchors.left: playlistButton.right
-            property var serverData: ({servers: [], channels: {}})
             property var noServersItem: null
 
-            function refreshServerData() {
-                serverData = botBridge.get_servers_with_channels()
-                serverMenuInstantiator.model = serverData.servers
-            }
-
             onClicked: serversMenu.visible = !serversMenu.visible
 
-            Connections {
-                target: botBridge
-                function onStatusChanged(status) {
-                    if (status === "Connected") {
-                        serversToolButton.refreshServerData()
-                    }
-                }
-            }
-
             Menu {
                 id: serversMenu
                 title: qsTr("Servers")
@@ -256,7 +236,7 @@ ApplicationWindow {
 
                 MenuItem {
                     text: "Refresh Server List"
-                    onTriggered: serversToolButton.refreshServerData()
+                    onTriggered: botBridge.refresh_servers()
                 }
 
                 MenuItem {
@@ -276,33 +256,61 @@ ApplicationWindow {
                     onTriggered: botBridge.disconnect_voice()
                 }
 
+                Menu {
+                    id: sessionsMenu
+                    title: "Active sessions"
+                    enabled: botBridge.sessions.length > 0
+
+                    Instantiator {
+                        model: botBridge.sessions
+                        delegate: MenuItem {
+                            required property var modelData
+                            text: modelData.name + (modelData.channel ? " - " + modelData.channel : "") +
+                                  (modelData.title ? " (" + modelData.title + ")" : "")
+                            checkable: true
+                            checked: modelData.id === botBridge.current_server
+                            onTriggered: {
+                                botBridge.view_session(modelData.id)
+                                serversMenu.close()
+                            }
+                        }
+                        onObjectAdded: function(index, object) { sessionsMenu.insertItem(index, object) }
+                        onObjectRemoved: function(index, object) { sessionsMenu.removeItem(object) }
+                    }
+                }
+
                 MenuSeparator {}
             }
 
             Instantiator {
                 id: serverMenuInstantiator
-                model: serversToolButton.serverData.servers
+                model: botBridge.server_model
 
                 delegate: Menu {
                     id: serverMenu
                     required property int index
-                    required property var modelData
+                    required property string name
+                    required property string entryId
                     property var noChannelsItem: null
-                    title: modelData.name
+                    title: name
 
                     Instantiator {
                         id: channelInstantiator
-                        model: serversToolButton.serverData.channels[modelData.id] || []
+                        model: DelegateModel {
+                            model: botBridge.server_model
+                            rootIndex: botBridge.server_model.guildIndex(serverMenu.index)
 
-                        delegate: MenuItem {
-                            required property int index
-                            required property var modelData
+                            delegate: MenuItem {
+                                required property string name
+                                required property string entryId
+                                required property int members
 
-                            text: modelData.name
+                                text: members > 0 ? name + " (" + members + ")" : name
 
-                            onTriggered: {
-                                botBridge.connect_to_channel(serverMenu.modelData.id, modelData.id)
-                                serversMenu.close()
+                                onTriggered: {
+                                    botBridge.connect_to_channel(serverMenu.entryId, entryId)
+                                    serversMenu.close()
+                                }
                             }
                         }
 
@@ -311,7 +319,7 @@ ApplicationWindow {
                                 serverMenu.removeItem(serverMenu.noChannelsItem)
                                 serverMenu.noChannelsItem = null
                             }
-                            serverMenu.addItem(object)
+                            serverMenu.insertItem(index, object)
                         }
 
                         onObjectRemoved: function(index, object) {
@@ -344,7 +352,7 @@ ApplicationWindow {
                         serversMenu.removeItem(serversToolButton.noServersItem)
                         serversToolButton.noServersItem = null
                     }
-                    serversMenu.insertMenu(index + 4, object)
+                    serversMenu.insertMenu(index + 5, object)
                 }
 
                 onObjectRemoved: function(index, object) {
@@ -379,27 +387,21 @@ ApplicationWindow {
         return minutes + ":" + (remainingSeconds < 10 ? "0" : "") + remainingSeconds
     }
 
+    function playQueueItem(index) {
+        botBridge.play_queue_item(index)
+    }
+
     function savePlaylist() {
         if (playlistName.text.trim() === "") {
             notificationPopup.displayText = "You must name the playlist"
             notificationPopup.visible = true
             return
-        } else if (!playlistModel.count > 0) {
+        } else if (!queueModel.count > 0) {
             notificationPopup.displayText = "Cannot save empty playlist"
             notificationPopup.visible = true
             return
         } else {
-            let items = []
-            for (let i = 0; i < playlistModel.count; i++) {
-                let item = playlistModel.get(i)
-                items.push({
-                    "userTyped": item.userTyped,
-                    "url": item.url || "",
-                    "resolvedTitle": item.resolvedTitle || "",
-                    "channelName": item.channelName || ""
-                })
-            }
-            botBridge.save_playlist(playlistName.text, items)
+            botBridge.save_playlist(playlistName.text)
             notificationPopup.displayText = "Playlist saved successfully"
             notificationPopup.visible = true
         }
@@ -414,95 +416,14 @@ ApplicationWindow {
             }
         }
 
-        function onItemDownloadStarted(url, index) {
-            if (index < playlistModel.count) {
-                playlistModel.setProperty(index, "isDownloading", true)
-            }
-        }
-
-        function onItemDownloadCompleted(url, index) {
-            if (index < playlistModel.count) {
-                playlistModel.setProperty(index, "isDownloading", false)
+        function onQueueIndexChanged(index) {
+            if (index >= 0 && index < queueModel.count) {
+                playlistView.currentIndex = index
             }
         }
 
-        function onTitleResolved(index, title, url, channelName) {
-            playlistModel.setProperty(index, "resolvedTitle", title)
-            playlistModel.setProperty(index, "channelName", channelName)
-            if (url) {
-                playlistModel.setProperty(index, "url", url)
-            }
-            playlistModel.setProperty(index, "isResolving", false)
-        }
-
-        function onPlaylistLoaded(items, title) {
-            playlistModel.clear()
+        function onPlaylistLoaded(title) {
             playlistName.text = title
-            items.forEach(function(item) {
-                playlistModel.append({
-                    "userTyped": item.userTyped,
-                    "url": item.url || "",
-                    "resolvedTitle": item.resolvedTitle || "",
-                    "channelName": item.channelName || "",
-                    "isResolving": !item.resolvedTitle || !item.url || !item.channelName,
-                    "isDownloading": false
-                })
-
-                if (!item.resolvedTitle || !item.url || !item.channelName) {
-                    let idx = playlistModel.count - 1
-                    botBridge.resolve_title(idx, item.userTyped)
-                }
-            })
-        }
-
-        function onSongLoadedChanged(loaded) {
-            if (botBridge.disconnecting) {
-                return;
-            }
-
-            if (loaded) {
-                isAutoAdvancing = false
-            }
-
-            if (!loaded && !botBridge.repeat_mode && botBridge.media_session_active &&
-                    !isAutoAdvancing && !botBridge.disconnecting) {
-
-                if (playlistView.currentIndex < playlistModel.count - 1) {
-                    isAutoAdvancing = true
-
-                    if (shuffleButton.checked) {
-                        let availableIndices = []
-                        for (let i = 0; i < playlistModel.count; i++) {
-                            if (!shufflePlayedIndices.includes(i)) {
-                                availableIndices.push(i)
-                            }
-                        }
-
-                        if (availableIndices.length === 0) {
-                            shufflePlayedIndices = []
-                            playlistView.currentIndex = 0
-                            isAutoAdvancing = false
-                            return
-                        }
-
-                        const randomIndex = Math.floor(Math.random() * availableIndices.length)
-                        const nextIndex = availableIndices[randomIndex]
-
-                        shufflePlayedIndices.push(nextIndex)
-
-                        playlistView.currentIndex = nextIndex
-                        let item = playlistModel.get(nextIndex)
-                        botBridge.play_url(item.url || item.userTyped)
-                    } else {
-                        playlistView.currentIndex++
-                        let item = playlistModel.get(playlistView.currentIndex)
-                        botBridge.play_url(item.url || item.userTyped)
-                    }
-                } else {
-                    playlistView.currentIndex = 0
-                    isAutoAdvancing = false
-                }
-            }
         }
     }
 
@@ -563,17 +484,21 @@ ApplicationWindow {
                         Layout.preferredWidth: 96
                         Layout.preferredHeight: 96
                         fillMode: Image.PreserveAspectFit
-                        property string currentUrl: botBridge.thumbnail_url || ""
-                        property string processedUrl: currentUrl ? botBridge.process_thumbnail(currentUrl, 96, 6) : ""
-                        source: processedUrl || (Material.theme === Material.Dark ?
-                                                     "icons/placeholder_light.png" : "icons/placeholder_dark.png")
+                        source: botBridge.thumbnail_source(botBridge.thumbnail_url || "")
+                        sourceSize: Qt.size(96, 96)
                         visible: true
                         asynchronous: true
                         cache: true
                         layer.smooth: true
+                        Image {
+                            anchors.fill: parent
+                            fillMode: Image.PreserveAspectFit
+                            source: Material.theme === Material.Dark ? "icons/placeholder_light.png" : "icons/placeholder_dark.png"
+                            visible: thumbnailImage.status !== Image.Ready
+                        }
                         RectangularShadow {
                             id: artShadow
-                            visible: thumbnailImage.processedUrl
+                            visible: thumbnailImage.status === Image.Ready
                             anchors.fill: parent
                             anchors.margins: BoxySettings.vuMeter ? 4 : 0
                             blur: 32
@@ -603,18 +528,73 @@ ApplicationWindow {
                         horizontalAlignment: Text.AlignHCenter
                     }
 
-                    Slider {
-                        id: timelineSlider
+                    Item {
                         Layout.fillWidth: true
-                        from: 0
-                        to: botBridge.duration || 0
-                        value: botBridge.position || 0
-                        enabled: root.songLoaded && !downloadProgress.visible && botBridge.seeking_enabled
-                        onPressedChanged: {
-                            if (pressed) {
-                                botBridge.stopTimerSignal() 
-                            } else {
-                                botBridge.seek(value)
+                        implicitHeight: timelineSlider.implicitHeight
+
+                        Canvas {
+                            id: waveformCanvas
+                            anchors.fill: parent
+                            anchors.leftMargin: timelineSlider.leftPadding
+                            anchors.rightMargin: timelineSlider.rightPadding
+                            anchors.topMargin: 4
+                            anchors.bottomMargin: 4
+                            opacity: 0.35
+                            visible: root.songLoaded && botBridge.waveform.length > 0
+
+                            onPaint: {
+                                let ctx = getContext("2d")
+                                ctx.reset()
+                                let peaks = botBridge.waveform
+                                let buckets = peaks.length / 2
+                                if (buckets === 0 || width <= 0) {
+                                    return
+                                }
+
+                                let middle = height / 2
+                                let played = timelineSlider.visualPosition * width
+                                for (let x = 0; x < width; x++) {
+                                    let first = Math.floor(x / width * buckets)
+                                    let last = Math.max(first + 1, Math.floor((x + 1) / width * buckets))
+                                    let low = 0
+                                    let high = 0
+                                    for (let i = first; i < last; i++) {
+                                        low = Math.min(low, peaks[2 * i])
+                                        high = Math.max(high, peaks[2 * i + 1])
+                                    }
+                                    ctx.fillStyle = x < played ? Material.accent : Material.foreground
+                                    ctx.fillRect(x, middle - high * middle, 1, Math.max(1, (high - low) * middle))
+                                }
+                            }
+
+                            onWidthChanged: requestPaint()
+
+                            Connections {
+                                target: botBridge
+                                function onWaveformChanged() {
+                                    waveformCanvas.requestPaint()
+                                }
+                            }
+                        }
+
+                        Slider {
+                            id: timelineSlider
+                            anchors.fill: parent
+                            from: 0
+                            to: botBridge.duration || 0
+                            value: botBridge.position || 0
+                            enabled: root.songLoaded && !downloadProgress.visible && botBridge.seeking_enabled
+                            onVisualPositionChanged: {
+                                if (waveformCanvas.visible) {
+                                    waveformCanvas.requestPaint()
+                                }
+                            }
+                            onPressedChanged: {
+                                if (pressed) {
+                                    botBridge.stopTimerSignal() 
+                                } else {
+                                    botBridge.seek(value)
+                                }
                             }
                         }
                     }
@@ -682,24 +662,8 @@ ApplicationWindow {
                         Layout.preferredWidth: height
                         icon.width: 14
                         icon.height: 14
-                        enabled: playlistView.currentIndex > 0 && botBridge.media_session_active && !downloadProgress.visible
-                        onClicked: {
-                            if (shuffleButton.checked) {
-                                const currentPos = shufflePlayedIndices.indexOf(playlistView.currentIndex)
-                                if (currentPos > 0) {
-                                    const prevIndex = shufflePlayedIndices[currentPos - 1]
-                                    playlistView.currentIndex = prevIndex
-                                    let item = playlistModel.get(prevIndex)
-                                    botBridge.play_url(item.url || item.userTyped)
-                                }
-                            } else {
-                                if (playlistView.currentIndex > 0) {
-                                    playlistView.currentIndex--
-                                    let item = playlistModel.get(playlistView.currentIndex)
-                                    botBridge.play_url(item.url || item.userTyped)
-                                }
-                            }
-                        }
+                        enabled: botBridge.previous_index >= 0 && botBridge.media_session_active && !downloadProgress.visible
+                        onClicked: botBridge.play_previous()
                     }
 
                     CustomRoundButton {
@@ -721,37 +685,8 @@ ApplicationWindow {
                         icon.width: 14
                         icon.height: 14
                         Layout.preferredWidth: height
-                        enabled: playlistView.currentIndex < (playlistModel.count - 1) && botBridge.media_session_active && !downloadProgress.visible
-                        onClicked: {
-                            if (shuffleButton.checked) {
-                                let availableIndices = []
-                                for (let i = 0; i < playlistModel.count; i++) {
-                                    if (!shufflePlayedIndices.includes(i)) {
-                                        availableIndices.push(i)
-                                    }
-                                }
-
-                                if (availableIndices.length === 0) {
-                                    shufflePlayedIndices = []
-                                    playlistView.currentIndex = 0
-                                    return
-                                }
-
-                                const randomIndex = Math.floor(Math.random() * availableIndices.length)
-                                const nextIndex = availableIndices[randomIndex]
-
-                                shufflePlayedIndices.push(nextIndex)
-                                playlistView.currentIndex = nextIndex
-                                let item = playlistModel.get(nextIndex)
-                                botBridge.play_url(item.url || item.userTyped)
-                            } else {
-                                if (playlistView.currentIndex < (playlistModel.count - 1)) {
-                                    playlistView.currentIndex++
-                                    let item = playlistModel.get(playlistView.currentIndex)
-                                    botBridge.play_url(item.url || item.userTyped)
-                                }
-                            }
-                        }
+                        enabled: botBridge.next_up_index >= 0 && botBridge.media_session_active && !downloadProgress.visible
+                        onClicked: botBridge.play_next()
                     }
 
                     Item {
@@ -767,18 +702,9 @@ ApplicationWindow {
                             icon.source: "icons/shuffle.png"
                             icon.width: 16
                             icon.height: 16
-                            checkable: true
-                            highlighted: checked
+                            highlighted: botBridge.shuffle
                             enabled: root.connectedToAPI
-                            onCheckedChanged: {
-                                if (checked && repeatButton.checked) {
-                                    repeatButton.checked = false
-                                }
-                                BoxySettings.shuffle = checked
-                            }
-                            Component.onCompleted: {
-                                checked = BoxySettings.shuffle
-                            }
+                            onClicked: botBridge.set_shuffle(!botBridge.shuffle)
                         }
 
                         CustomRoundButton {
@@ -787,18 +713,20 @@ ApplicationWindow {
                             icon.source: "icons/repeat.png"
                             icon.width: 16
                             icon.height: 16
-                            checkable: true
-                            highlighted: checked
+                            highlighted: botBridge.repeat_mode !== "off"
                             enabled: root.connectedToAPI
-                            onCheckedChanged: {
-                                botBridge.set_repeat_mode(checked)
-                                if (checked && shuffleButton.checked) {
-                                    shuffleButton.checked = false
-                                }
-                                BoxySettings.repeat = checked
+                            onClicked: {
+                                const modes = ["off", "all", "one"]
+                                botBridge.set_repeat_mode(modes[(modes.indexOf(botBridge.repeat_mode) + 1) % modes.length])
                             }
-                            Component.onCompleted: {
-                                checked = BoxySettings.repeat
+
+                            Label {
+                                text: "1"
+                                visible: botBridge.repeat_mode === "one"
+                                font.pixelSize: 9
+                                font.bold: true
+                                color: parent.icon.color
+                                anchors.centerIn: parent
                             }
                         }
                     }
@@ -831,15 +759,20 @@ ApplicationWindow {
                         icon.source: "icons/download.png"
                         Material.roundedScale: Material.ExtraSmallScale
                         Layout.preferredWidth: height
-                        enabled: root.connectedToAPI && playlistModel.count > 0 && !root.isResolvingAny && !downloadProgress.visible && !playlistDownloadProgress.visible
+                        enabled: root.connectedToAPI && queueModel.count > 0 && !root.isResolvingAny && !downloadProgress.visible && !playlistDownloadProgress.visible
+                        ToolTip.visible: hovered
+                        ToolTip.delay: 500
+                        ToolTip.text: {
+                            if (!hovered) {
+                                return ""
+                            }
+                            let readiness = botBridge.get_queue_readiness()
+                            return readiness.cached + " of " + readiness.entries + " songs available offline"
+                                    + (readiness.stale > 0 ? ", " + readiness.stale + " stale" : "")
+                        }
                         onClicked: {
                             stopPlaylistButton.click()
-                            let urls = []
-                            for (let i = 0; i < playlistModel.count; i++) {
-                                let item = playlistModel.get(i)
-                                urls.push(item.url || item.userTyped)
-                            }
-                            botBridge.download_all_playlist_items(urls)
+                            botBridge.download_all_playlist_items(queueModel.urls())
                             notificationPopup.displayText = "Downloading any non cached files"
                             notificationPopup.visible = true
                         }
@@ -863,7 +796,7 @@ ApplicationWindow {
                         text: "Edit"
                         checkable: true
                         Material.roundedScale: Material.ExtraSmallScale
-                        enabled: checked ? true : playlistModel.count >= 2
+                        enabled: checked ? true : queueModel.count >= 2
                     }
                 }
 
@@ -913,7 +846,7 @@ ApplicationWindow {
                     ListView {
                         id: playlistView
                         anchors.fill: parent
-                        model: ListModel { id: playlistModel }
+                        model: root.queueModel
                         spacing: 5
                         boundsBehavior: Flickable.StopAtBounds
                         ScrollBar.vertical: ScrollBar {
@@ -931,12 +864,7 @@ ApplicationWindow {
                                 anchors.fill: parent
                                 onDoubleClicked: {
                                     playlistView.currentIndex = model.index
-                                    let item = playlistModel.get(model.index)
-                                    if (shuffleButton.checked) {
-                                        shufflePlayedIndices = [model.index]
-                                    }
-
-                                    botBridge.play_url(item.url || item.userTyped)
+                                    root.playQueueItem(model.index)
                                 }
                             }
 
@@ -969,33 +897,8 @@ ApplicationWindow {
                                         Layout.preferredWidth: 40
                                         Material.roundedScale: Material.NotRounded
                                         enabled: model.index > 0
-                                        onClicked: {
-                                            let currentItem = {
-                                                userTyped: playlistModel.get(model.index).userTyped,
-                                                url: playlistModel.get(model.index).url,
-                                                resolvedTitle: playlistModel.get(model.index).resolvedTitle,
-                                                channelName: playlistModel.get(model.index).channelName,
-                                                isResolving: playlistModel.get(model.index).isResolving
-                                            }
-
-                                            let aboveIndex = model.index - 1
-                                            let aboveItem = {
-                                                userTyped: playlistModel.get(aboveIndex).userTyped,
-                                                url: playlistModel.get(aboveIndex).url,
-                                                resolvedTitle: playlistModel.get(aboveIndex).resolvedTitle,
-                                                channelName: playlistModel.get(aboveIndex).channelName,
-                                                isResolving: playlistModel.get(aboveIndex).isResolving
-                                            }
-
-                                            playlistModel.set(aboveIndex, currentItem)
-                                            playlistModel.set(model.index, aboveItem)
-
-                                            if (playlistView.currentIndex === model.index) {
-                                                playlistView.currentIndex--
-                                            } else if (playlistView.currentIndex === model.index - 1) {
-                                                playlistView.currentIndex++
-                                            }
-                                        }
+                                        // The view keeps currentIndex on the moved row by itself
+                                        onClicked: queueModel.move(model.index, model.index - 1)
                                     }
 
                                     MaterialButton {
@@ -1006,37 +909,22 @@ ApplicationWindow {
                                         Layout.preferredHeight: 16
                                         Layout.preferredWidth: 40
                                         Material.roundedScale: Material.NotRounded
-                                        enabled: model.index < playlistModel.count - 1
-                                        onClicked: {
-                                            let currentItem = {
-                                                userTyped: playlistModel.get(model.index).userTyped,
-                                                url: playlistModel.get(model.index).url,
-                                                resolvedTitle: playlistModel.get(model.index).resolvedTitle,
-                                                channelName: playlistModel.get(model.index).channelName,
-                                                isResolving: playlistModel.get(model.index).isResolving
-                                            }
-
-                                            let belowIndex = model.index + 1
-                                            let belowItem = {
-                                                userTyped: playlistModel.get(belowIndex).userTyped,
-                                                url: playlistModel.get(belowIndex).url,
-                                                resolvedTitle: playlistModel.get(belowIndex).resolvedTitle,
-                                                channelName: playlistModel.get(belowIndex).channelName,
-                                                isResolving: playlistModel.get(belowIndex).isResolving
-                                            }
-
-                                            playlistModel.set(belowIndex, currentItem)
-                                            playlistModel.set(model.index, belowItem)
-
-                                            if (playlistView.currentIndex === model.index) {
-                                                playlistView.currentIndex++
-                                            } else if (playlistView.currentIndex === model.index + 1) {
-                                                playlistView.currentIndex--
-                                            }
-                                        }
+                                        enabled: model.index < queueModel.count - 1
+                                        onClicked: queueModel.move(model.index, model.index + 1)
                                     }
                                 }
 
+                                Image {
+                                    Layout.preferredWidth: botBridge.artwork_size
+                                    Layout.preferredHeight: botBridge.artwork_size
+                                    sourceSize: Qt.size(botBridge.artwork_size, botBridge.artwork_size)
+                                    source: model.artwork
+                                    asynchronous: true
+                                    fillMode: Image.PreserveAspectFit
+                                    opacity: status === Image.Ready ? 1 : 0
+                                    Behavior on opacity { NumberAnimation { duration: 150 } }
+                                }
+
                                 ColumnLayout {
                                     Layout.fillWidth: true
                                     spacing: 2
@@ -1077,12 +965,21 @@ ApplicationWindow {
                                     Layout.rightMargin: 10
                                 }
 
+                                MaterialButton {
+                                    text: "Chapters"
+                                    flat: true
+                                    visible: editButton.checked && !model.isResolving && botBridge.chapter_count(model.url) > 0
+                                    ToolTip.visible: hovered
+                                    ToolTip.text: "Split into one entry per chapter"
+                                    onClicked: botBridge.split_chapters(model.index)
+                                }
+
                                 CustomRoundButton {
                                     icon.source: "icons/delete.png"
                                     icon.width: 12
                                     icon.height: 12
                                     visible: editButton.checked
-                                    onClicked: playlistModel.remove(model.index)
+                                    onClicked: queueModel.remove(model.index)
                                     flat: true
                                 }
                             }
@@ -1101,6 +998,65 @@ ApplicationWindow {
                         placeholderText: botBridge.placeholder_status !== "" ? botBridge.placeholder_status : "Enter YouTube URL or search term"
                         enabled: root.connectedToAPI
                         onAccepted: addButton.clicked()
+                        onTextChanged: cacheSearchTimer.restart()
+
+                        Timer {
+                            id: cacheSearchTimer
+                            interval: 150
+                            onTriggered: cacheSuggestions.results = botBridge.search_cache(newItemInput.text)
+                        }
+
+                        Popup {
+                            id: cacheSuggestions
+                            property var results: []
+                            visible: results.length > 0 && newItemInput.activeFocus
+                            y: -height - 6
+                            width: newItemInput.width
+                            padding: 4
+                            closePolicy: Popup.NoAutoClose
+                            Material.background: Colors.paneColor
+                            Material.elevation: 6
+                            Material.roundedScale: Material.ExtraSmallScale
+
+                            contentItem: ListView {
+                                implicitHeight: contentHeight
+                                model: cacheSuggestions.results
+                                interactive: false
+
+                                delegate: ItemDelegate {
+                                    required property var modelData
+                                    width: ListView.view.width
+                                    height: 44
+                                    focusPolicy: Qt.NoFocus
+
+                                    contentItem: ColumnLayout {
+                                        spacing: 0
+
+                                        Label {
+                                            text: modelData.title
+                                            font.bold: true
+                                            Layout.fillWidth: true
+                                            elide: Text.ElideRight
+                                        }
+
+                                        Label {
+                                            text: modelData.channel
+                                            visible: modelData.channel !== ""
+                                            font.pixelSize: 12
+                                            opacity: 0.7
+                                            Layout.fillWidth: true
+                                            elide: Text.ElideRight
+                                        }
+                                    }
+
+                                    onClicked: {
+                                        botBridge.add_to_queue(modelData.url)
+                                        newItemInput.text = ""
+                                        cacheSuggestions.results = []
+                                    }
+                                }
+                            }
+                        }
                     }
 
                     CustomRoundButton {
@@ -1116,16 +1072,7 @@ ApplicationWindow {
                                         newItemInput.text.includes("/playlist?list=")) {
                                     playlistPopup.open()
                                 } else {
-                                    let idx = playlistModel.count
-                                    playlistModel.append({
-                                                             "userTyped": newItemInput.text.trim(),
-                                                             "url": "",
-                                                             "resolvedTitle": "",
-                                                             "channelName": "",
-                                                             "isResolving": true,
-                                                             "isDownloading": false
-                                                         })
-                                    botBridge.resolve_title(idx, newItemInput.text.trim())
+                                    botBridge.add_to_queue(newItemInput.text.trim())
                                     newItemInput.text = ""
                                 }
                             }
@@ -1147,18 +1094,6 @@ ApplicationWindow {
         Connections {
             target: botBridge
             function onUrlsExtractedSignal(urls) {
-                for (let url of urls) {
-                    let idx = playlistModel.count
-                    playlistModel.append({
-                                             "userTyped": url,
-                                             "url": "",
-                                             "resolvedTitle": "",
-                                             "channelName": "",
-                                             "isResolving": true,
-                                             "isDownloading": false
-                                         })
-                    botBridge.resolve_title(idx, url)
-                }
                 newItemInput.text = ""
                 playlistPopup.close()
             }
@@ -69,15 +69,7 @@ Popup {
                 onClicked: {
                     let cleanUrl = newItemInput.text.trim().split("&list=")[0]
 
-                    let idx = playlistModel.count
-                    playlistModel.append({
-                                             "userTyped": cleanUrl,
-                                             "url": "",
-                                             "resolvedTitle": "",
-                                             "channelName": "",
-                                             "isResolving": true
-                                         })
-                    botBridge.resolve_title(idx, cleanUrl)
+                    botBridge.add_to_queue(cleanUrl)
                     newItemInput.text = ""
                     playlistPopup.close()
                 }